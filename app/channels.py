@@ -0,0 +1,95 @@
+# app/channels.py
+"""
+Classificação domínio -> canal.
+
+A tabela (app/channels.json, ou o arquivo em CHANNELS_FILE, com entradas extras
+em CHANNELS_EXTRA_FILE) vira, no import, uma trie de sufixos por rótulo
+invertido: "g1.globo.com" é inserido como com -> globo -> g1. A busca anda pelos
+rótulos do host do fim para o começo e fica com o sufixo mais longo que casa,
+então o custo é O(nº de rótulos) seja qual for o tamanho da tabela, e só casa
+em fronteira de rótulo ("box.com" não é "x.com"). O resultado por host é
+memoizado.
+
+Sem dependências do banco: também é usado pelos scripts da raiz.
+"""
+import json
+import os
+import urllib.parse
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+DEFAULT_FILE = os.path.join(os.path.dirname(__file__), "channels.json")
+FALLBACK = "Site"
+BLOG = "Blog"
+
+_LEAF = ""  # chave do canal dentro de um nó (rótulos nunca são vazios)
+_trie: Dict = {}
+_names: List[str] = []
+
+
+def _labels(host: str):
+    return reversed([p for p in host.strip(".").split(".") if p])
+
+
+def _build(table: Dict[str, str]) -> Dict:
+    root: Dict = {}
+    for domain, channel in table.items():
+        node = root
+        for label in _labels(domain.lower()):
+            node = node.setdefault(label, {})
+        node[_LEAF] = channel
+    return root
+
+
+def load_table(path: Optional[str] = None) -> Dict[str, str]:
+    """Tabela padrão (ou `path`) + extras de CHANNELS_EXTRA_FILE, se houver."""
+    with open(path or os.getenv("CHANNELS_FILE") or DEFAULT_FILE, encoding="utf-8") as fh:
+        table = json.load(fh)
+    extra = os.getenv("CHANNELS_EXTRA_FILE")
+    if extra:
+        with open(extra, encoding="utf-8") as fh:
+            table.update(json.load(fh))
+    return table
+
+
+def reload(table: Optional[Dict[str, str]] = None) -> int:
+    """Reconstrói a trie (da tabela dada ou dos arquivos) e limpa a memoização."""
+    global _trie, _names
+    table = load_table() if table is None else table
+    _trie = _build(table)
+    _names = sorted(set(table.values()) | {BLOG, FALLBACK})
+    channel_for_host.cache_clear()
+    return len(table)
+
+
+def host_of(url: str) -> str:
+    try:
+        host = urllib.parse.urlsplit(url or "").hostname or ""
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+@lru_cache(maxsize=int(os.getenv("CHANNELS_CACHE_SIZE", "65536")))
+def channel_for_host(host: str) -> str:
+    node, found = _trie, None
+    for label in _labels(host):
+        node = node.get(label)
+        if node is None:
+            break
+        found = node.get(_LEAF, found)
+    if found:
+        return found
+    return BLOG if "blog" in host else FALLBACK
+
+
+def names() -> List[str]:
+    """Todos os canais que a classificação pode produzir (tabela + Blog/Site)."""
+    return list(_names)
+
+
+def classify_channel(url: str) -> str:
+    return channel_for_host(host_of(url))
+
+
+reload()
@@ -1,27 +1,230 @@
 # app/db.py (versão “minimalista” para não montar por partes)
+"""
+Engine, pool de conexões e sessões.
+
+O pool é configurável pelo ambiente (por processo: com N workers do
+gunicorn/uvicorn o banco vê até N * (DB_POOL_SIZE + DB_MAX_OVERFLOW) conexões):
+  DB_POOL_SIZE       conexões mantidas abertas (5)
+  DB_MAX_OVERFLOW    conexões extras em pico, fechadas ao devolver (5)
+  DB_POOL_TIMEOUT    segundos esperando uma conexão livre antes do erro (30)
+  DB_POOL_RECYCLE    idade máxima de uma conexão em segundos; -1 desliga (1800)
+  DB_POOL_PRE_PING   testa a conexão antes de usar (1)
+
+Sessões: `with get_session() as s:` em serviços e jobs; nas rotas,
+`s: Session = Depends(db_session)`. A conexão só sai do pool na primeira
+consulta e volta no fim do bloco/requisição. `pool_stats()` expõe uso e
+tempo de espera do pool (GET /debug/db_pool). Commits que alteram menções
+incrementam data_version (app/services/data_version.py).
+
+Rotas async usam `await run_db(fn, *args)`: `fn(s, *args)` é o mesmo código
+síncrono dos serviços, executado por AsyncSession.run_sync sobre um engine
+assíncrono (psycopg 3 / aiosqlite), sem ocupar thread enquanto espera o banco.
+DB_ASYNC=auto (padrão) usa o engine assíncrono quando o driver existe; sem ele
+(ou com DB_ASYNC=0) `fn` roda no threadpool com uma sessão comum.
+"""
 import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+import anyio
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from sqlalchemy.orm import sessionmaker
-from sqlmodel import SQLModel
+from sqlalchemy.pool import QueuePool
+from sqlmodel import Session, SQLModel
 
 DATABASE_URL = os.environ["DATABASE_URL"]  # falha cedo se estiver ausente
 print(f"[DB] Using DATABASE_URL (sanitized): {DATABASE_URL.split('@')[0]}@***")
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=5,
-)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") not in ("0", "false", "no")
+DB_ASYNC = os.getenv("DB_ASYNC", "auto").lower()  # 'auto' | '1' | '0'
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool que mede quanto cada checkout esperou por uma conexão livre."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total_s = 0.0
+        self.wait_max_s = 0.0
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - t0
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total_s += waited
+                self.wait_max_s = max(self.wait_max_s, waited)
+
+    def recreate(self):
+        # dispose()/reconexão troca o pool: as métricas seguem no novo
+        new = super().recreate()
+        with self._stats_lock:
+            new.checkouts, new.timeouts = self.checkouts, self.timeouts
+            new.wait_total_s, new.wait_max_s = self.wait_total_s, self.wait_max_s
+        return new
+
+
+def _engine_kwargs(url: str) -> Dict:
+    kwargs: Dict = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:")):
+        return kwargs  # SQLite em memória: uma conexão por thread, sem QueuePool
+    kwargs.update(
+        poolclass=TimedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return kwargs
+
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+
+SessionLocal = sessionmaker(bind=engine, class_=Session, autoflush=False)
+
+# eventos do engine que sobem data_version a cada commit com escrita em menções
+import app.services.data_version  # noqa: E402,F401
+
+
+def dialect_insert(s):
+    """insert() do dialeto da sessão/conexão (suporta on_conflict_do_nothing)."""
+    bind = s.get_bind() if hasattr(s, "get_bind") else s
+    dialect = bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Upsert não suportado para o dialeto {dialect}")
+    return insert
+
+def init_db(bind=None) -> None:
+    """Cria tabelas e aplica as migrações em `bind` (padrão: o engine da aplicação)."""
+    from app.migrations import run_migrations
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    bind = bind or engine
+    SQLModel.metadata.create_all(bind)
+    run_migrations(bind)
 
-def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
 
-def get_session():
-    db = SessionLocal()
+@contextmanager
+def get_session() -> Iterator[Session]:
+    """Sessão com escopo de bloco: sem commit explícito, o que não foi gravado é desfeito."""
+    s = SessionLocal()
     try:
-        yield db
+        yield s
     finally:
-        db.close()
+        s.close()
+
+
+def db_session() -> Iterator[Session]:
+    """Dependência do FastAPI: uma sessão por requisição, fechada ao final."""
+    with get_session() as s:
+        yield s
+
+
+# -----------------------------
+# Engine assíncrono (rotas async)
+# -----------------------------
+_ASYNC_DRIVERS = {"sqlite": ("aiosqlite", "sqlite+aiosqlite"), "postgresql": ("psycopg", "postgresql+psycopg")}
+_async_engine = None
+_async_checked = False
+_async_lock = threading.Lock()
+
+
+def _async_url(url: str) -> Optional[str]:
+    """URL equivalente com driver assíncrono, ou None se o driver não estiver instalado."""
+    u = make_url(url.replace("postgres://", "postgresql://", 1))
+    spec = _ASYNC_DRIVERS.get(u.get_backend_name())
+    if spec is None:
+        return None
+    module, drivername = spec
+    try:
+        __import__(module)
+    except ImportError:
+        return None
+    return u.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+def async_engine():
+    """Engine assíncrono (criado na primeira chamada) ou None (DB_ASYNC=0 / sem driver)."""
+    global _async_engine, _async_checked
+    if DB_ASYNC in ("0", "false", "no"):
+        return None
+    with _async_lock:
+        if not _async_checked:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            _async_checked = True
+            url = _async_url(DATABASE_URL)
+            if url is None:
+                if DB_ASYNC in ("1", "true", "yes"):
+                    raise RuntimeError("DB_ASYNC=1, mas não há driver assíncrono para DATABASE_URL")
+                return None
+            kwargs = _engine_kwargs(DATABASE_URL)
+            kwargs.pop("poolclass", None)  # async usa o AsyncAdaptedQueuePool padrão
+            _async_engine = create_async_engine(url, **kwargs)
+        return _async_engine
+
+
+def _run_in_session(fn: Callable, *args):
+    with get_session() as s:
+        return fn(s, *args)
+
+
+async def run_db(fn: Callable, *args):
+    """Executa `fn(s, *args)` (código síncrono) sem bloquear o event loop."""
+    eng = async_engine()
+    if eng is None:
+        return await anyio.to_thread.run_sync(_run_in_session, fn, *args)
+    from sqlmodel.ext.asyncio.session import AsyncSession
+
+    async with AsyncSession(eng, autoflush=False) as s:
+        return await s.run_sync(fn, *args)
+
+
+def pool_stats() -> Dict:
+    pool = engine.pool
+    out: Dict = {"pool": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        out.update(
+            size=pool.size(),
+            max_overflow=DB_MAX_OVERFLOW,
+            timeout_s=DB_POOL_TIMEOUT,
+            recycle_s=DB_POOL_RECYCLE,
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            overflow=max(0, pool.overflow()),
+            capacity=pool.size() + DB_MAX_OVERFLOW,
+        )
+    if isinstance(pool, TimedQueuePool):
+        with pool._stats_lock:
+            out.update(
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                wait_total_s=round(pool.wait_total_s, 4),
+                wait_avg_ms=round(1000 * pool.wait_total_s / pool.checkouts, 3) if pool.checkouts else 0.0,
+                wait_max_ms=round(1000 * pool.wait_max_s, 3),
+            )
+    eng = _async_engine
+    if eng is not None:
+        out["async"] = {"driver": eng.dialect.driver, "status": eng.pool.status()}
+    return out
@@ -0,0 +1,59 @@
+# app/filters.py
+"""
+Filtros de menções compartilhados por /mentions, /analytics e pelas
+operações em lote (exclusão / tags por filtro).
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, field_validator
+
+from app.models import Mention
+from app.services import fulltext
+from app.services.tags import has_tag
+
+
+class MentionFilter(BaseModel):
+    q: Optional[str] = None
+    q_mode: str = "fts"  # 'fts' (índice full-text) | 'like' (substring)
+    canal: Optional[str] = None
+    sentimento: Optional[str] = None
+    tag: Optional[str] = None
+    date_field: str = "mined"  # 'mined' | 'published'
+    date_from: Optional[str] = None  # 'YYYY-MM-DD'
+    date_to: Optional[str] = None
+
+    @field_validator("tag")
+    @classmethod
+    def _strip_tag(cls, v: Optional[str]) -> Optional[str]:
+        # tags são gravadas sem espaços (clean_tags): " foo" filtra por "foo",
+        # e só espaços é o mesmo que sem filtro, nas consultas brutas e nos rollups
+        return (v or "").strip() or None
+
+    def is_empty(self) -> bool:
+        return not any([self.q, self.canal, self.sentimento, self.tag, self.date_from, self.date_to])
+
+
+def date_column(date_field: str):
+    return Mention.created_at if date_field == "mined" else Mention.published_at
+
+
+def filter_conditions(f: MentionFilter) -> List:
+    """Lista de condições SQL (para `.where(*conds)`) equivalente ao filtro."""
+    conds = []
+    if f.q:
+        conds.append(fulltext.condition(f.q, f.q_mode))
+    if f.canal:
+        conds.append(Mention.canal == f.canal)
+    if f.sentimento:
+        conds.append(Mention.sentimento == f.sentimento)
+    if f.tag:
+        conds.append(has_tag(f.tag))
+
+    # Filtro por data, escolhendo campo
+    field_col = date_column(f.date_field)
+    if f.date_from:
+        conds.append(field_col >= datetime.fromisoformat(f.date_from + "T00:00:00"))
+    if f.date_to:
+        conds.append(field_col <= datetime.fromisoformat(f.date_to + "T23:59:59"))
+    return conds
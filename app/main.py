@@ -1,19 +1,30 @@
-from typing import List, Optional, Dict
 from datetime import datetime
+from typing import List, Optional
 import os
 
-from fastapi import FastAPI, Query, HTTPException, APIRouter, status
+from fastapi import FastAPI, Query, HTTPException, APIRouter, Depends, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel
 
 from sqlalchemy import func as sa_func
-from sqlmodel import select
-
-from app.db import init_db, get_session, engine
-from app.models import Mention
-from app.services.google_cse import cse_search
-from app.utils import infer_published_at
+from sqlmodel import Session, select
+
+from app.db import init_db, db_session, engine, pool_stats, run_db
+from app.models import Mention, Job, Monitor, RetentionPolicy
+from app.filters import MentionFilter, filter_conditions
+from app.services import bulk, jobs
+from app.services import tags as tags_svc
+from app.services import fulltext, pagination
+from app.services import analytics as analytics_svc
+from app.services import export as export_svc
+from app.services import sentiment as sentiment_svc
+from app.services import channels as channels_svc
+from app.services.ingest import run_search, run_search_many, run_enrich_dates
+from app.services import google_cse, cse_cache
+from app.services import monitors, fetch_cache, page_meta, dedup, plans, retention
+from app.services import data_version, live, response_cache
 
 
 # -----------------------------
@@ -28,6 +39,44 @@ class TagUpdate(BaseModel):
     remove: Optional[List[str]] = None
 
 
+class BulkDeleteByFilter(BaseModel):
+    filter: MentionFilter
+    confirm_all: bool = False  # exigido quando o filtro está vazio (apaga tudo)
+
+
+class BulkTagUpdate(TagUpdate):
+    ids: Optional[List[int]] = None
+    filter: Optional[MentionFilter] = None
+
+
+class SearchBatch(BaseModel):
+    terms: List[str]
+    qty: Optional[int] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    enrich_dates: bool = False
+
+
+class MonitorIn(BaseModel):
+    term: str
+    qty: Optional[int] = None
+    enrich_dates: bool = False
+    interval_s: int = 3600
+    enabled: bool = True
+
+
+class RetentionIn(BaseModel):
+    termo: Optional[str] = None  # None = política global
+    keep_days: int
+
+
+class MonitorPatch(BaseModel):
+    qty: Optional[int] = None
+    enrich_dates: Optional[bool] = None
+    interval_s: Optional[int] = None
+    enabled: Optional[bool] = None
+
+
 # -----------------------------
 # App & CORS
 # -----------------------------
@@ -52,6 +101,44 @@ def healthz():
     return {"status": "ok", "service": "MonitorX API"}
 
 
+@debug_router.get("/debug/db_pool")
+def debug_db_pool():
+    """
+    Uso do pool de conexões deste processo: conexões em uso (checked_out),
+    extras além do pool_size (overflow), timeouts e espera média/máxima por
+    uma conexão livre. Espera ou timeouts crescentes pedem DB_POOL_SIZE /
+    DB_MAX_OVERFLOW maiores (respeitando o max_connections do banco dividido
+    pelo número de workers).
+    """
+    return pool_stats()
+
+
+@debug_router.get("/debug/query_plans")
+def debug_query_plans(verbose: bool = False):
+    """EXPLAIN das consultas quentes (app/services/plans.py); ok=false = varredura completa."""
+    results = plans.check()
+    if not verbose:
+        results = [{k: v for k, v in r.items() if k != "plan"} for r in results]
+    return {"ok": all(r["ok"] for r in results), "queries": results}
+
+
+@debug_router.get("/debug/response_cache")
+def debug_response_cache():
+    """Entradas, bytes e acertos do cache de GET /mentions e /analytics deste processo."""
+    return response_cache.info()
+
+
+@debug_router.delete("/debug/response_cache")
+def debug_response_cache_clear():
+    return {"cleared": response_cache.clear()}
+
+
+@debug_router.get("/debug/live")
+def debug_live():
+    """Conexões do feed ao vivo deste processo, filtros distintos e marca d'água."""
+    return live.hub.info()
+
+
 @debug_router.get("/debug/db_ping")
 def debug_db_ping():
     # Mostra como a URL foi montada (sem senha)
@@ -102,6 +189,20 @@ def _startup():
         init_db()  # cria tabelas se o DB estiver acessível; não derruba a API se falhar
     except Exception as e:
         print(f"[WARN] init_db skipped on startup: {e}")
+        return
+    try:
+        n = jobs.resume_pending()
+        if n:
+            print(f"[JOB] {n} job(s) pendente(s) reenfileirado(s)")
+    except Exception as e:
+        print(f"[WARN] resume_pending skipped on startup: {e}")
+    monitors.start()
+
+
+@app.on_event("shutdown")
+def _shutdown():
+    monitors.stop()
+    jobs.shutdown(wait=False)
 
 
 # -----------------------------
@@ -120,216 +221,390 @@ def health():
 # -----------------------------
 # Buscar e salvar menções
 # -----------------------------
-@app.post("/search")
+@app.post("/search", status_code=status.HTTP_202_ACCEPTED)
 def search_and_save(
     term: str,
     qty: Optional[int] = None,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     enrich_dates: bool = False,  # quando True, tenta descobrir published_at de cada URL
+    wait: bool = False,  # True: executa na própria requisição (comportamento antigo)
+    response: Response = None,
 ):
-    qty_eff = 50 if not qty else max(1, min(int(qty), 100))
-    print(
-        f"[SEARCH] term='{term}', qty={qty} (efetivo={qty_eff}), "
-        f"date_from={date_from}, date_to={date_to}, enrich_dates={enrich_dates}"
-    )
+    """
+    Enfileira a busca como job de fundo e devolve o id na hora
+    (acompanhe em GET /jobs/{id}). Com `wait=true`, executa e devolve o resultado.
+    """
+    params = {
+        "term": term, "qty": qty, "date_from": date_from,
+        "date_to": date_to, "enrich_dates": enrich_dates,
+    }
+    if wait:
+        response.status_code = status.HTTP_200_OK
+        try:
+            return run_search(**params)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    # 1) Buscar na CSE
-    try:
-        items = cse_search(
-            term,
-            total=qty_eff,
-            date_from=date_from,
-            date_to=date_to,
-        )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    job = jobs.submit("search", params)
+    return {"job_id": job.id, "status": job.status}
 
-    # 2) Dedup por (termo, url)
-    unique = {}
-    for it in items:
-        key = (term, it.get("url", ""))
-        if key not in unique:
-            unique[key] = it
-    items = list(unique.values())
-
-    # 3) Persistência
-    saved = 0
-    with get_session() as s:
-        for it in items:
-            pub_dt = None
-            if enrich_dates:
-                # tenta inferir data de publicação da própria página (rápido, timeout curto)
-                pub_dt = infer_published_at(it.get("url", ""))
-
-            m = Mention(
-                termo=term,
-                titulo=it.get("titulo", ""),
-                url=it.get("url", ""),
-                trecho=it.get("trecho", ""),
-                canal=it.get("canal", "Site"),
-                sentimento=it.get("sentimento", "neutro"),
-                tags_csv="",
-                published_at=pub_dt,
-            )
-            s.add(m)
-            saved += 1
-        s.commit()
 
-    print(f"[SEARCH] Salvos {saved} (deduplicados) para '{term}'.")
-    return {"termo": term, "total": saved}
+@app.post("/search/batch", status_code=status.HTTP_202_ACCEPTED)
+def search_batch(payload: SearchBatch, wait: bool = False, response: Response = None):
+    """
+    Vários termos num job só: as consultas à CSE rodam em paralelo, dentro do
+    limite de QPS e da cota diária. O resultado traz inserções, páginas,
+    requisições e erros por termo, e o consumo de cota.
+    """
+    if not [t for t in payload.terms if t and t.strip()]:
+        raise HTTPException(status_code=400, detail="informe ao menos um termo")
+    params = {
+        "terms": payload.terms, "qty": payload.qty, "date_from": payload.date_from,
+        "date_to": payload.date_to, "enrich_dates": payload.enrich_dates,
+    }
+    if wait:
+        response.status_code = status.HTTP_200_OK
+        try:
+            return run_search_many(**params)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    job = jobs.submit("search_many", params)
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/search/quota")
+def search_quota():
+    """Consumo da cota diária da CSE neste processo."""
+    return google_cse.limiter.stats()
+
+
+@app.get("/search/cache")
+def search_cache_info():
+    """Cache das respostas da CSE: entradas, bytes, acertos/faltas, TTL, modo offline."""
+    return cse_cache.info()
+
+
+@app.delete("/search/cache")
+def search_cache_clear():
+    return {"deleted": cse_cache.clear()}
+
+
+# -----------------------------
+# Cache de respostas (GET /mentions, /analytics)
+# -----------------------------
+def _filter_params(f: MentionFilter) -> dict:
+    return {
+        "q": f.q, "q_mode": f.q_mode, "canal": f.canal, "sentimento": f.sentimento, "tag": f.tag,
+        "date_field": f.date_field, "date_from": f.date_from, "date_to": f.date_to,
+    }
+
+
+async def _cached_json(request: Request, params: dict, produce) -> Response:
+    """
+    JSON de `produce(s)` com ETag da versão dos dados: 304 se o cliente já tem
+    essa versão, corpo do cache se outra requisição já a calculou.
+    """
+    version = await run_db(data_version.current)
+    key = response_cache.cache_key(request.url.path, params)
+    tag = response_cache.etag(key, version)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if response_cache.etag_matches(request.headers.get("if-none-match"), tag):
+        response_cache.not_modified()
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    body = response_cache.get(key, version)
+    headers["X-Cache"] = "miss" if body is None else "hit"
+    if body is None:
+        body = JSONResponse(jsonable_encoder(await run_db(produce))).body
+        response_cache.put(key, version, body)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 # -----------------------------
 # Listagem com filtros e paginação
 # -----------------------------
 @app.get("/mentions")
-def list_mentions(
+async def list_mentions(
+    request: Request,
     q: Optional[str] = None,
+    q_mode: str = "fts",  # 'fts' | 'like'
+    order: str = "recent",  # 'recent' | 'relevance' (requer q)
     canal: Optional[str] = None,
     sentimento: Optional[str] = None,
     tag: Optional[str] = None,
     limit: int = 100,
     offset: int = 0,
     page: Optional[int] = None,
+    after_id: Optional[str] = None,  # cursor: próxima página (next_cursor)
+    before_id: Optional[str] = None,  # cursor: página anterior (prev_cursor)
+    with_total: bool = True,
+    estimate_total: bool = False,  # Postgres: total estimado pelo planner
+    with_meta: bool = False,  # inclui `meta` (metadados da página, se enriquecida)
+    collapse: bool = False,  # uma menção por cluster de quase-duplicatas
     date_field: str = "mined",  # 'mined' | 'published'
     date_from: Optional[str] = None,  # 'YYYY-MM-DD'
     date_to: Optional[str] = None,
 ):
+    """
+    Lista menções (id decrescente). Com `after_id`/`before_id` a paginação é
+    por cursor (keyset) e o custo não depende da profundidade; sem eles, segue
+    por `page`/`offset`. `with_total=false` dispensa o count().
+    `collapse=true` mostra só a menção mais antiga de cada história (cluster),
+    com `cluster_size` = quantas menções filtradas o cluster tem.
+    Respostas com ETag e cache em memória (app/services/response_cache.py).
+    """
     limit = max(1, min(int(limit), 100))
     if page is not None and page >= 1:
         offset = (int(page) - 1) * limit
+    try:
+        after = pagination.decode_cursor(after_id) if after_id else None
+        before = pagination.decode_cursor(before_id) if before_id else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    keyset = after is not None or before is not None
+    if keyset and order == "relevance":
+        raise HTTPException(status_code=400, detail="Cursor pagination requires order=recent")
 
-    with get_session() as s:
-        base = select(Mention)
-
-        if q:
-            like = f"%{q}%"
-            base = base.where(
-                (Mention.titulo.like(like)) | (Mention.trecho.like(like))
-            )
+    f = MentionFilter(
+        q=q, q_mode=q_mode, canal=canal, sentimento=sentimento, tag=tag,
+        date_field=date_field, date_from=date_from, date_to=date_to,
+    )
 
-        if canal:
-            base = base.where(Mention.canal == canal)
-
-        if sentimento:
-            base = base.where(Mention.sentimento == sentimento)
-
-        if tag:
-            like = f"%{tag}%"
-            base = base.where(Mention.tags_csv.like(like))
-
-        # Filtro por data, escolhendo campo
-        field_col = Mention.created_at if date_field == "mined" else Mention.published_at
-        if date_from:
-            base = base.where(field_col >= datetime.fromisoformat(date_from + "T00:00:00"))
-        if date_to:
-            base = base.where(field_col <= datetime.fromisoformat(date_to + "T23:59:59"))
-
-        # total
-        total = s.exec(
-            select(sa_func.count()).select_from(base.subquery())
-        ).scalar_one()
-
-        # paginação
-        stmt = base.order_by(Mention.id.desc()).offset(offset).limit(limit)
-        rows = s.exec(stmt).all()
-
-        def to_dict(m: Mention):
-            return {
-                "id": m.id,
-                "termo": m.termo,
-                "titulo": m.titulo,
-                "url": m.url,
-                "trecho": m.trecho,
-                "canal": m.canal,
-                "sentimento": m.sentimento,
-                "tags": m.tags,
-                "created_at": m.created_at.isoformat() + "Z",
-                "published_at": m.published_at.isoformat() + "Z" if m.published_at else None,
-            }
-
-        page_num = (offset // limit) + 1
-        page_count = (total + limit - 1) // limit if total else 1
-
-        return {
-            "items": [to_dict(m) for m in rows],
+    def query(s: Session):
+        conds = filter_conditions(f)
+        base = select(Mention).where(*conds)
+        if collapse:
+            story = analytics_svc.story_key()
+            base = base.where(Mention.id.in_(select(sa_func.min(Mention.id)).where(*conds).group_by(story)))
+
+        # total (opcional; estimado pelo planner quando pedido e suportado)
+        total = None
+        if with_total:
+            if estimate_total:
+                total = pagination.estimated_count(s, base)
+            if total is None:
+                total = pagination.exact_count(s, base)
+
+        cursors = True
+        if keyset:
+            # busca limit+1 para saber se há mais uma página na mesma direção
+            if before is not None:
+                stmt = base.where(Mention.id > before).order_by(Mention.id.asc())
+            else:
+                stmt = base.where(Mention.id < after).order_by(Mention.id.desc())
+            rows = s.exec(stmt.limit(limit + 1)).all()
+            more = len(rows) > limit
+            rows = rows[:limit]
+            if before is not None:
+                rows.reverse()
+                has_prev, has_next = more, True
+            else:
+                has_prev, has_next = True, more
+        else:
+            # paginação (por relevância quando pedido e houver índice full-text)
+            rank = fulltext.rank(q) if q and order == "relevance" and q_mode == "fts" else None
+            if rank is not None:
+                base = base.order_by(rank.desc())
+            # o cursor é por id: não retoma a ordem por relevância
+            cursors = rank is None
+            stmt = base.order_by(Mention.id.desc()).offset(offset).limit(limit + 1)
+            rows = s.exec(stmt).all()
+            has_next = len(rows) > limit
+            rows = rows[:limit]
+            has_prev = offset > 0
+        tags_by_id = tags_svc.tags_for(s, [m.id for m in rows])
+        items = [m.to_dict(tags_by_id.get(m.id)) for m in rows]
+        if collapse and rows:
+            keys = [m.cluster_id or m.id for m in rows]
+            sizes = dict(s.exec(
+                select(story, sa_func.count()).where(*conds, analytics_svc.story_in(keys)).group_by(story)
+            ).all())
+            for it, k in zip(items, keys):
+                it["cluster_size"] = sizes.get(k, 1)
+        if with_meta:
+            meta = page_meta.meta_for(s, [m.url for m in rows])
+            for it in items:
+                it["meta"] = meta.get(it["url"])
+
+        out = {
+            "items": items,
             "total": total,
             "limit": limit,
-            "offset": offset,
-            "page": page_num,
-            "page_count": page_count,
-            "has_prev": page_num > 1,
-            "has_next": page_num < page_count,
+            "has_prev": has_prev,
+            "has_next": has_next,
+            "next_cursor": pagination.encode_cursor(rows[-1].id) if cursors and rows and has_next else None,
+            "prev_cursor": pagination.encode_cursor(rows[0].id) if cursors and rows and has_prev else None,
         }
+        if not keyset:
+            page_num = (offset // limit) + 1
+            out.update({
+                "offset": offset,
+                "page": page_num,
+                "page_count": (total + limit - 1) // limit if total else 1,
+            })
+        return out
+
+    params = {
+        **_filter_params(f), "order": order, "limit": limit,
+        "offset": None if keyset else offset, "after": after, "before": before,
+        "with_total": with_total, "estimate_total": estimate_total,
+        "with_meta": with_meta, "collapse": collapse,
+    }
+    return await _cached_json(request, params, query)
+
+
+@app.get("/mentions/export")
+def export_mentions(
+    format: str = "ndjson",  # 'ndjson' | 'csv'
+    gzip: bool = False,
+    after_id: Optional[int] = None,  # retomada: último id já recebido
+    q: Optional[str] = None,
+    q_mode: str = "fts",
+    canal: Optional[str] = None,
+    sentimento: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_field: str = "mined",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+):
+    """Exporta em streaming todas as menções dos filtros de GET /mentions (id crescente)."""
+    f = MentionFilter(
+        q=q, q_mode=q_mode, canal=canal, sentimento=sentimento, tag=tag,
+        date_field=date_field, date_from=date_from, date_to=date_to,
+    )
+    try:
+        body = export_svc.stream(f, fmt=format, gzip=gzip, after_id=after_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media = "application/x-ndjson" if format == "ndjson" else "text/csv; charset=utf-8"
+    filename = f"mentions.{format}"
+    if gzip:
+        media, filename = "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        body,
+        media_type=media,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/mentions/stream")
+async def stream_mentions(
+    request: Request,
+    q: Optional[str] = None,
+    q_mode: str = "fts",
+    canal: Optional[str] = None,
+    sentimento: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_field: str = "mined",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    last_event_id: Optional[int] = None,  # retomada; o EventSource usa o header Last-Event-ID
+):
+    """
+    Feed ao vivo (Server-Sent Events) das menções novas que casam com os
+    filtros de GET /mentions, com deltas de /analytics por lote. Eventos e
+    retomada em app/services/live.py.
+    """
+    f = MentionFilter(
+        q=q, q_mode=q_mode, canal=canal, sentimento=sentimento, tag=tag,
+        date_field=date_field, date_from=date_from, date_to=date_to,
+    )
+    header = request.headers.get("last-event-id")
+    if last_event_id is None and header:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-ID inválido")
+    try:
+        sub = await live.hub.subscribe(f, last_event_id)
+    except live.HubFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        live.stream(sub, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # -----------------------------
 # Tags (update / delete / bulk)
 # -----------------------------
 @app.patch("/mentions/{mention_id}/tags")
-def update_tags(mention_id: int, payload: TagUpdate):
-    with get_session() as s:
-        m = s.get(Mention, mention_id)
-        if not m:
-            raise HTTPException(status_code=404, detail="Mention not found")
-
-        current = set(m.tags)
-
-        if payload.add:
-            current |= {t.strip() for t in payload.add if t and t.strip()}
+def update_tags(mention_id: int, payload: TagUpdate, s: Session = Depends(db_session)):
+    m = s.get(Mention, mention_id)
+    if not m:
+        raise HTTPException(status_code=404, detail="Mention not found")
 
-        if payload.remove:
-            current -= {t.strip() for t in payload.remove if t and t.strip()}
+    bulk.update_tags_where(s, [Mention.id == mention_id], add=payload.add, remove=payload.remove)
+    s.commit()
 
-        m.set_tags(list(current))
-        s.add(m)
-        s.commit()
-        s.refresh(m)
-
-        return {"id": m.id, "tags": m.tags}
+    return {"id": mention_id, "tags": tags_svc.tags_for(s, [mention_id])[mention_id]}
 
 
 @app.delete("/mentions/{mention_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_mention(mention_id: int):
-    with get_session() as s:
-        m = s.get(Mention, mention_id)
-        if not m:
-            raise HTTPException(status_code=404, detail="Mention not found")
-        s.delete(m)
-        s.commit()
+def delete_mention(mention_id: int, s: Session = Depends(db_session)):
+    if not bulk.delete_by_ids(s, [mention_id]):
+        raise HTTPException(status_code=404, detail="Mention not found")
+    s.commit()
     return  # 204 No Content
 
 
 @app.post("/mentions/bulk_delete")
-def bulk_delete_mentions(payload: BulkDelete):
+def bulk_delete_mentions(payload: BulkDelete, s: Session = Depends(db_session)):
     ids = [i for i in (payload.ids or []) if isinstance(i, int)]
     if not ids:
         raise HTTPException(status_code=400, detail="No IDs provided")
 
-    with get_session() as s:
-        count = 0
-        for mid in ids:
-            m = s.get(Mention, mid)
-            if m:
-                s.delete(m)
-                count += 1
-        s.commit()
+    count = bulk.delete_by_ids(s, ids)
+    s.commit()
+    return {"deleted": count}
+
+
+@app.post("/mentions/bulk_delete_by_filter")
+def bulk_delete_by_filter(payload: BulkDeleteByFilter, s: Session = Depends(db_session)):
+    """Apaga, num único DELETE, todas as menções que casam com os filtros de GET /mentions."""
+    if payload.filter.is_empty() and not payload.confirm_all:
+        raise HTTPException(status_code=400, detail="Empty filter; set confirm_all=true to delete everything")
+
+    count = bulk.delete_by_filter(s, payload.filter)
+    s.commit()
     return {"deleted": count}
 
 
+@app.post("/mentions/bulk_tags")
+def bulk_update_tags(payload: BulkTagUpdate, s: Session = Depends(db_session)):
+    """Adiciona/remove tags em todas as menções de `ids` ou que casam com `filter`."""
+    if not payload.add and not payload.remove:
+        raise HTTPException(status_code=400, detail="Nothing to add or remove")
+    if payload.ids:
+        conds = [Mention.id.in_(payload.ids)]
+    elif payload.filter is not None and not payload.filter.is_empty():
+        conds = filter_conditions(payload.filter)
+    else:
+        raise HTTPException(status_code=400, detail="Provide ids or a non-empty filter")
+
+    res = bulk.update_tags_where(s, conds, add=payload.add, remove=payload.remove)
+    s.commit()
+    return res
+
+
 # -----------------------------
 # Analytics
 # -----------------------------
 @app.get("/analytics")
-def analytics(
+async def analytics(
+    request: Request,
     q: Optional[str] = None,
+    q_mode: str = "fts",  # 'fts' | 'like'
     canal: Optional[str] = None,
     sentimento: Optional[str] = None,
     tag: Optional[str] = None,
     date_from: Optional[str] = None,  # 'YYYY-MM-DD'
     date_to: Optional[str] = None,  # 'YYYY-MM-DD'
     date_field: str = "mined",  # 'mined' | 'published'
+    include: Optional[List[str]] = Query(None),  # ex.: include=total,by_channel
 ):
     """
     Retorna agregados:
@@ -338,108 +613,329 @@ def analytics(
       - by_channel:   [{canal, count}]
       - timeseries_daily: [{date, count}]
       - top_tags:     [{tag, count}]
+    `include` limita a resposta (e as consultas) aos agregados listados.
+    Respostas com ETag e cache em memória, como em /mentions.
     """
+    try:
+        wanted = analytics_svc.parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # coluna de data escolhida
-    field_col = Mention.created_at if date_field == "mined" else Mention.published_at
-
-    with get_session() as s:
-        # base filtrada
-        base = select(Mention)
-
-        if q:
-            like = f"%{q}%"
-            base = base.where(
-                (Mention.titulo.like(like)) | (Mention.trecho.like(like))
-            )
-        if canal:
-            base = base.where(Mention.canal == canal)
-        if sentimento:
-            base = base.where(Mention.sentimento == sentimento)
-        if tag:
-            like = f"%{tag}%"
-            base = base.where(Mention.tags_csv.like(like))
-        if date_from:
-            base = base.where(field_col >= datetime.fromisoformat(date_from + "T00:00:00"))
-        if date_to:
-            base = base.where(field_col <= datetime.fromisoformat(date_to + "T23:59:59"))
-
-        subq = base.subquery()
-        date_col = subq.c.created_at if date_field == "mined" else subq.c.published_at
-
-        # total
-        total = s.exec(select(sa_func.count()).select_from(subq)).scalar_one()
-
-        # por sentimento
-        _by_senti_rows = s.exec(
-            select(subq.c.sentimento, sa_func.count()).select_from(subq).group_by(subq.c.sentimento)
-        ).all()
-        by_sentiment = [
-            {"sentimento": k or "desconhecido", "count": v} for k, v in _by_senti_rows
-        ]
-
-        # por canal
-        _by_channel_rows = s.exec(
-            select(subq.c.canal, sa_func.count()).select_from(subq).group_by(subq.c.canal)
-        ).all()
-        by_channel = [{"canal": k or "desconhecido", "count": v} for k, v in _by_channel_rows]
-
-        # timeseries diária pelo campo escolhido
-        _times = s.exec(
-            select(sa_func.date(date_col), sa_func.count())
-            .select_from(subq)
-            .group_by(sa_func.date(date_col))
-            .order_by(sa_func.date(date_col))
-        ).all()
-        timeseries_daily = [{"date": d, "count": c} for d, c in _times]
-
-        # top tags (contagem em Python a partir do CSV)
-        rows = s.exec(select(subq)).all()
-        tag_counts: Dict[str, int] = {}
-        for m in rows:
-            for t in m.tags:
-                tag_counts[t] = tag_counts.get(t, 0) + 1
-
-        top_tags = sorted(
-            [{"tag": k, "count": v} for k, v in tag_counts.items()],
-            key=lambda x: x["count"],
-            reverse=True,
-        )[:20]
-
-        return {
-            "total": total,
-            "by_sentiment": by_sentiment,
-            "by_channel": by_channel,
-            "timeseries_daily": timeseries_daily,
-            "top_tags": top_tags,
-        }
+    f = MentionFilter(
+        q=q, q_mode=q_mode, canal=canal, sentimento=sentimento, tag=tag,
+        date_field=date_field, date_from=date_from, date_to=date_to,
+    )
+    params = {**_filter_params(f), "include": sorted(wanted)}
+    return await _cached_json(request, params, lambda s: analytics_svc.compute(s, f, wanted))
 
 
 # -----------------------------
 # Enriquecimento de datas em lote
 # -----------------------------
-@app.post("/mentions/enrich_dates")
-def enrich_dates_endpoint(limit: int = 50, only_missing: bool = True):
+@app.post("/mentions/enrich_dates", status_code=status.HTTP_202_ACCEPTED)
+def enrich_dates_endpoint(
+    limit: int = 50,
+    only_missing: bool = True,
+    concurrency: Optional[int] = None,
+    per_host: Optional[int] = None,
+    use_cache: bool = True,
+    wait: bool = False,
+    response: Response = None,
+):
     """
     Enriquecimento em lote: tenta preencher published_at em até `limit` menções.
     Por padrão, processa apenas as que ainda não têm published_at.
+    As URLs são buscadas em paralelo (`concurrency` global, `per_host` por site)
+    e o resultado traz a vazão (urls_per_s) e as falhas agrupadas por causa.
+    Com `use_cache` (padrão), URLs que falharam recentemente não são buscadas de
+    novo e as já extraídas são revalidadas com GET condicional (ETag/Last-Modified).
+    Roda como job de fundo, salvo com `wait=true`.
+    """
+    params = {
+        "limit": limit, "only_missing": only_missing,
+        "concurrency": concurrency, "per_host": per_host, "use_cache": use_cache,
+    }
+    if wait:
+        response.status_code = status.HTTP_200_OK
+        return run_enrich_dates(**params)
+
+    job = jobs.submit("enrich_dates", params)
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/mentions/enrich_dates/cache")
+def enrich_cache_info():
+    """Cache de páginas: entradas, em backoff, por causa e contadores do processo."""
+    return fetch_cache.info()
+
+
+@app.delete("/mentions/enrich_dates/cache")
+def enrich_cache_clear():
+    return {"deleted": fetch_cache.clear()}
+
+
+# -----------------------------
+# Sentimento
+# -----------------------------
+@app.post("/mentions/rescore_sentiment", status_code=status.HTTP_202_ACCEPTED)
+def rescore_sentiment_endpoint(
+    threshold: Optional[float] = None,
+    batch_size: int = 2000,
+    wait: bool = False,
+    response: Response = None,
+):
+    """
+    Recalcula o sentimento de todas as menções (ex.: após mudar o limiar ou o
+    léxico). Os scores vêm do cache por hash do texto; só as menções cujo rótulo
+    mudou são gravadas. Roda como job de fundo, salvo com `wait=true`.
+    """
+    params = {"threshold": threshold, "batch_size": batch_size}
+    if wait:
+        response.status_code = status.HTTP_200_OK
+        return sentiment_svc.rescore_mentions(**params)
+
+    job = jobs.submit("rescore_sentiment", params)
+    return {"job_id": job.id, "status": job.status}
+
+
+# -----------------------------
+# Canais
+# -----------------------------
+@app.get("/channels")
+def list_channels(s: Session = Depends(db_session)):
+    """Nomes de canal para os filtros (tabela de domínios + valores já gravados)."""
+    return {"channels": channels_svc.channel_names(s)}
+
+
+@app.post("/mentions/reclassify_channels", status_code=status.HTTP_202_ACCEPTED)
+def reclassify_channels_endpoint(
+    batch_size: int = 2000,
+    reload_table: bool = True,
+    wait: bool = False,
+    response: Response = None,
+):
+    """
+    Reaplica a tabela domínio -> canal (relida do disco com `reload_table`) a
+    todas as menções; só as que mudaram de canal são gravadas.
+    Roda como job de fundo, salvo com `wait=true`.
+    """
+    params = {"batch_size": batch_size, "reload_table": reload_table}
+    if wait:
+        response.status_code = status.HTTP_200_OK
+        return channels_svc.reclassify_mentions(**params)
+
+    job = jobs.submit("reclassify_channels", params)
+    return {"job_id": job.id, "status": job.status}
+
+
+# -----------------------------
+# Quase-duplicatas
+# -----------------------------
+@app.post("/mentions/recluster", status_code=status.HTTP_202_ACCEPTED)
+def recluster_endpoint(batch_size: int = 2000, wait: bool = False, response: Response = None):
+    """
+    Recalcula SimHash e clusters de quase-duplicatas de todas as menções
+    (após mudar SIMHASH_MAX_DIST ou a normalização de texto).
+    Roda como job de fundo, salvo com `wait=true`.
+    """
+    params = {"batch_size": batch_size}
+    if wait:
+        response.status_code = status.HTTP_200_OK
+        return dedup.recluster(**params)
+
+    job = jobs.submit("recluster", params)
+    return {"job_id": job.id, "status": job.status}
+
+
+# -----------------------------
+# Retenção e arquivo morto
+# -----------------------------
+@app.get("/retention/policies")
+def list_retention_policies(s: Session = Depends(db_session)):
+    rows = s.exec(select(RetentionPolicy).order_by(RetentionPolicy.termo)).all()
+    return {"items": [p.to_dict() for p in rows], "expired": retention.plan(s)}
+
+
+@app.put("/retention/policies")
+def set_retention_policy(payload: RetentionIn, s: Session = Depends(db_session)):
+    """Cria ou altera a política do termo (ou a global, sem `termo`)."""
+    try:
+        pol = retention.set_policy(s, (payload.termo or "").strip(), payload.keep_days)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    s.commit()
+    s.refresh(pol)
+    return pol.to_dict()
+
+
+@app.delete("/retention/policies", status_code=status.HTTP_204_NO_CONTENT)
+def delete_retention_policy(termo: Optional[str] = None, s: Session = Depends(db_session)):
+    pol = s.get(RetentionPolicy, (termo or "").strip())
+    if not pol:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    s.delete(pol)
+    s.commit()
+    return  # 204 No Content
+
+
+@app.post("/archive/run", status_code=status.HTTP_202_ACCEPTED)
+def run_archive_endpoint(dry_run: bool = False, wait: bool = False, response: Response = None):
+    """
+    Aplica as políticas de retenção: meses expirados vão para o arquivo morto
+    e saem do banco. `dry_run=true` só lista o que expiraria.
+    Roda como job de fundo, salvo com `wait=true` (ou `dry_run`).
+    """
+    params = {"dry_run": dry_run}
+    if wait or dry_run:
+        response.status_code = status.HTTP_200_OK
+        return retention.run_archive(**params)
+
+    job = jobs.submit("archive", params)
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/archive")
+def archive_summary(s: Session = Depends(db_session)):
+    """Menções e bytes arquivados por mês e termo."""
+    return retention.summary(s)
+
+
+@app.get("/archive/export")
+def export_archive(
+    format: str = "ndjson",  # 'ndjson' | 'csv'
+    gzip: bool = False,
+    termo: Optional[str] = None,
+    q: Optional[str] = None,  # substring em titulo/trecho
+    canal: Optional[str] = None,
+    sentimento: Optional[str] = None,
+    tag: Optional[str] = None,
+    date_field: str = "mined",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+):
     """
-    with get_session() as s:
-        stmt = select(Mention).order_by(Mention.id.desc())
-        if only_missing:
-            stmt = stmt.where(Mention.published_at.is_(None))
-
-        rows = s.exec(stmt.limit(max(1, min(limit, 500)))).all()
-        if not rows:
-            return {"processed": 0, "updated": 0}
-
-        updated = 0
-        for m in rows:
-            dt = infer_published_at(m.url)
-            if dt:
-                m.published_at = dt
-                s.add(m)
-                updated += 1
-        s.commit()
-
-    return {"processed": len(rows), "updated": updated}
+    Exporta em streaming as menções arquivadas, com os filtros de
+    GET /mentions/export. Com date_field=mined só os meses do intervalo são lidos.
+    """
+    f = MentionFilter(
+        q=q, q_mode="like", canal=canal, sentimento=sentimento, tag=tag,
+        date_field=date_field, date_from=date_from, date_to=date_to,
+    )
+    try:
+        body = export_svc.encode(retention.archived_rows(f, termo), fmt=format, gzip=gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media = "application/x-ndjson" if format == "ndjson" else "text/csv; charset=utf-8"
+    filename = f"mentions-archive.{format}"
+    if gzip:
+        media, filename = "application/gzip", filename + ".gz"
+    return StreamingResponse(
+        body,
+        media_type=media,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# -----------------------------
+# Jobs de fundo
+# -----------------------------
+@app.get("/jobs")
+async def list_jobs(
+    kind: Optional[str] = None,
+    status_: Optional[str] = Query(None, alias="status"),
+    limit: int = 50,
+):
+    def query(s: Session):
+        stmt = select(Job).order_by(Job.id.desc())
+        if kind:
+            stmt = stmt.where(Job.kind == kind)
+        if status_:
+            stmt = stmt.where(Job.status == status_)
+        rows = s.exec(stmt.limit(max(1, min(limit, 200)))).all()
+        return {"items": [jobs.job_to_dict(j) for j in rows]}
+
+    return await run_db(query)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int):
+    def query(s: Session):
+        job = s.get(Job, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return jobs.job_to_dict(job)
+
+    return await run_db(query)
+
+
+# -----------------------------
+# Monitores (buscas agendadas)
+# -----------------------------
+def _check_interval(interval_s: int) -> None:
+    if interval_s < monitors.MIN_INTERVAL_S:
+        raise HTTPException(status_code=400, detail=f"interval_s mínimo: {monitors.MIN_INTERVAL_S}")
+
+
+@app.post("/monitors", status_code=status.HTTP_201_CREATED)
+def create_monitor(payload: MonitorIn, s: Session = Depends(db_session)):
+    term = payload.term.strip()
+    if not term:
+        raise HTTPException(status_code=400, detail="term vazio")
+    _check_interval(payload.interval_s)
+    mon = Monitor(
+        term=term, qty=payload.qty, enrich_dates=payload.enrich_dates,
+        interval_s=payload.interval_s, enabled=payload.enabled,
+        next_run_at=datetime.utcnow(),  # primeira execução no próximo tick
+    )
+    s.add(mon)
+    s.commit()
+    s.refresh(mon)
+    return mon.to_dict()
+
+
+@app.get("/monitors")
+def list_monitors(s: Session = Depends(db_session)):
+    rows = s.exec(select(Monitor).order_by(Monitor.id)).all()
+    return {"items": [m.to_dict() for m in rows]}
+
+
+@app.patch("/monitors/{monitor_id}")
+def update_monitor(monitor_id: int, payload: MonitorPatch, s: Session = Depends(db_session)):
+    mon = s.get(Monitor, monitor_id)
+    if not mon:
+        raise HTTPException(status_code=404, detail="Monitor not found")
+    if payload.interval_s is not None:
+        _check_interval(payload.interval_s)
+        mon.interval_s = payload.interval_s
+        mon.next_run_at = monitors.next_run(mon.interval_s, mon.last_run_at)
+    for field in ("qty", "enrich_dates", "enabled"):
+        value = getattr(payload, field)
+        if value is not None:
+            setattr(mon, field, value)
+    s.add(mon)
+    s.commit()
+    s.refresh(mon)
+    return mon.to_dict()
+
+
+@app.delete("/monitors/{monitor_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_monitor(monitor_id: int, s: Session = Depends(db_session)):
+    mon = s.get(Monitor, monitor_id)
+    if not mon:
+        raise HTTPException(status_code=404, detail="Monitor not found")
+    s.delete(mon)
+    s.commit()
+    return  # 204 No Content
+
+
+@app.post("/monitors/{monitor_id}/run", status_code=status.HTTP_202_ACCEPTED)
+def run_monitor_now(monitor_id: int, s: Session = Depends(db_session)):
+    """Executa o monitor agora (incremental) e reagenda a partir deste momento."""
+    mon = s.get(Monitor, monitor_id)
+    if not mon:
+        raise HTTPException(status_code=404, detail="Monitor not found")
+    job = monitors.enqueue(mon, s)
+    if job is None:
+        raise HTTPException(status_code=409, detail="monitor já foi enfileirado")
+    return {"job_id": job.id, "status": job.status}
@@ -0,0 +1,157 @@
+# app/migrations.py
+"""
+Migrações leves e idempotentes, executadas por init_db() depois do create_all.
+create_all só cria tabelas novas; índices e colunas acrescentados a tabelas já
+existentes precisam ser aplicados aqui. Cada passo deve poder rodar várias vezes
+(e funcionar em Postgres e SQLite).
+"""
+from sqlalchemy import bindparam, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlmodel import Session
+
+from app.db import dialect_insert
+from app.models import Mention, MentionTag
+from app.services import bulk, data_version, dedup, fulltext, rollups
+from app.urlnorm import canonicalize
+
+
+def _has_index(conn: Connection, table: str, name: str) -> bool:
+    return any(ix["name"] == name for ix in inspect(conn).get_indexes(table))
+
+
+def _has_column(conn: Connection, table: str, name: str) -> bool:
+    return any(c["name"] == name for c in inspect(conn).get_columns(table))
+
+
+def _unique_termo_url(conn: Connection) -> None:
+    if any(_has_index(conn, "mention", n) for n in ("uq_mention_termo_url", "uq_mention_termo_canon")):
+        return
+    # mantém a menção mais antiga de cada (termo, url) antes de criar o índice único
+    conn.execute(text(
+        "DELETE FROM mention WHERE id NOT IN ("
+        " SELECT MIN(id) FROM mention GROUP BY termo, url)"
+    ))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX uq_mention_termo_url ON mention (termo, url)"
+    ))
+
+
+def _tags_csv_to_mention_tag(conn: Connection) -> None:
+    # move tags_csv (legado) para mention_tag e esvazia a coluna já migrada
+    rows = conn.execute(text(
+        "SELECT id, tags_csv FROM mention WHERE tags_csv IS NOT NULL AND tags_csv <> ''"
+    )).all()
+    if not rows:
+        return
+    pairs = {
+        (mid, t.strip())
+        for mid, csv in rows
+        for t in csv.split(",")
+        if t.strip()
+    }
+    insert = dialect_insert(conn)
+    if pairs:
+        conn.execute(
+            insert(MentionTag).on_conflict_do_nothing(index_elements=["mention_id", "tag"]),
+            [{"mention_id": mid, "tag": t} for mid, t in sorted(pairs)],
+        )
+    conn.execute(text("UPDATE mention SET tags_csv = '' WHERE tags_csv <> ''"))
+    print(f"[MIGRATE] {len(pairs)} tag(s) de {len(rows)} menção(ões) migradas para mention_tag")
+
+
+def _build_rollups(conn: Connection) -> None:
+    # primeira carga de mention_daily em bancos que já têm menções
+    if conn.execute(text("SELECT 1 FROM mention_daily LIMIT 1")).first():
+        return
+    if not conn.execute(text("SELECT 1 FROM mention LIMIT 1")).first():
+        return
+    with Session(bind=conn) as s:
+        n = rollups.rebuild(s)
+    print(f"[MIGRATE] {n} linha(s) de rollup diário geradas")
+
+
+def _canonical_urls(conn: Connection) -> None:
+    """
+    Colunas url_canonical/simhash/cluster_id, unicidade por (termo, url_canonical)
+    no lugar de (termo, url) e clusters de quase-duplicatas das menções antigas.
+    """
+    for col, ddl in (
+        ("url_canonical", "VARCHAR NOT NULL DEFAULT ''"),
+        ("simhash", "BIGINT"),
+        ("cluster_id", "INTEGER"),
+    ):
+        if not _has_column(conn, "mention", col):
+            conn.execute(text(f"ALTER TABLE mention ADD COLUMN {col} {ddl}"))
+    if not _has_index(conn, "mention", "ix_mention_cluster_id"):
+        conn.execute(text("CREATE INDEX ix_mention_cluster_id ON mention (cluster_id)"))
+
+    if not _has_index(conn, "mention", "uq_mention_termo_canon"):
+        rows = conn.execute(text("SELECT id, url FROM mention WHERE url_canonical = ''")).all()
+        if rows:
+            conn.execute(
+                text("UPDATE mention SET url_canonical = :c WHERE id = :id").bindparams(
+                    bindparam("c"), bindparam("id")
+                ),
+                [{"id": mid, "c": canonicalize(url)} for mid, url in rows],
+            )
+        # variantes da mesma URL: fica a menção mais antiga, com as tags de todas
+        groups = conn.execute(text(
+            "SELECT MIN(id) FROM mention GROUP BY termo, url_canonical HAVING COUNT(*) > 1"
+        )).scalars().all()
+        dropped = []
+        insert = dialect_insert(conn)
+        for keep in groups:
+            drop = conn.execute(text(
+                "SELECT m.id FROM mention m JOIN mention k ON k.id = :keep"
+                " WHERE m.termo = k.termo AND m.url_canonical = k.url_canonical AND m.id <> :keep"
+            ), {"keep": keep}).scalars().all()
+            conn.execute(
+                insert(MentionTag).from_select(
+                    ["mention_id", "tag"],
+                    select(bindparam("keep", keep), MentionTag.tag).where(MentionTag.mention_id.in_(drop)),
+                ).on_conflict_do_nothing(index_elements=["mention_id", "tag"])
+            )
+            dropped += drop
+        if dropped:
+            with Session(bind=conn) as s:
+                bulk.delete_by_ids(s, dropped)
+                # tags transferidas para a menção mantida entram nos rollups
+                rollups.rebuild(s)
+        conn.execute(text(
+            "CREATE UNIQUE INDEX uq_mention_termo_canon ON mention (termo, url_canonical)"
+        ))
+        print(f"[MIGRATE] url_canonical: {len(rows)} preenchida(s), {len(dropped)} variante(s) removida(s)")
+    if _has_index(conn, "mention", "uq_mention_termo_url"):
+        conn.execute(text("DROP INDEX uq_mention_termo_url"))
+
+    pending = conn.execute(text("SELECT id FROM mention WHERE simhash IS NULL ORDER BY id")).scalars().all()
+    if pending:
+        with Session(bind=conn) as s:
+            joined = dedup.assign(s, pending)
+        print(f"[MIGRATE] simhash: {len(pending)} menção(ões), {joined} em clusters existentes")
+
+
+def _mention_indexes(conn: Connection) -> None:
+    # índices declarados em Mention.__table_args__ que a tabela ainda não tem
+    existing = {ix["name"] for ix in inspect(conn).get_indexes("mention")}
+    for ix in Mention.__table__.indexes:
+        if ix.name not in existing:
+            ix.create(conn)
+            print(f"[MIGRATE] índice {ix.name} criado")
+
+
+STEPS = [
+    _unique_termo_url,
+    _tags_csv_to_mention_tag,
+    fulltext.create_index,
+    _build_rollups,
+    _canonical_urls,
+    _mention_indexes,
+    data_version.ensure_row,
+]
+
+
+def run_migrations(engine) -> None:
+    with engine.begin() as conn:
+        for step in STEPS:
+            step(conn)
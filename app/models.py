@@ -1,22 +1,260 @@
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from typing import List, Optional
+from sqlalchemy import BigInteger, Column, Index, text
 from sqlmodel import SQLModel, Field
 
 class Mention(SQLModel, table=True):
+    __table_args__ = (
+        # um mesmo termo não guarda a mesma URL duas vezes (upsert na ingestão),
+        # comparando a forma canônica (app/urlnorm.py)
+        Index("uq_mention_termo_canon", "termo", "url_canonical", unique=True),
+        # filtros de /mentions, /analytics e operações em lote; a listagem é
+        # por id decrescente, então o id fecha os índices de igualdade e o
+        # LIMIT para cedo (conferidos por app/services/plans.py)
+        Index("ix_mention_canal_id", "canal", "id"),
+        Index("ix_mention_canal_sent_id", "canal", "sentimento", "id"),
+        Index("ix_mention_sent_id", "sentimento", "id"),
+        Index("ix_mention_created_at", "created_at"),
+        Index("ix_mention_published_at", "published_at"),
+        # fila de enriquecimento: só as menções ainda sem data de publicação
+        Index(
+            "ix_mention_pending_enrich", "id",
+            sqlite_where=text("published_at IS NULL"),
+            postgresql_where=text("published_at IS NULL"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     termo: str
     titulo: str
     url: str
+    url_canonical: str = ""
     trecho: str
     canal: str
     sentimento: str
-    tags_csv: str = ""
+    tags_csv: str = ""  # legado: migrado para MentionTag (ver app/migrations.py)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     published_at: Optional[datetime] = None  
+    # quase-duplicatas (app/services/dedup.py): SimHash de titulo+trecho e
+    # id da menção que abriu o cluster da história
+    simhash: Optional[int] = Field(default=None, sa_column=Column(BigInteger))
+    cluster_id: Optional[int] = Field(default=None, index=True)
+
+    def to_dict(self, tags: Optional[List[str]] = None) -> dict:
+        return {
+            "id": self.id,
+            "termo": self.termo,
+            "titulo": self.titulo,
+            "url": self.url,
+            "trecho": self.trecho,
+            "canal": self.canal,
+            "sentimento": self.sentimento,
+            "tags": tags or [],
+            "created_at": self.created_at.isoformat() + "Z",
+            "published_at": self.published_at.isoformat() + "Z" if self.published_at else None,
+            "cluster_id": self.cluster_id,
+        }
+
+
+class MentionTag(SQLModel, table=True):
+    """Tags normalizadas: uma linha por (menção, tag)."""
+    __tablename__ = "mention_tag"
+    __table_args__ = (
+        # filtro por tag e top tags (GROUP BY tag) sem varrer mention
+        Index("ix_mention_tag_tag", "tag", "mention_id"),
+    )
+
+    mention_id: int = Field(foreign_key="mention.id", primary_key=True)
+    tag: str = Field(primary_key=True)
+
+
+class Job(SQLModel, table=True):
+    """Tarefa de fundo (busca/enriquecimento) executada pelo pool de workers."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str                       # ver HANDLERS em app/services/jobs.py
+    status: str = "queued"          # 'queued' | 'running' | 'done' | 'error'
+    params_json: str = "{}"
+    stage: Optional[str] = None     # etapa corrente
+    progress_done: int = 0
+    progress_total: int = 0
+    stages_json: str = "{}"         # {etapa: segundos}
+    result_json: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class MentionDaily(SQLModel, table=True):
+    """
+    Rollup diário para o /analytics: contagem de menções por
+    (campo de data, dia, termo, canal, sentimento, tag).
+    tag = '' conta todas as menções; tag = 'x' só as que têm a tag 'x'.
+    Mantido por app/services/rollups.py.
+    """
+    __tablename__ = "mention_daily"
+
+    date_field: str = Field(primary_key=True)  # 'mined' | 'published'
+    day: date = Field(primary_key=True)
+    termo: str = Field(primary_key=True)
+    canal: str = Field(primary_key=True)
+    sentimento: str = Field(primary_key=True)
+    tag: str = Field(default="", primary_key=True)
+    n: int = 0
+
+
+class SentimentCache(SQLModel, table=True):
+    """Cache persistente do score VADER (compound) por hash do texto."""
+    __tablename__ = "sentiment_cache"
+
+    text_hash: str = Field(primary_key=True)  # sha1(versão do léxico + texto)
+    compound: float
+
+
+class Monitor(SQLModel, table=True):
+    """Termo salvo, buscado periodicamente pelo agendador (app/services/monitors.py)."""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    term: str
+    qty: Optional[int] = None          # máximo de resultados por execução
+    enrich_dates: bool = False
+    interval_s: int = 3600
+    enabled: bool = True
+    next_run_at: Optional[datetime] = Field(default=None, index=True)
+    last_run_at: Optional[datetime] = None   # início da última execução concluída
+    last_job_id: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        def iso(dt):
+            return dt.isoformat() + "Z" if dt else None
+        return {
+            "id": self.id,
+            "term": self.term,
+            "qty": self.qty,
+            "enrich_dates": self.enrich_dates,
+            "interval_s": self.interval_s,
+            "enabled": self.enabled,
+            "next_run_at": iso(self.next_run_at),
+            "last_run_at": iso(self.last_run_at),
+            "last_job_id": self.last_job_id,
+            "created_at": iso(self.created_at),
+        }
+
+
+class PageFetch(SQLModel, table=True):
+    """
+    Cache de busca de páginas do enriquecimento (app/services/fetch_cache.py):
+    validadores HTTP e a última extração por URL, com backoff para falhas.
+    """
+    __tablename__ = "page_fetch"
+
+    url: str = Field(primary_key=True)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    published_at: Optional[datetime] = None
+    cause: str = "ok"                       # causa da última tentativa (ver infer_published_at_detailed)
+    fails: int = 0                          # falhas consecutivas
+    retry_after: Optional[datetime] = None  # não buscar de novo antes disso
+    fetched_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class PageMeta(SQLModel, table=True):
+    """Metadados da página de uma URL, extraídos no enriquecimento (app/extract.py)."""
+    __tablename__ = "page_meta"
+
+    url: str = Field(primary_key=True)
+    canonical_url: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    author: Optional[str] = None
+    lang: Optional[str] = None
+    site_name: Optional[str] = None
+    excerpt: Optional[str] = None
+    fetched_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "canonical_url": self.canonical_url,
+            "title": self.title,
+            "description": self.description,
+            "author": self.author,
+            "lang": self.lang,
+            "site_name": self.site_name,
+            "excerpt": self.excerpt,
+        }
+
+
+class SimhashBand(SQLModel, table=True):
+    """Faixas do SimHash de cada menção, para achar candidatos a quase-duplicata."""
+    __tablename__ = "simhash_band"
+
+    band: int = Field(primary_key=True)
+    value: int = Field(primary_key=True)
+    mention_id: int = Field(primary_key=True, index=True)
+
+
+class RetentionPolicy(SQLModel, table=True):
+    """
+    Retenção de menções (app/services/retention.py): meses inteiros mais antigos
+    que keep_days vão para o arquivo. termo = '' é a política global, usada
+    pelos termos sem política própria.
+    """
+    __tablename__ = "retention_policy"
+
+    termo: str = Field(default="", primary_key=True)
+    keep_days: int
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "termo": self.termo or None,
+            "keep_days": self.keep_days,
+            "updated_at": self.updated_at.isoformat() + "Z",
+        }
+
+
+class ArchiveSegment(SQLModel, table=True):
+    """
+    Trecho do arquivo morto: um membro gzip de NDJSON com menções de um termo
+    e mês (created_at), gravado em `path` a partir do byte `offset`. Só os
+    segmentos registrados aqui são lidos (um membro gravado sem o registro,
+    por queda no meio do arquivamento, é ignorado).
+    """
+    __tablename__ = "archive_segment"
+    __table_args__ = (Index("ix_archive_segment_month_termo", "month", "termo"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    month: str                      # 'YYYY-MM'
+    termo: str
+    path: str                       # relativo a ARCHIVE_DIR
+    offset: int
+    length: int
+    rows: int
+    min_id: int
+    max_id: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "month": self.month,
+            "termo": self.termo,
+            "path": self.path,
+            "rows": self.rows,
+            "bytes": self.length,
+            "min_id": self.min_id,
+            "max_id": self.max_id,
+            "created_at": self.created_at.isoformat() + "Z",
+        }
+
 
-    @property
-    def tags(self) -> List[str]:
-        return [t for t in self.tags_csv.split(",") if t.strip()] if self.tags_csv else []
+class DataVersion(SQLModel, table=True):
+    """
+    Contador de versão dos dados de menções (linha única, id = 1). Sobe a cada
+    commit que altera mention/mention_tag/mention_daily/page_meta
+    (app/services/data_version.py); invalida o cache de respostas.
+    """
+    __tablename__ = "data_version"
 
-    def set_tags(self, tags: List[str]):
-        self.tags_csv = ",".join(sorted(set([t.strip() for t in tags if t.strip()])))
+    id: int = Field(default=1, primary_key=True)
+    version: int = 0
@@ -0,0 +1,129 @@
+# app/services/analytics.py
+"""
+Agregados do dashboard (/analytics). Sem texto livre (q), saem dos rollups
+diários (app/services/rollups.py). Com q, são calculados numa única varredura:
+um GROUP BY pelas dimensões pedidas (sentimento, canal, dia) cujas linhas são
+somadas em Python para o total e cada quebra. O top de tags é um GROUP BY
+em mention_tag sobre os mesmos ids filtrados.
+
+`stories` (só quando pedido) conta histórias distintas: menções do mesmo
+cluster de quase-duplicatas (app/services/dedup.py) contam uma vez.
+"""
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func as sa_func, or_
+from sqlmodel import select
+
+from app.filters import MentionFilter, date_column, filter_conditions
+from app.models import Mention
+from app.services import rollups
+from app.services import tags as tags_svc
+
+AGGREGATES = ("total", "by_sentiment", "by_channel", "timeseries_daily", "top_tags")
+# fora do padrão: exigem varredura das menções brutas
+OPTIONAL = ("stories",)
+
+
+def parse_include(include: Optional[Iterable[str]]) -> List[str]:
+    """Aceita ['a', 'b'] ou ['a,b']; vazio = todos os agregados."""
+    wanted = []
+    for item in include or []:
+        wanted += [p.strip() for p in item.split(",") if p.strip()]
+    unknown = set(wanted) - set(AGGREGATES + OPTIONAL)
+    if unknown:
+        raise ValueError(f"include inválido: {', '.join(sorted(unknown))}")
+    return [a for a in AGGREGATES + OPTIONAL if a in wanted] if wanted else list(AGGREGATES)
+
+
+def story_key():
+    # menções ainda sem cluster contam como histórias próprias
+    return sa_func.coalesce(Mention.cluster_id, Mention.id)
+
+
+def story_in(keys: List[int]):
+    # mesmo que story_key().in_(keys), mas atendido pelo índice de cluster_id
+    return or_(
+        Mention.cluster_id.in_(keys),
+        and_(Mention.cluster_id.is_(None), Mention.id.in_(keys)),
+    )
+
+
+def _stories(s, f: MentionFilter) -> int:
+    return s.exec(
+        select(sa_func.count(sa_func.distinct(story_key()))).where(*filter_conditions(f))
+    ).one()
+
+
+def compute(
+    s,
+    f: MentionFilter,
+    include: Optional[List[str]] = None,
+    top_n: int = 20,
+    use_rollups: bool = True,
+) -> Dict:
+    include = include or list(AGGREGATES)
+    if "stories" in include:
+        rest = [a for a in include if a != "stories"]
+        out = compute(s, f, rest, top_n=top_n, use_rollups=use_rollups) if rest else {}
+        out["stories"] = _stories(s, f)
+        return {k: out[k] for k in include}
+    if use_rollups and rollups.can_answer(f):
+        out = rollups.compute(s, f, include, top_n=top_n)
+        if "top_tags" in include and "top_tags" not in out:
+            # co-ocorrência de tags com o filtro por tag: só nas menções brutas
+            out["top_tags"] = tags_svc.top_tags(
+                s, select(Mention.id).where(*filter_conditions(f)), limit=top_n
+            )
+        return {k: out[k] for k in include}
+
+    conds = filter_conditions(f)
+
+    dims = []
+    if "by_sentiment" in include:
+        dims.append(Mention.sentimento.label("sentimento"))
+    if "by_channel" in include:
+        dims.append(Mention.canal.label("canal"))
+    if "timeseries_daily" in include:
+        dims.append(sa_func.date(date_column(f.date_field)).label("day"))
+
+    out: Dict = {}
+    if dims or "total" in include:
+        if dims:
+            stmt = select(*dims, sa_func.count().label("n")).where(*conds).group_by(*dims)
+            rows = s.exec(stmt).all()
+        else:
+            rows = [(s.exec(select(sa_func.count()).select_from(Mention).where(*conds)).one(),)]
+
+        total = 0
+        senti: Counter = Counter()
+        canal: Counter = Counter()
+        days: Counter = Counter()
+        for r in rows:
+            n = r[-1]
+            total += n
+            if "by_sentiment" in include:
+                senti[r.sentimento] += n
+            if "by_channel" in include:
+                canal[r.canal] += n
+            if "timeseries_daily" in include:
+                days[r.day] += n
+
+        if "total" in include:
+            out["total"] = total
+        if "by_sentiment" in include:
+            out["by_sentiment"] = [
+                {"sentimento": k or "desconhecido", "count": v} for k, v in senti.items()
+            ]
+        if "by_channel" in include:
+            out["by_channel"] = [{"canal": k or "desconhecido", "count": v} for k, v in canal.items()]
+        if "timeseries_daily" in include:
+            out["timeseries_daily"] = [
+                {"date": d, "count": c}
+                for d, c in sorted(days.items(), key=lambda kv: (kv[0] is not None, str(kv[0])))
+            ]
+
+    if "top_tags" in include:
+        out["top_tags"] = tags_svc.top_tags(s, select(Mention.id).where(*conds), limit=top_n)
+
+    return out
@@ -0,0 +1,101 @@
+# app/services/bulk.py
+"""
+Operações em lote sobre menções, feitas com comandos set-based
+(DELETE/UPDATE ... WHERE) em vez de um s.get + s.delete por id.
+Nenhuma função faz commit; quem chama controla a transação.
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, update
+from sqlmodel import select
+
+from app.filters import MentionFilter, filter_conditions
+from app.models import Mention
+from app.services import dedup, rollups, tags
+
+# ids por DELETE ... WHERE id IN (...) (limite de parâmetros do SQLite/driver)
+ID_CHUNK = 500
+
+
+def delete_by_ids(s, ids: List[int]) -> int:
+    deleted = 0
+    ids = list(dict.fromkeys(ids))
+    for i in range(0, len(ids), ID_CHUNK):
+        chunk = ids[i:i + ID_CHUNK]
+        rollups.apply(s, chunk, -1)
+        tags.delete_tags_of(s, chunk)
+        dedup.delete_bands_of(s, chunk)
+        res = s.execute(
+            delete(Mention).where(Mention.id.in_(chunk)),
+            execution_options={"synchronize_session": False},
+        )
+        deleted += res.rowcount or 0
+    return deleted
+
+
+def delete_by_filter(s, f: MentionFilter) -> int:
+    # os ids são resolvidos antes: o filtro por tag depende de mention_tag,
+    # que é apagada junto com as menções
+    ids = s.exec(select(Mention.id).where(*filter_conditions(f))).all()
+    return delete_by_ids(s, ids)
+
+
+def update_tags_where(
+    s,
+    conds: List,
+    add: Optional[List[str]] = None,
+    remove: Optional[List[str]] = None,
+) -> Dict:
+    """
+    Adiciona/remove tags em todas as menções que satisfazem `conds`:
+    um INSERT ... SELECT por tag adicionada e um DELETE para as removidas.
+    """
+    ids = s.exec(select(Mention.id).where(*conds)).all()
+    rollups.apply(s, ids, -1, base=False)
+    added = tags.add_tags_where(s, conds, add or [])
+    removed = tags.remove_tags_where(s, conds, remove or [])
+    rollups.apply(s, ids, +1, base=False)
+    return {"added": added, "removed": removed}
+
+
+def relabel_batch(
+    s,
+    column: str,
+    inputs: Sequence,
+    fn: Callable[[List], List],
+    after_id: int,
+    limit: int,
+) -> Tuple[Optional[int], int, int]:
+    """
+    Recalcula a coluna `column` (ex.: sentimento, canal) de até `limit` menções
+    com id > after_id. `fn` recebe as linhas (id, *inputs) e devolve os novos
+    valores na mesma ordem; só as que mudaram são gravadas (UPDATE executemany),
+    com os rollups ajustados. Devolve (último id lido ou None, lidas, alteradas).
+    """
+    rows = s.exec(
+        select(Mention.id, getattr(Mention, column), *inputs)
+        .where(Mention.id > after_id)
+        .order_by(Mention.id)
+        .limit(limit)
+    ).all()
+    if not rows:
+        return None, 0, 0
+
+    new_values = fn([(r[0], *r[2:]) for r in rows])
+    diff = [
+        {"_id": r[0], "_value": new}
+        for r, new in zip(rows, new_values)
+        if new != r[1]
+    ]
+    if diff:
+        table = Mention.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("_id"))
+            .values({column: bindparam("_value")})
+        )
+        ids = [d["_id"] for d in diff]
+        rollups.apply(s, ids, -1)
+        s.connection().execute(stmt, diff)
+        rollups.apply(s, ids, +1)
+    return rows[-1][0], len(rows), len(diff)
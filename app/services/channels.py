@@ -0,0 +1,54 @@
+# app/services/channels.py
+"""
+Reclassificação em lote do canal das menções salvas, depois de mudar a tabela
+de domínios (app/channels.json / CHANNELS_EXTRA_FILE). Mesmo padrão do
+re-score de sentimento: lotes por id, só grava o que mudou, rollups em dia.
+"""
+from typing import Dict, List
+
+from sqlalchemy import func as sa_func
+from sqlmodel import select
+
+from app import channels
+from app.db import get_session
+from app.models import Mention
+from app.services import bulk
+from app.services.jobs import register
+
+
+def channel_names(s) -> List[str]:
+    """Canais da tabela mais os já gravados (menções de tabelas anteriores), para os filtros."""
+    stored = s.exec(select(Mention.canal).where(Mention.canal.is_not(None)).distinct()).all()
+    return sorted(set(channels.names()) | set(stored))
+
+
+@register("reclassify_channels")
+def reclassify_mentions(batch_size: int = 2000, reload_table: bool = True, job=None) -> Dict:
+    batch_size = max(100, min(int(batch_size), 20000))
+    domains = channels.reload() if reload_table else None
+    with get_session() as s:
+        total = s.exec(select(sa_func.count()).select_from(Mention)).one()
+
+    def relabel(rows):
+        return [channels.classify_channel(url) for _, url in rows]
+
+    processed = changed = 0
+    last_id = 0
+    while True:
+        with get_session() as s:
+            last_id, n, c = bulk.relabel_batch(
+                s, "canal", (Mention.url,), relabel, last_id, batch_size
+            )
+            if last_id is None:
+                break
+            s.commit()
+        processed += n
+        changed += c
+        if job is not None:
+            job.progress(processed, total)
+
+    print(f"[CHANNELS] reclassificação: {processed} menções, {changed} alteradas")
+    out = {"processed": processed, "changed": changed}
+    if domains is not None:
+        out["domains"] = domains
+    return out
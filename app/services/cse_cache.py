@@ -0,0 +1,139 @@
+# app/services/cse_cache.py
+"""
+Cache em disco das respostas da Custom Search API.
+
+Chave: sha1 dos parâmetros da chamada (q, start, num, sort, cx, hl, gl, ...),
+sem a API key. Valor: o JSON da resposta comprimido (zlib). O armazenamento é
+um arquivo SQLite próprio (CSE_CACHE_PATH), separado do banco da aplicação.
+
+- TTL (CSE_CACHE_TTL_S): entradas mais velhas contam como 'stale' e são
+  rebuscadas.
+- Tamanho limitado (CSE_CACHE_MAX_ENTRIES): ao passar do limite, saem as
+  menos usadas recentemente (coluna used_at).
+- Modo offline (CSE_OFFLINE=1): só responde do cache, ignorando o TTL, e não
+  exige API key; uma chamada sem resposta salva falha. Serve para reexecutar
+  buscas já feitas e medir a ingestão sem rede.
+- CSE_CACHE_PATH vazio desliga o cache.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+CSE_CACHE_PATH = os.getenv("CSE_CACHE_PATH", "cse_cache.sqlite")
+CSE_CACHE_TTL_S = int(os.getenv("CSE_CACHE_TTL_S", str(6 * 3600)))
+CSE_CACHE_MAX_ENTRIES = int(os.getenv("CSE_CACHE_MAX_ENTRIES", "20000"))
+OFFLINE = os.getenv("CSE_OFFLINE", "").lower() in ("1", "true", "yes")
+
+# parâmetros que não mudam a resposta
+_IGNORED = {"key", "fields"}
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+stats = {"hits": 0, "misses": 0, "stale": 0, "writes": 0, "evictions": 0}
+
+
+def enabled() -> bool:
+    return bool(CSE_CACHE_PATH)
+
+
+def _db() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(CSE_CACHE_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS cse_response ("
+            " key TEXT PRIMARY KEY, params TEXT NOT NULL, body BLOB NOT NULL,"
+            " fetched_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS ix_cse_response_used_at ON cse_response (used_at)")
+    return _conn
+
+
+def cache_key(params: Dict) -> str:
+    clean = {k: str(v) for k, v in params.items() if k not in _IGNORED and v is not None}
+    return hashlib.sha1(json.dumps(clean, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get(params: Dict, max_age: Optional[float] = None) -> Optional[Dict]:
+    """
+    Resposta em cache para `params`, ou None (ausente ou vencida). `max_age`
+    (segundos) encurta o TTL para esta leitura; 0 sempre rebusca.
+    """
+    if not enabled():
+        return None
+    key = cache_key(params)
+    now = time.time()
+    with _lock:
+        row = _db().execute(
+            "SELECT body, fetched_at FROM cse_response WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            stats["misses"] += 1
+            return None
+        body, fetched_at = row
+        ttl = CSE_CACHE_TTL_S if max_age is None else min(CSE_CACHE_TTL_S, max_age)
+        if not OFFLINE and now - fetched_at > ttl:
+            stats["stale"] += 1
+            return None
+        _db().execute("UPDATE cse_response SET used_at = ? WHERE key = ?", (now, key))
+        stats["hits"] += 1
+    return json.loads(zlib.decompress(body))
+
+
+def put(params: Dict, data: Dict) -> None:
+    if not enabled():
+        return
+    key = cache_key(params)
+    clean = {k: v for k, v in params.items() if k not in _IGNORED}
+    body = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+    now = time.time()
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT INTO cse_response (key, params, body, fetched_at, used_at) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET body = excluded.body,"
+            " fetched_at = excluded.fetched_at, used_at = excluded.used_at",
+            (key, json.dumps(clean, sort_keys=True), body, now, now),
+        )
+        stats["writes"] += 1
+        count = db.execute("SELECT COUNT(*) FROM cse_response").fetchone()[0]
+        excess = count - CSE_CACHE_MAX_ENTRIES
+        if excess > 0:
+            db.execute(
+                "DELETE FROM cse_response WHERE key IN"
+                " (SELECT key FROM cse_response ORDER BY used_at LIMIT ?)",
+                (excess,),
+            )
+            stats["evictions"] += excess
+
+
+def clear() -> int:
+    if not enabled():
+        return 0
+    with _lock:
+        return _db().execute("DELETE FROM cse_response").rowcount
+
+
+def info() -> Dict:
+    out = {
+        "enabled": enabled(),
+        "offline": OFFLINE,
+        "ttl_s": CSE_CACHE_TTL_S,
+        "max_entries": CSE_CACHE_MAX_ENTRIES,
+        **stats,
+    }
+    if enabled():
+        with _lock:
+            n, size = _db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM cse_response"
+            ).fetchone()
+        out.update(entries=n, bytes=size)
+        lookups = stats["hits"] + stats["misses"] + stats["stale"]
+        out["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    return out
@@ -0,0 +1,68 @@
+# app/services/data_version.py
+"""
+Versão dos dados de menções, para invalidar o cache de respostas
+(app/services/response_cache.py).
+
+Em vez de cada caminho de escrita (busca, tags, exclusão, enriquecimento,
+rescore, recluster, arquivamento, migrações, ...) lembrar de avisar o cache,
+a escrita é detectada no próprio engine: um INSERT/UPDATE/DELETE em uma das
+tabelas de WATCHED marca a conexão, e o commit dessa transação incrementa
+data_version.version antes de gravar. O incremento vai na mesma transação que
+os dados, então a versão nova nunca fica visível antes deles, e um rollback
+desfaz os dois.
+
+A versão mora no banco (não na memória do processo), então vale também com
+vários workers e para escritas de scripts (python -m app.services.dedup ...).
+"""
+import re
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlmodel import select
+
+from app.models import DataVersion
+
+# tabelas lidas por GET /mentions e GET /analytics
+WATCHED = {"mention", "mention_tag", "mention_daily", "page_meta"}
+
+_DML_RE = re.compile(r'^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?', re.I)
+_DIRTY = "data_version_dirty"
+_BUMP_SQL = "UPDATE data_version SET version = version + 1 WHERE id = 1"
+
+
+def writes_watched(statement: str) -> bool:
+    m = _DML_RE.match(statement)
+    return bool(m) and m.group(1).lower() in WATCHED
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _track_writes(conn, cursor, statement, parameters, context, executemany):
+    if not conn.info.get(_DIRTY) and writes_watched(statement):
+        conn.info[_DIRTY] = True
+
+
+@event.listens_for(Engine, "commit")
+def _bump_on_commit(conn):
+    # roda antes do COMMIT do driver; cursor cru para não reentrar nos eventos
+    if conn.info.pop(_DIRTY, False):
+        cur = conn.connection.cursor()
+        try:
+            cur.execute(_BUMP_SQL)
+        finally:
+            cur.close()
+
+
+@event.listens_for(Engine, "rollback")
+def _discard_on_rollback(conn):
+    conn.info.pop(_DIRTY, None)
+
+
+def ensure_row(conn) -> None:
+    """Cria a linha do contador (migração; idempotente)."""
+    if conn.execute(select(DataVersion.id).where(DataVersion.id == 1)).first() is None:
+        conn.execute(DataVersion.__table__.insert().values(id=1, version=0))
+
+
+def current(s) -> int:
+    """Versão atual dos dados (0 se o contador ainda não existir)."""
+    return s.exec(select(DataVersion.version).where(DataVersion.id == 1)).first() or 0
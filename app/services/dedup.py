@@ -0,0 +1,198 @@
+# app/services/dedup.py
+"""
+Agrupamento de quase-duplicatas (cópias sindicadas da mesma matéria).
+
+Cada menção recebe um SimHash de 64 bits de titulo + trecho (palavras
+normalizadas, sem acento) e um `cluster_id`. Duas menções são a mesma história
+quando os SimHash diferem em até SIMHASH_MAX_DIST bits. Os textos da CSE são
+curtos: com shingles de várias palavras, trocar uma palavra já muda bits
+demais, por isso as features são as próprias palavras.
+
+Para não comparar com a tabela toda, o hash é dividido em SIMHASH_MAX_DIST + 1
+faixas (tabela simhash_band): com distância <= SIMHASH_MAX_DIST, pelo menos uma
+faixa é idêntica (casa dos pombos), então os candidatos saem de uma busca
+indexada por (faixa, valor). A menção entra no cluster do candidato mais próximo ou abre
+um cluster novo (cluster_id = o próprio id).
+
+Reprocessamento completo: job `recluster` (POST /mentions/recluster) ou
+    python -m app.services.dedup recluster
+"""
+import hashlib
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import bindparam, delete, func as sa_func, tuple_, update
+from sqlmodel import select
+
+from app.db import get_session
+from app.models import Mention, SimhashBand
+from app.services.jobs import register
+
+SIMHASH_BITS = 64
+SIMHASH_MAX_DIST = 4
+BANDS = SIMHASH_MAX_DIST + 1
+# larguras das faixas: 13, 13, 13, 13, 12
+BAND_WIDTHS = [SIMHASH_BITS // BANDS + (i < SIMHASH_BITS % BANDS) for i in range(BANDS)]
+ID_CHUNK = 500
+
+_WORD_RE = re.compile(r"\w+", re.U)
+
+
+def _tokens(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD_RE.findall(text)
+
+
+def simhash(text: str) -> int:
+    """SimHash de 64 bits (sem sinal) das palavras de `text`; 0 se não houver."""
+    words = _tokens(text)
+    if not words:
+        return 0
+    weights = [0] * SIMHASH_BITS
+    for w in words:
+        h = int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+
+def to_signed(h: int) -> int:
+    # BIGINT é com sinal: guarda o hash de 64 bits em complemento de dois
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def to_unsigned(h: int) -> int:
+    return h + (1 << 64) if h < 0 else h
+
+
+def bands(h: int) -> List[int]:
+    out, shift = [], 0
+    for width in BAND_WIDTHS:
+        out.append((h >> shift) & ((1 << width) - 1))
+        shift += width
+    return out
+
+
+def distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def mention_simhash(titulo: str, trecho: str) -> int:
+    return simhash(f"{titulo} {trecho}")
+
+
+def assign(s, ids: Sequence[int]) -> int:
+    """
+    Calcula SimHash, faixas e cluster das menções `ids` (em ordem de id).
+    Não faz commit. Retorna quantas entraram num cluster já existente.
+    """
+    ids = sorted(set(ids))
+    joined = 0
+    for i in range(0, len(ids), ID_CHUNK):
+        chunk = ids[i:i + ID_CHUNK]
+        rows = s.exec(
+            select(Mention.id, Mention.titulo, Mention.trecho).where(Mention.id.in_(chunk)).order_by(Mention.id)
+        ).all()
+        hashes = {mid: mention_simhash(t, tr) for mid, t, tr in rows}
+        keys = {(b, v) for h in hashes.values() for b, v in enumerate(bands(h))}
+
+        # candidatos já indexados (menções anteriores a este lote)
+        cands: Dict[int, List[int]] = {}
+        key_list = list(keys)
+        for j in range(0, len(key_list), ID_CHUNK):
+            for band, value, mid in s.exec(
+                select(SimhashBand.band, SimhashBand.value, SimhashBand.mention_id)
+                .where(tuple_(SimhashBand.band, SimhashBand.value).in_(key_list[j:j + ID_CHUNK]))
+            ).all():
+                cands.setdefault((band, value), []).append(mid)
+        cand_ids = {m for ms in cands.values() for m in ms if m not in hashes}
+        known: Dict[int, tuple] = {}
+        cand_list = list(cand_ids)
+        for j in range(0, len(cand_list), ID_CHUNK):
+            for mid, h, cl in s.exec(
+                select(Mention.id, Mention.simhash, Mention.cluster_id)
+                .where(Mention.id.in_(cand_list[j:j + ID_CHUNK]), Mention.simhash.is_not(None))
+            ).all():
+                known[mid] = (to_unsigned(h), cl or mid)
+
+        params, band_rows = [], []
+        for mid, h in hashes.items():
+            if h == 0:  # sem texto: não agrupa
+                params.append({"_id": mid, "_h": 0, "_c": mid})
+                continue
+            best: Optional[tuple] = None
+            for band, value in enumerate(bands(h)):
+                for other in cands.get((band, value), []):
+                    if other in known:
+                        d = distance(h, known[other][0])
+                        if d <= SIMHASH_MAX_DIST and (best is None or (d, other) < best[:2]):
+                            best = (d, other, known[other][1])
+            cluster = best[2] if best else mid
+            joined += best is not None
+            params.append({"_id": mid, "_h": to_signed(h), "_c": cluster})
+            band_rows += [{"band": b, "value": v, "mention_id": mid} for b, v in enumerate(bands(h))]
+            # menções do mesmo lote também se agrupam entre si
+            known[mid] = (h, cluster)
+            for b, v in enumerate(bands(h)):
+                cands.setdefault((b, v), []).append(mid)
+
+        if params:
+            table = Mention.__table__
+            s.connection().execute(
+                update(table).where(table.c.id == bindparam("_id"))
+                .values(simhash=bindparam("_h"), cluster_id=bindparam("_c")),
+                params,
+            )
+            s.execute(delete(SimhashBand).where(SimhashBand.mention_id.in_(list(hashes))))
+            if band_rows:
+                s.execute(SimhashBand.__table__.insert(), band_rows)
+    return joined
+
+
+def delete_bands_of(s, ids: Sequence[int]) -> None:
+    s.execute(
+        delete(SimhashBand).where(SimhashBand.mention_id.in_(list(ids))),
+        execution_options={"synchronize_session": False},
+    )
+
+
+@register("recluster")
+def recluster(batch_size: int = 2000, job=None) -> Dict:
+    """Refaz SimHash e clusters de todas as menções, em ordem de id, em lotes."""
+    batch_size = max(100, min(int(batch_size), 20000))
+    with get_session() as s:
+        total = s.exec(select(sa_func.count()).select_from(Mention)).one()
+        s.execute(delete(SimhashBand))
+        s.execute(update(Mention).values(simhash=None, cluster_id=None))
+        s.commit()
+    processed = joined = 0
+    last_id = 0
+    while True:
+        with get_session() as s:
+            ids = s.exec(
+                select(Mention.id).where(Mention.id > last_id).order_by(Mention.id).limit(batch_size)
+            ).all()
+            if not ids:
+                break
+            joined += assign(s, ids)
+            s.commit()
+        processed += len(ids)
+        last_id = ids[-1]
+        if job is not None:
+            job.progress(processed, total)
+    print(f"[DEDUP] {processed} menções, {joined} agrupadas em clusters existentes")
+    return {"processed": processed, "joined": joined}
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.db import init_db
+
+    if sys.argv[1:] != ["recluster"]:
+        print("uso: python -m app.services.dedup recluster")
+        sys.exit(2)
+    init_db()
+    recluster()
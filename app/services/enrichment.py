@@ -0,0 +1,272 @@
+# app/services/enrichment.py
+"""
+Motor de enriquecimento de datas (published_at) em paralelo.
+
+Em vez de um `requests.get` bloqueante por URL, as páginas são baixadas em
+paralelo, num event loop com httpx (padrão, ENRICH_ASYNC=1: centenas de
+downloads em voo numa só thread) ou num pool de threads com requests, com:
+  - limite global de concorrência,
+  - limite por host (não martelar o mesmo site),
+  - um cliente compartilhado com pool de conexões keep-alive,
+  - cache por URL (app/services/fetch_cache.py): GET condicional e backoff
+    para URLs que falharam.
+Do mesmo download saem, além da data, os metadados da página (URL canônica,
+título, descrição, autor, idioma, site, trecho), gravados em page_meta.
+Os resultados são gravados no banco em lote (um UPDATE executemany).
+"""
+import asyncio
+import os
+import time
+import threading
+import urllib.parse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from sqlalchemy import update
+
+from app.models import Mention
+from app.extract import extract_all
+from app.services import fetch_cache, page_meta, rollups
+from app.utils import async_client, fetch_page, fetch_page_async
+
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "32"))
+ENRICH_PER_HOST = int(os.getenv("ENRICH_PER_HOST", "4"))
+ENRICH_TIMEOUT = int(os.getenv("ENRICH_TIMEOUT", "6"))
+# downloads num event loop (httpx) em vez de um pool de threads
+ENRICH_ASYNC = os.getenv("ENRICH_ASYNC", "1") not in ("0", "false", "no")
+ENRICH_ASYNC_CONCURRENCY = int(os.getenv("ENRICH_ASYNC_CONCURRENCY", "500"))
+
+
+def _host(url: str) -> str:
+    try:
+        return urllib.parse.urlparse(url).netloc.lower()
+    except Exception:
+        return ""
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """Session com pool de conexões dimensionado para a concorrência."""
+    sess = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    sess.mount("http://", adapter)
+    sess.mount("https://", adapter)
+    return sess
+
+
+def _interleave(urls: List[str]) -> List[str]:
+    # Intercala hosts para que o limite por host não deixe workers ociosos
+    # esperando atrás de uma fila de URLs do mesmo site.
+    by_host: Dict[str, List[str]] = {}
+    for u in urls:
+        by_host.setdefault(_host(u), []).append(u)
+    ordered: List[str] = []
+    queues = list(by_host.values())
+    while queues:
+        queues = [q for q in queues if q]
+        for q in queues:
+            ordered.append(q.pop(0))
+    return ordered
+
+
+class _Results:
+    """Acumula o resultado de cada URL (threads ou event loop) e grava no fim."""
+
+    def __init__(self, urls: List[str], use_cache: bool, with_meta: bool, on_progress):
+        self.urls = urls
+        self.use_cache = use_cache
+        self.with_meta = with_meta
+        self.on_progress = on_progress
+        self.cached = fetch_cache.load(urls) if use_cache else {}
+        self.now = datetime.utcnow()
+        self.dates: Dict[str, datetime] = {}
+        self.failures: Counter = Counter()
+        self.cache_rows: List[Dict] = []
+        self.cache_report: Counter = Counter()
+        self.meta_rows: List[Dict] = []
+        self.lock = threading.Lock()
+        self.t0 = time.perf_counter()
+
+    def skip(self, url: str) -> bool:
+        """True se a URL está em backoff (conta a falha registrada)."""
+        entry = self.cached.get(url)
+        if not fetch_cache.in_backoff(entry, self.now):
+            return False
+        self._settle(url, None, entry.cause, None, "negative_skips")
+        return True
+
+    def validators(self, url: str) -> Dict:
+        return fetch_cache.validators(self.cached.get(url))
+
+    def fetched(self, url: str, html: Optional[str], cause: str, vals: Dict) -> None:
+        entry = self.cached.get(url)
+        dt, meta, event = None, None, "fetched"
+        if html is not None:
+            try:
+                dt, meta = extract_all(html)
+            except Exception:
+                cause = "parse_error"
+            else:
+                cause = "ok" if dt else "no_date"
+        elif cause == "not_modified":
+            dt, cause, event = entry.published_at, "ok", "not_modified"
+        row = fetch_cache.outcome(url, entry, dt, cause, vals, self.now) if self.use_cache else None
+        if meta is not None and self.with_meta:
+            meta = dict(meta, url=url, fetched_at=self.now)
+        else:
+            meta = None
+        self._settle(url, dt, cause, row, event, meta)
+
+    def _settle(self, url, dt, cause, row, event, meta=None) -> None:
+        with self.lock:
+            self.cache_report[event] += 1
+            if row is not None:
+                self.cache_rows.append(row)
+            if meta is not None:
+                self.meta_rows.append(meta)
+            if dt:
+                self.dates[url] = dt
+            else:
+                self.failures[cause] += 1
+            done = len(self.dates) + sum(self.failures.values())
+        if self.on_progress is not None:
+            self.on_progress(done, len(self.urls))
+
+    def report(self) -> Dict:
+        fetch_cache.store(self.cache_rows)
+        page_meta.store(self.meta_rows)
+        for event, n in self.cache_report.items():
+            fetch_cache.count(event, n)
+        elapsed = time.perf_counter() - self.t0
+        return {
+            "dates": self.dates,
+            "failures": dict(self.failures),
+            "fetched": len(self.urls),
+            "elapsed_s": round(elapsed, 3),
+            "urls_per_s": round(len(self.urls) / elapsed, 2) if elapsed > 0 else 0.0,
+            "cache": dict(self.cache_report),
+            "meta": len(self.meta_rows),
+        }
+
+
+def enrich_urls(
+    urls: Iterable[str],
+    concurrency: Optional[int] = None,
+    per_host: Optional[int] = None,
+    timeout: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    use_cache: bool = True,
+    with_meta: bool = True,
+) -> Dict:
+    """
+    Infere published_at para várias URLs ao mesmo tempo.
+    `on_progress(feitas, total)` é chamado a cada URL concluída.
+    Retorna {"dates": {url: datetime}, "failures": {causa: n}, "fetched",
+    "elapsed_s", "urls_per_s", "cache"}. URLs repetidas são buscadas uma única
+    vez; com `use_cache`, URLs em backoff não são buscadas (contam na falha
+    registrada) e as já extraídas são revalidadas com GET condicional.
+    Com `with_meta`, os metadados das páginas baixadas vão para page_meta.
+    Com ENRICH_ASYNC, os downloads rodam num event loop (enrich_urls_async)
+    em vez de um pool de threads.
+    """
+    opts = dict(
+        concurrency=concurrency, per_host=per_host, timeout=timeout,
+        on_progress=on_progress, use_cache=use_cache, with_meta=with_meta,
+    )
+    if ENRICH_ASYNC:
+        return asyncio.run(enrich_urls_async(urls, **opts))
+    return _enrich_urls_threads(urls, **opts)
+
+
+def _enrich_urls_threads(urls, concurrency, per_host, timeout, on_progress, use_cache, with_meta) -> Dict:
+    concurrency = max(1, int(concurrency or ENRICH_CONCURRENCY))
+    per_host = max(1, int(per_host or ENRICH_PER_HOST))
+    timeout = timeout or ENRICH_TIMEOUT
+
+    unique: List[str] = list(dict.fromkeys(u for u in urls if u))
+    res = _Results(unique, use_cache, with_meta, on_progress)
+    host_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+    def host_sem(host: str) -> threading.BoundedSemaphore:
+        with res.lock:
+            sem = host_limits.get(host)
+            if sem is None:
+                sem = host_limits[host] = threading.BoundedSemaphore(per_host)
+            return sem
+
+    with make_session(concurrency) as sess:
+
+        def work(url: str):
+            if res.skip(url):
+                return
+            with host_sem(_host(url)):
+                html, cause, vals = fetch_page(url, timeout=timeout, session=sess, **res.validators(url))
+            res.fetched(url, html, cause, vals)
+
+        ordered = _interleave(unique)
+        with ThreadPoolExecutor(max_workers=min(concurrency, max(1, len(ordered)))) as pool:
+            list(pool.map(work, ordered))
+
+    return res.report()
+
+
+async def enrich_urls_async(
+    urls: Iterable[str],
+    concurrency: Optional[int] = None,
+    per_host: Optional[int] = None,
+    timeout: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    use_cache: bool = True,
+    with_meta: bool = True,
+) -> Dict:
+    """
+    Igual a `enrich_urls`, com httpx.AsyncClient: a concorrência é de
+    corrotinas, não de threads, então pode chegar aos milhares
+    (ENRICH_ASYNC_CONCURRENCY). A leitura e a gravação do cache/page_meta e
+    o parse (curto, com o extrator em camadas) rodam no próprio loop.
+    """
+    concurrency = max(1, int(concurrency or ENRICH_ASYNC_CONCURRENCY))
+    per_host = max(1, int(per_host or ENRICH_PER_HOST))
+    timeout = timeout or ENRICH_TIMEOUT
+
+    unique: List[str] = list(dict.fromkeys(u for u in urls if u))
+    res = _Results(unique, use_cache, with_meta, on_progress)
+    slots = asyncio.Semaphore(concurrency)
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async with async_client(concurrency) as client:
+
+        async def work(url: str):
+            if res.skip(url):
+                return
+            sem = host_limits.setdefault(_host(url), asyncio.Semaphore(per_host))
+            async with slots, sem:
+                html, cause, vals = await fetch_page_async(
+                    url, timeout=timeout, client=client, **res.validators(url)
+                )
+            res.fetched(url, html, cause, vals)
+
+        await asyncio.gather(*(work(u) for u in _interleave(unique)))
+
+    return res.report()
+
+
+def enrich_mentions(s, rows: List[Mention], **opts) -> Dict:
+    """
+    Enriquece as menções `rows` e grava published_at em lote na sessão `s`
+    (sem commit). Retorna o relatório de `enrich_urls` + "processed"/"updated".
+    """
+    report = enrich_urls([m.url for m in rows], **opts)
+    dates = report.pop("dates")
+    params = [{"id": m.id, "published_at": dates[m.url]} for m in rows if m.url in dates]
+    if params:
+        ids = [p["id"] for p in params]
+        rollups.apply(s, ids, -1, fields=("published",))
+        s.execute(update(Mention), params)
+        rollups.apply(s, ids, +1, fields=("published",))
+    report["processed"] = len(rows)
+    report["updated"] = len(params)
+    return report
@@ -0,0 +1,92 @@
+# app/services/export.py
+"""
+Exportação em streaming das menções (NDJSON ou CSV, opcionalmente gzip).
+A consulta usa cursor no servidor (yield_per): a memória fica constante seja
+qual for o tamanho do resultado. A ordem é por id crescente, então uma
+exportação interrompida pode ser retomada com `after_id` = último id recebido.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Iterator, Optional
+
+from sqlmodel import select
+
+from app.db import get_session
+from app.filters import MentionFilter, filter_conditions
+from app.models import Mention
+from app.services import tags as tags_svc
+
+BATCH_SIZE = 1000
+FORMATS = ("ndjson", "csv")
+CSV_COLUMNS = [
+    "id", "termo", "titulo", "url", "trecho", "canal",
+    "sentimento", "tags", "created_at", "published_at",
+]
+
+
+def _rows(f: MentionFilter, after_id: Optional[int]) -> Iterator[dict]:
+    with get_session() as s:
+        stmt = select(Mention).where(*filter_conditions(f))
+        if after_id is not None:
+            stmt = stmt.where(Mention.id > after_id)
+        stmt = stmt.order_by(Mention.id.asc()).execution_options(yield_per=BATCH_SIZE)
+        for batch in s.exec(stmt).partitions():
+            tags_by_id = tags_svc.tags_for(s, [m.id for m in batch])
+            for m in batch:
+                yield m.to_dict(tags_by_id.get(m.id))
+
+
+def _ndjson(rows: Iterator[dict]) -> Iterator[bytes]:
+    buf = []
+    for i, row in enumerate(rows, 1):
+        buf.append(json.dumps(row, ensure_ascii=False))
+        if i % BATCH_SIZE == 0:
+            yield ("\n".join(buf) + "\n").encode("utf-8")
+            buf = []
+    if buf:
+        yield ("\n".join(buf) + "\n").encode("utf-8")
+
+
+def _csv(rows: Iterator[dict]) -> Iterator[bytes]:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_COLUMNS)
+    for i, row in enumerate(rows, 1):
+        row = dict(row, tags=",".join(row["tags"]))
+        writer.writerow([row[c] if row[c] is not None else "" for c in CSV_COLUMNS])
+        if i % BATCH_SIZE == 0:
+            yield out.getvalue().encode("utf-8")
+            out.seek(0)
+            out.truncate()
+    if out.tell():
+        yield out.getvalue().encode("utf-8")
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for chunk in chunks:
+        data = comp.compress(chunk)
+        if data:
+            yield data
+    yield comp.flush()
+
+
+def encode(rows: Iterator[dict], fmt: str = "ndjson", gzip: bool = False) -> Iterator[bytes]:
+    """Serializa dicts de Mention.to_dict() (também usado pelo arquivo morto)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"format inválido: {fmt} (use {' ou '.join(FORMATS)})")
+    chunks = _ndjson(rows) if fmt == "ndjson" else _csv(rows)
+    return _gzip(chunks) if gzip else chunks
+
+
+def stream(
+    f: MentionFilter,
+    fmt: str = "ndjson",
+    gzip: bool = False,
+    after_id: Optional[int] = None,
+) -> Iterator[bytes]:
+    if fmt not in FORMATS:
+        raise ValueError(f"format inválido: {fmt} (use {' ou '.join(FORMATS)})")
+    return encode(_rows(f, after_id), fmt, gzip)
@@ -0,0 +1,128 @@
+# app/services/fetch_cache.py
+"""
+Cache de busca de páginas para o enriquecimento de datas (tabela page_fetch).
+
+Por URL guarda ETag/Last-Modified, a data extraída e a causa da última
+tentativa:
+  - com data salva e validadores, a próxima busca é um GET condicional; um 304
+    reaproveita a extração anterior sem baixar nem parsear a página;
+  - falhas (4xx, timeout, página sem data, ...) ficam em backoff exponencial
+    (retry_after): a URL não é buscada de novo a cada lote. Falhas transitórias
+    (timeout, conexão, 5xx) começam em FETCH_NEG_TRANSIENT_S e as definitivas
+    em FETCH_NEG_PERMANENT_S, dobrando a cada falha seguida até FETCH_NEG_MAX_S.
+Leitura e gravação são em lote (uma consulta antes, um upsert depois).
+"""
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func as sa_func
+from sqlmodel import select
+
+from app.db import dialect_insert, get_session
+from app.models import PageFetch
+
+FETCH_NEG_TRANSIENT_S = int(os.getenv("FETCH_NEG_TRANSIENT_S", "900"))
+FETCH_NEG_PERMANENT_S = int(os.getenv("FETCH_NEG_PERMANENT_S", "86400"))
+FETCH_NEG_MAX_S = int(os.getenv("FETCH_NEG_MAX_S", str(30 * 86400)))
+TRANSIENT = {"timeout", "connection", "error", "http_5xx"}
+ID_CHUNK = 500
+
+_lock = threading.Lock()
+stats: Counter = Counter()  # negative_skips, not_modified, fetched, stored
+
+
+def count(key: str, n: int = 1) -> None:
+    with _lock:
+        stats[key] += n
+
+
+def load(urls: Iterable[str]) -> Dict[str, PageFetch]:
+    urls = list(urls)
+    out: Dict[str, PageFetch] = {}
+    with get_session() as s:
+        for i in range(0, len(urls), ID_CHUNK):
+            for row in s.exec(select(PageFetch).where(PageFetch.url.in_(urls[i:i + ID_CHUNK]))).all():
+                out[row.url] = row
+    return out
+
+
+def in_backoff(entry: Optional[PageFetch], now: datetime) -> bool:
+    return bool(entry and entry.retry_after and entry.retry_after > now)
+
+
+def validators(entry: Optional[PageFetch]) -> Dict:
+    """Validadores para o GET condicional (só quando há extração a reaproveitar)."""
+    if entry is None or entry.published_at is None:
+        return {}
+    return {"etag": entry.etag, "last_modified": entry.last_modified}
+
+
+def backoff(cause: str, fails: int) -> timedelta:
+    base = FETCH_NEG_TRANSIENT_S if cause in TRANSIENT else FETCH_NEG_PERMANENT_S
+    return timedelta(seconds=min(FETCH_NEG_MAX_S, base * 2 ** max(0, fails - 1)))
+
+
+def outcome(
+    url: str,
+    entry: Optional[PageFetch],
+    dt: Optional[datetime],
+    cause: str,
+    vals: Dict,
+    now: datetime,
+) -> Dict:
+    """Linha de page_fetch resultante de uma tentativa."""
+    row = {
+        "url": url,
+        "etag": vals.get("etag") or (entry.etag if entry else None),
+        "last_modified": vals.get("last_modified") or (entry.last_modified if entry else None),
+        "published_at": dt,
+        "cause": cause,
+        "fails": 0,
+        "retry_after": None,
+        "fetched_at": now,
+    }
+    if dt is None:
+        row["fails"] = (entry.fails if entry else 0) + 1
+        row["retry_after"] = now + backoff(cause, row["fails"])
+    return row
+
+
+def store(rows: List[Dict]) -> None:
+    if not rows:
+        return
+    cols = ["etag", "last_modified", "published_at", "cause", "fails", "retry_after", "fetched_at"]
+    with get_session() as s:
+        insert = dialect_insert(s)
+        for i in range(0, len(rows), 100):
+            stmt = insert(PageFetch).values(rows[i:i + 100])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["url"], set_={c: getattr(stmt.excluded, c) for c in cols}
+            )
+            s.execute(stmt)
+        s.commit()
+    count("stored", len(rows))
+
+
+def clear() -> int:
+    with get_session() as s:
+        n = s.execute(delete(PageFetch)).rowcount
+        s.commit()
+    return n or 0
+
+
+def info() -> Dict:
+    now = datetime.utcnow()
+    with get_session() as s:
+        entries = s.exec(select(sa_func.count()).select_from(PageFetch)).one()
+        backing_off = s.exec(
+            select(sa_func.count()).select_from(PageFetch).where(PageFetch.retry_after > now)
+        ).one()
+        causes = dict(s.exec(
+            select(PageFetch.cause, sa_func.count()).group_by(PageFetch.cause)
+        ).all())
+    with _lock:
+        counters = dict(stats)
+    return {"entries": entries, "in_backoff": backing_off, "by_cause": causes, **counters}
@@ -0,0 +1,145 @@
+# app/services/fulltext.py
+"""
+Busca full-text para o filtro `q` (titulo + trecho).
+  - Postgres: coluna gerada `search_tsv` (tsvector, config 'portuguese') + índice GIN;
+    consultas com websearch_to_tsquery e ranking por ts_rank_cd.
+  - SQLite: tabela virtual FTS5 `mention_fts` (external content) mantida por triggers;
+    ranking por bm25.
+As estruturas são criadas por app/migrations.py. Sem elas (ou em outro dialeto),
+o filtro volta ao LIKE case-insensitive.
+"""
+import re
+from typing import List, Optional
+
+from sqlalchemy import column, inspect, literal_column, select, table, text, func as sa_func
+from sqlalchemy.engine import Connection
+
+from app.models import Mention
+
+PG_CONFIG = "portuguese"
+
+_enabled: Optional[bool] = None
+
+
+def _dialect() -> str:
+    from app.db import engine
+    return engine.dialect.name
+
+
+def enabled() -> bool:
+    """Indica se o índice full-text existe no banco (resultado em cache)."""
+    global _enabled
+    if _enabled is None:
+        from app.db import engine
+        try:
+            with engine.connect() as conn:
+                insp = inspect(conn)
+                if conn.dialect.name == "postgresql":
+                    _enabled = any(c["name"] == "search_tsv" for c in insp.get_columns("mention"))
+                elif conn.dialect.name == "sqlite":
+                    _enabled = "mention_fts" in insp.get_table_names()
+                else:
+                    _enabled = False
+        except Exception:
+            return False
+    return _enabled
+
+
+def _fts5_query(q: str) -> str:
+    # cada palavra vira um termo entre aspas (AND implícito); a última aceita prefixo
+    words = re.findall(r"\w+", q, flags=re.UNICODE)
+    if not words:
+        return '""'
+    terms = [f'"{w}"' for w in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+_FTS = table("mention_fts", column("rowid"))
+
+
+def _pg_tsquery(q: str):
+    return sa_func.websearch_to_tsquery(literal_column(f"'{PG_CONFIG}'::regconfig"), q)
+
+
+def _fts_match(q: str):
+    return literal_column("mention_fts").op("MATCH")(_fts5_query(q))
+
+
+def _like_condition(q: str):
+    like = f"%{q}%"
+    return (Mention.titulo.ilike(like)) | (Mention.trecho.ilike(like))
+
+
+def condition(q: str, mode: str = "fts"):
+    """Condição SQL para o texto `q` (mode: 'fts' | 'like')."""
+    if mode != "fts" or not enabled():
+        return _like_condition(q)
+    if _dialect() == "postgresql":
+        return literal_column("mention.search_tsv").op("@@")(_pg_tsquery(q))
+    return Mention.id.in_(
+        select(_FTS.c.rowid).where(_fts_match(q))
+    )
+
+
+def rank(q: str):
+    """Expressão de relevância (maior = mais relevante) ou None sem índice."""
+    if not enabled():
+        return None
+    if _dialect() == "postgresql":
+        return sa_func.ts_rank_cd(literal_column("mention.search_tsv"), _pg_tsquery(q))
+    # bm25 é menor quanto mais relevante: inverte o sinal
+    bm25 = (
+        select(sa_func.bm25(literal_column("mention_fts")))
+        .select_from(_FTS)
+        .where(_fts_match(q), _FTS.c.rowid == Mention.id)
+        .scalar_subquery()
+    )
+    return -bm25
+
+
+# -----------------------------
+# Migração (chamada por app/migrations.py)
+# -----------------------------
+_SQLITE_DDL: List[str] = [
+    "CREATE VIRTUAL TABLE mention_fts USING fts5("
+    " titulo, trecho, content='mention', content_rowid='id',"
+    " tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS mention_fts_ai AFTER INSERT ON mention BEGIN"
+    " INSERT INTO mention_fts(rowid, titulo, trecho) VALUES (new.id, new.titulo, new.trecho);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS mention_fts_ad AFTER DELETE ON mention BEGIN"
+    " INSERT INTO mention_fts(mention_fts, rowid, titulo, trecho)"
+    " VALUES ('delete', old.id, old.titulo, old.trecho);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS mention_fts_au AFTER UPDATE OF titulo, trecho ON mention BEGIN"
+    " INSERT INTO mention_fts(mention_fts, rowid, titulo, trecho)"
+    " VALUES ('delete', old.id, old.titulo, old.trecho);"
+    " INSERT INTO mention_fts(rowid, titulo, trecho) VALUES (new.id, new.titulo, new.trecho);"
+    " END",
+    "INSERT INTO mention_fts(mention_fts) VALUES ('rebuild')",
+]
+
+
+def create_index(conn: Connection) -> None:
+    global _enabled
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.execute(text(
+            "ALTER TABLE mention ADD COLUMN IF NOT EXISTS search_tsv tsvector"
+            f" GENERATED ALWAYS AS (to_tsvector('{PG_CONFIG}',"
+            " coalesce(titulo, '') || ' ' || coalesce(trecho, ''))) STORED"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_mention_search_tsv ON mention USING GIN (search_tsv)"
+        ))
+    elif dialect == "sqlite":
+        if "mention_fts" in inspect(conn).get_table_names():
+            return
+        try:
+            for ddl in _SQLITE_DDL:
+                conn.execute(text(ddl))
+        except Exception as e:  # SQLite compilado sem FTS5
+            print(f"[WARN] FTS5 indisponível, busca por texto usa LIKE: {e}")
+            return
+    _enabled = None
@@ -1,86 +1,313 @@
 # app/services/google_cse.py
-import os, time, json, requests
-from typing import List, Dict, Optional
+"""
+Cliente da Google Custom Search JSON API.
+
+- Uma Session compartilhada (pool de conexões) para todas as chamadas.
+- Limitador token bucket (CSE_QPS / CSE_BURST) + cota diária (CSE_DAILY_QUOTA):
+  toda requisição passa por ele, inclusive as repetições.
+- 429 e 5xx são repetidos com backoff exponencial com jitter (respeita
+  Retry-After); outros erros HTTP falham na hora.
+- cse_search_many(): vários termos em paralelo. As páginas de um termo têm
+  `start` conhecido (1, 11, 21, ...), então até CSE_PREFETCH páginas por termo
+  ficam em voo; o termo para na primeira página vazia ou sem nextPage.
+  `stop_when(termo, itens_da_página)` permite parar antes (busca incremental).
+  `cache_max_age` limita a idade das respostas aceitas do cache (monitores).
+- cse_search(): um termo só (mesma interface de antes).
+- As respostas passam pelo cache em disco de app/services/cse_cache.py
+  (acertos não consomem cota nem token do limitador).
+"""
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import requests
 from dotenv import load_dotenv
-from app.utils import classify_channel, simple_sentiment
+from requests.adapters import HTTPAdapter
+
+from app.services import cse_cache
+from app.utils import classify_channel
+from app.services.sentiment import classify_texts, mention_text
 
 load_dotenv()
 API_KEY = os.getenv("GOOGLE_API_KEY")
 CSE_ID  = os.getenv("GOOGLE_CSE_ID")
+CSE_URL = "https://www.googleapis.com/customsearch/v1"
+
+CSE_CONCURRENCY = int(os.getenv("CSE_CONCURRENCY", "8"))
+CSE_PREFETCH = int(os.getenv("CSE_PREFETCH", "2"))
+CSE_QPS = float(os.getenv("CSE_QPS", "1.5"))  # a API limita ~100 consultas/min
+CSE_BURST = int(os.getenv("CSE_BURST", "3"))
+CSE_DAILY_QUOTA = int(os.getenv("CSE_DAILY_QUOTA", "10000"))
+CSE_MAX_RETRIES = int(os.getenv("CSE_MAX_RETRIES", "4"))
+CSE_TIMEOUT = int(os.getenv("CSE_TIMEOUT", "30"))
+# a API não devolve resultados além da posição 100
+MAX_RESULTS = 100
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class QuotaExceeded(RuntimeError):
+    pass
+
+
+class RateLimiter:
+    """Token bucket (rate por segundo, capacidade `burst`) + contador diário."""
+
+    def __init__(self, rate: float, burst: int, daily_quota: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.daily_quota = daily_quota
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._day = datetime.utcnow().date()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Bloqueia até haver token; QuotaExceeded se a cota do dia acabou."""
+        while True:
+            with self._lock:
+                today = datetime.utcnow().date()
+                if today != self._day:
+                    self._day, self._used = today, 0
+                if self._used >= self.daily_quota:
+                    raise QuotaExceeded(f"cota diária da CSE esgotada ({self.daily_quota})")
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._used += 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "day": self._day.isoformat(),
+                "used": self._used,
+                "limit": self.daily_quota,
+                "remaining": max(0, self.daily_quota - self._used),
+                "qps": self.rate,
+            }
+
+
+limiter = RateLimiter(CSE_QPS, CSE_BURST, CSE_DAILY_QUOTA)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+
+
+def _http() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            sess = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CSE_CONCURRENCY, max_retries=0)
+            sess.mount("https://", adapter)
+            sess.mount("http://", adapter)
+            _session = sess
+        return _session
+
 
 def _yyyymmdd(date_str: str) -> str:
     # Espera 'YYYY-MM-DD' e retorna 'YYYYMMDD'
     return date_str.replace("-", "")
 
-def cse_search(
-    query: str,
+
+def _sort_param(date_from: Optional[str], date_to: Optional[str]) -> Optional[str]:
+    # 'sort' da CSE suporta 'date:r:YYYYMMDD:YYYYMMDD'
+    if date_from and date_to:
+        return f"date:r:{_yyyymmdd(date_from)}:{_yyyymmdd(date_to)}"
+    if date_from:
+        return f"date:r:{_yyyymmdd(date_from)}:{_yyyymmdd(date_from)}"
+    if date_to:
+        return f"date:r:{_yyyymmdd(date_to)}:{_yyyymmdd(date_to)}"
+    return None
+
+
+def _fetch_page(
+    query: str, start: int, num: int, sort: Optional[str], stats: Dict,
+    cache_max_age: Optional[float] = None,
+) -> Dict:
+    """Uma página da CSE, com limitador e backoff. `stats` acumula requests/retries."""
+    params = {
+        "key": API_KEY,
+        "cx": CSE_ID,
+        "q": query,
+        "num": num,
+        "start": start,
+        "hl": "pt-BR",
+        "gl": "br",
+        "safe": "off",
+        "fields": "items(title,link,snippet),queries(nextPage(startIndex))",
+    }
+    if sort:
+        params["sort"] = sort
+
+    cached = cse_cache.get(params, max_age=cache_max_age)
+    if cached is not None:
+        return cached
+    if cse_cache.OFFLINE:
+        raise RuntimeError(f"modo offline: sem resposta em cache para {query!r} (start={start})")
+
+    for attempt in range(CSE_MAX_RETRIES + 1):
+        limiter.acquire()
+        with _stats_lock:
+            stats["requests"] += 1
+        try:
+            r = _http().get(CSE_URL, params=params, timeout=CSE_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == CSE_MAX_RETRIES:
+                raise RuntimeError(f"Custom Search API: {e}")
+            retry_after = None
+        else:
+            if r.status_code == 200:
+                data = r.json()
+                cse_cache.put(params, data)
+                return data
+            if r.status_code not in RETRY_STATUS or attempt == CSE_MAX_RETRIES:
+                try:
+                    data = r.json()
+                except Exception:
+                    data = {"raw": r.text[:500]}
+                raise RuntimeError(f"Custom Search API {r.status_code}: {json.dumps(data)[:500]}")
+            retry_after = r.headers.get("Retry-After")
+        with _stats_lock:
+            stats["retries"] += 1
+        delay = min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+    raise RuntimeError("Custom Search API: tentativas esgotadas")
+
+
+def _to_items(data: Dict) -> List[Dict]:
+    return [
+        {
+            "titulo": it.get("title", ""),
+            "url": it.get("link", ""),
+            "trecho": it.get("snippet", ""),
+            "canal": classify_channel(it.get("link", "")),
+            "sentimento": None,
+            "tags": [],
+        }
+        for it in data.get("items", [])
+    ]
+
+
+def cse_search_many(
+    terms: List[str],
     total: int = 20,
     date_from: Optional[str] = None,  # 'YYYY-MM-DD'
     date_to: Optional[str] = None,    # 'YYYY-MM-DD'
-) -> List[Dict]:
-    if not API_KEY or not CSE_ID:
+    on_progress: Optional[Callable[[str, Dict], None]] = None,
+    stop_when: Optional[Callable[[str, List[Dict]], bool]] = None,
+    prefetch: Optional[int] = None,
+    cache_max_age: Optional[float] = None,
+) -> Dict:
+    """
+    Busca vários termos em paralelo. Retorna
+    {"terms": {termo: {"items", "pages", "requests", "retries", "error"}},
+     "quota": limiter.stats()}. Um termo que falha não derruba os outros.
+    """
+    if (not API_KEY or not CSE_ID) and not cse_cache.OFFLINE:
         raise RuntimeError("Configure GOOGLE_API_KEY e GOOGLE_CSE_ID no .env")
 
-    results = []
-    start_index = 1  # 1-based
+    # Capamos 'total' pra evitar loops sem fim (pode ajustar)
+    total = max(1, min(int(total), MAX_RESULTS)) if total else 50  # se None/0, puxa até 50
+    sort = _sort_param(date_from, date_to)
+    starts = list(range(1, total + 1, 10))
+    prefetch = max(1, prefetch or CSE_PREFETCH)
 
-    # 'sort' da CSE suporta 'date:r:YYYYMMDD:YYYYMMDD'
-    sort_val = None
-    if date_from and date_to:
-        sort_val = f"date:r:{_yyyymmdd(date_from)}:{_yyyymmdd(date_to)}"
-    elif date_from and not date_to:
-        sort_val = f"date:r:{_yyyymmdd(date_from)}:{_yyyymmdd(date_from)}"
-    elif date_to and not date_from:
-        sort_val = f"date:r:{_yyyymmdd(date_to)}:{_yyyymmdd(date_to)}"
+    state: Dict[str, Dict] = {}
+    for term in dict.fromkeys(terms):
+        state[term] = {
+            "pages": {}, "next": 0, "stop_at": len(starts), "requests": 0, "retries": 0,
+            "error": None, "done": False,
+        }
 
-    # Capamos 'total' pra evitar loops sem fim (pode ajustar)
-    total = max(1, min(int(total), 100)) if total else 50  # se None/0, puxa até 50
-
-    while len(results) < total:
-        num = min(10, total - len(results))
-        params = {
-            "key": API_KEY,
-            "cx": CSE_ID,
-            "q": query,
-            "num": num,
-            "start": start_index,
-            "hl": "pt-BR",
-            "gl": "br",
-            "safe": "off",
-            "fields": "items(title,link,snippet),queries(nextPage(startIndex))",
+    inflight = {}  # future -> (termo, índice da página)
+
+    def submit(pool, term: str) -> None:
+        st = state[term]
+        while (
+            not st["done"] and st["next"] < st["stop_at"]
+            and sum(1 for t, _ in inflight.values() if t == term) < prefetch
+        ):
+            i = st["next"]
+            st["next"] += 1
+            num = min(10, total - i * 10)
+            fut = pool.submit(_fetch_page, term, starts[i], num, sort, st, cache_max_age)
+            inflight[fut] = (term, i)
+
+    with ThreadPoolExecutor(max_workers=CSE_CONCURRENCY, thread_name_prefix="cse") as pool:
+        for term in state:
+            submit(pool, term)
+        while inflight:
+            finished, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+            for fut in finished:
+                term, i = inflight.pop(fut)
+                st = state[term]
+                if st["done"] or i >= st["stop_at"]:
+                    continue  # página pré-buscada além do fim do termo
+                try:
+                    data = fut.result()
+                except Exception as e:
+                    st["error"], st["done"] = str(e), True
+                    continue
+                st["pages"][i] = _to_items(data)
+                if not data.get("items") or not data.get("queries", {}).get("nextPage"):
+                    st["stop_at"] = i + 1
+                elif stop_when is not None and stop_when(term, st["pages"][i]):
+                    st["stop_at"] = min(st["stop_at"], i + 1)
+                pages_ok = 0
+                while pages_ok in st["pages"]:
+                    pages_ok += 1
+                if pages_ok >= st["stop_at"]:
+                    st["done"] = True
+                if on_progress is not None:
+                    on_progress(term, {"pages": len(st["pages"]), "planned": st["stop_at"]})
+                submit(pool, term)
+
+    out: Dict[str, Dict] = {}
+    all_items: List[Dict] = []
+    for term, st in state.items():
+        items: List[Dict] = []
+        for i in range(st["stop_at"]):
+            if i not in st["pages"]:
+                break
+            items += st["pages"][i]
+        items = items[:total]
+        all_items += items
+        out[term] = {
+            "items": items, "pages": len(st["pages"]), "requests": st["requests"],
+            "retries": st["retries"], "error": st["error"],
         }
-        if sort_val:
-            params["sort"] = sort_val
 
-        r = requests.get("https://www.googleapis.com/customsearch/v1", params=params, timeout=30)
-        if r.status_code != 200:
-            try:
-                data = r.json()
-            except Exception:
-                data = {"raw": r.text[:500]}
-            raise RuntimeError(f"Custom Search API {r.status_code}: {json.dumps(data)[:500]}")
-
-        data = r.json()
-        items = data.get("items", [])
-        if not items:
-            break
-
-        for it in items:
-            link = it.get("link", "")
-            title = it.get("title", "")
-            snippet = it.get("snippet", "")
-            canal = classify_channel(link)
-            senti = simple_sentiment(f"{title}. {snippet}")
-            results.append({
-                "titulo": title, "url": link, "trecho": snippet,
-                "canal": canal, "sentimento": senti, "tags": []
-            })
-
-        next_page = data.get("queries", {}).get("nextPage", [])
-        if next_page:
-            start_index = next_page[0].get("startIndex", 0)
-            time.sleep(0.8)
-        else:
-            break
+    # sentimento em lote (com cache por hash do texto) em vez de item a item
+    labels = classify_texts([mention_text(r["titulo"], r["trecho"]) for r in all_items])
+    for r, senti in zip(all_items, labels):
+        r["sentimento"] = senti
+    return {"terms": out, "quota": limiter.stats()}
+
 
-    return results[:total]
+def cse_search(
+    query: str,
+    total: int = 20,
+    date_from: Optional[str] = None,  # 'YYYY-MM-DD'
+    date_to: Optional[str] = None,    # 'YYYY-MM-DD'
+    **opts,
+) -> List[Dict]:
+    """Um termo; `opts` são repassados a cse_search_many (stop_when, prefetch, cache_max_age)."""
+    res = cse_search_many([query], total=total, date_from=date_from, date_to=date_to, **opts)
+    term = res["terms"][query]
+    if term["error"] and not term["items"]:
+        raise RuntimeError(term["error"])
+    return term["items"]
@@ -0,0 +1,273 @@
+# app/services/ingest.py
+"""
+Pipelines de ingestão usados pelos endpoints e pelos jobs de fundo:
+  - run_search: CSE -> dedup -> (datas) -> persistência
+  - run_search_many: o mesmo para vários termos, com a CSE em paralelo
+  - run_enrich_dates: enriquecimento de published_at das menções salvas
+`job` (opcional) recebe as etapas e o progresso; ver app/services/jobs.py.
+"""
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import select
+
+from app.db import dialect_insert, get_session
+from app.models import Mention
+from app.services.google_cse import cse_search, cse_search_many
+from app.services.enrichment import enrich_urls, enrich_mentions
+from app.services.jobs import register
+from app.services import dedup, live, rollups
+from app.urlnorm import canonicalize
+
+
+# linhas por INSERT multi-row (mantém os parâmetros abaixo do limite do SQLite)
+UPSERT_BATCH = 100
+# busca incremental: para de paginar quando esta fração da página já está salva
+KNOWN_STOP_RATIO = 0.5
+
+
+def _stage(job, name: str):
+    return job.stage(name) if job is not None else nullcontext()
+
+
+def upsert_mentions(s, rows: List[Dict]) -> Tuple[List[int], int]:
+    """
+    Insere `rows` (dicts com as colunas de Mention) em lotes de
+    INSERT ... ON CONFLICT (termo, url_canonical) DO NOTHING, sem passar pelo
+    unit of work, soma as novas menções nos rollups diários e as agrupa em
+    clusters de quase-duplicatas.
+    Não faz commit. Retorna (ids inseridos, quantidade ignorada).
+    """
+    if not rows:
+        return [], 0
+    insert = dialect_insert(s)
+    inserted: List[int] = []
+    for i in range(0, len(rows), UPSERT_BATCH):
+        chunk = rows[i:i + UPSERT_BATCH]
+        stmt = (
+            insert(Mention)
+            .values(chunk)
+            .on_conflict_do_nothing(index_elements=["termo", "url_canonical"])
+            .returning(Mention.id)
+        )
+        inserted += s.execute(stmt).scalars().all()
+    rollups.apply(s, inserted, +1)
+    dedup.assign(s, inserted)
+    return inserted, len(rows) - len(inserted)
+
+
+def _dedup(items: List[Dict]) -> List[Dict]:
+    """Uma ocorrência por URL canônica (o termo é o mesmo para todos os itens)."""
+    unique = {}
+    for it in items:
+        unique.setdefault(canonicalize(it.get("url", "")), it)
+    return list(unique.values())
+
+
+def _rows_for(term: str, items: List[Dict], pub_dates: Dict) -> List[Dict]:
+    now = datetime.utcnow()
+    return [
+        {
+            "termo": term,
+            "titulo": it.get("titulo", ""),
+            "url": it.get("url", ""),
+            "url_canonical": canonicalize(it.get("url", "")),
+            "trecho": it.get("trecho", ""),
+            "canal": it.get("canal", "Site"),
+            "sentimento": it.get("sentimento", "neutro"),
+            "tags_csv": "",
+            "created_at": now,
+            "published_at": pub_dates.get(it.get("url", "")),
+        }
+        for it in items
+    ]
+
+
+def _known_stop(term: str):
+    """stop_when para a CSE: a página já é majoritariamente de URLs salvas."""
+    def stop(_term: str, items: List[Dict]) -> bool:
+        urls = [canonicalize(it["url"]) for it in items if it.get("url")]
+        if not urls:
+            return False
+        with get_session() as s:
+            known = s.exec(
+                select(Mention.url_canonical)
+                .where(Mention.termo == term, Mention.url_canonical.in_(urls))
+            ).all()
+        return len(set(known)) >= KNOWN_STOP_RATIO * len(set(urls))
+    return stop
+
+
+@register("search")
+def run_search(
+    term: str,
+    qty: Optional[int] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    enrich_dates: bool = False,
+    incremental: bool = False,
+    cache_max_age: Optional[float] = None,
+    job=None,
+) -> Dict:
+    """
+    `incremental`: pagina uma página por vez e para ao chegar em URLs já
+    salvas para o termo (usado pelos monitores).
+    `cache_max_age`: idade máxima (s) das respostas da CSE aceitas do cache;
+    nas buscas incrementais o padrão é 0 (sempre consulta a API, senão a
+    mesma janela repetida no dia voltaria do cache sem resultados novos).
+    """
+    qty_eff = 50 if not qty else max(1, min(int(qty), 100))
+    print(
+        f"[SEARCH] term='{term}', qty={qty} (efetivo={qty_eff}), "
+        f"date_from={date_from}, date_to={date_to}, enrich_dates={enrich_dates}"
+    )
+
+    # 1) Buscar na CSE
+    with _stage(job, "cse"):
+        opts = {"stop_when": _known_stop(term), "prefetch": 1} if incremental else {}
+        if cache_max_age is None and incremental:
+            cache_max_age = 0
+        if cache_max_age is not None:
+            opts["cache_max_age"] = cache_max_age
+        items = cse_search(
+            term,
+            total=qty_eff,
+            date_from=date_from,
+            date_to=date_to,
+            **opts,
+        )
+
+    # 2) Dedup por (termo, url canônica)
+    items = _dedup(items)
+
+    # 3) Datas de publicação (opcional), buscadas em paralelo
+    pub_dates = {}
+    enrich_report = None
+    if enrich_dates:
+        with _stage(job, "enrich"):
+            enrich_report = enrich_urls(
+                [it.get("url", "") for it in items],
+                on_progress=job.progress if job is not None else None,
+            )
+        pub_dates = enrich_report.pop("dates")
+
+    # 4) Persistência (upsert em lote; (termo, url canônica) já salvos são ignorados)
+    with _stage(job, "persist"), get_session() as s:
+        inserted_ids, skipped = upsert_mentions(s, _rows_for(term, items, pub_dates))
+        s.commit()
+    inserted = len(inserted_ids)
+    if inserted:
+        live.notify()
+
+    print(f"[SEARCH] Salvos {inserted} novos, {skipped} já existentes para '{term}'.")
+    out = {"termo": term, "total": inserted, "inserted": inserted, "skipped": skipped}
+    if enrich_report is not None:
+        out["enrich"] = enrich_report
+    return out
+
+
+@register("search_many")
+def run_search_many(
+    terms: List[str],
+    qty: Optional[int] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    enrich_dates: bool = False,
+    job=None,
+) -> Dict:
+    """
+    Vários termos de uma vez: a CSE roda em paralelo (ver cse_search_many),
+    o enriquecimento de datas é um só para todas as URLs e a persistência é
+    por termo. O resultado traz, por termo, páginas, requisições e erros, e
+    o consumo de cota.
+    """
+    terms = [t.strip() for t in dict.fromkeys(terms) if t and t.strip()]
+    if not terms:
+        raise ValueError("informe ao menos um termo")
+    qty_eff = 50 if not qty else max(1, min(int(qty), 100))
+    print(f"[SEARCH] {len(terms)} termos, qty={qty_eff}, date_from={date_from}, date_to={date_to}")
+
+    with _stage(job, "cse"):
+        pages_planned = {t: (qty_eff + 9) // 10 for t in terms}
+        pages_done: Dict[str, int] = {}
+
+        def on_term(term: str, p: Dict) -> None:
+            pages_planned[term] = p["planned"]
+            pages_done[term] = p["pages"]
+            if job is not None:
+                job.progress(sum(pages_done.values()), sum(pages_planned.values()))
+
+        res = cse_search_many(
+            terms, total=qty_eff, date_from=date_from, date_to=date_to, on_progress=on_term,
+        )
+
+    by_term = {t: _dedup(r["items"]) for t, r in res["terms"].items()}
+
+    pub_dates = {}
+    enrich_report = None
+    if enrich_dates:
+        with _stage(job, "enrich"):
+            enrich_report = enrich_urls(
+                [it.get("url", "") for items in by_term.values() for it in items],
+                on_progress=job.progress if job is not None else None,
+            )
+        pub_dates = enrich_report.pop("dates")
+
+    out_terms = {}
+    with _stage(job, "persist"), get_session() as s:
+        for term, items in by_term.items():
+            inserted_ids, skipped = upsert_mentions(s, _rows_for(term, items, pub_dates))
+            r = res["terms"][term]
+            out_terms[term] = {
+                "total": len(items), "inserted": len(inserted_ids), "skipped": skipped,
+                "pages": r["pages"], "requests": r["requests"], "retries": r["retries"],
+                "error": r["error"],
+            }
+        s.commit()
+
+    inserted = sum(t["inserted"] for t in out_terms.values())
+    if inserted:
+        live.notify()
+    print(f"[SEARCH] Salvos {inserted} novos em {len(terms)} termos.")
+    # cada requisição (inclusive repetições) consome uma consulta da cota
+    quota = dict(res["quota"], used_by_run=sum(t["requests"] for t in out_terms.values()))
+    out = {"terms": out_terms, "inserted": inserted, "quota": quota}
+    if enrich_report is not None:
+        out["enrich"] = enrich_report
+    return out
+
+
+@register("enrich_dates")
+def run_enrich_dates(
+    limit: int = 50,
+    only_missing: bool = True,
+    concurrency: Optional[int] = None,
+    per_host: Optional[int] = None,
+    use_cache: bool = True,
+    job=None,
+) -> Dict:
+    with get_session() as s:
+        with _stage(job, "select"):
+            stmt = select(Mention).order_by(Mention.id.desc())
+            if only_missing:
+                stmt = stmt.where(Mention.published_at.is_(None))
+            rows = s.exec(stmt.limit(max(1, min(limit, 500)))).all()
+        if not rows:
+            return {"processed": 0, "updated": 0}
+
+        with _stage(job, "enrich"):
+            report = enrich_mentions(
+                s, rows,
+                concurrency=concurrency, per_host=per_host, use_cache=use_cache,
+                on_progress=job.progress if job is not None else None,
+            )
+        with _stage(job, "persist"):
+            s.commit()
+
+    print(
+        f"[ENRICH] {report['fetched']} URLs em {report['elapsed_s']}s "
+        f"({report['urls_per_s']} URLs/s), atualizadas={report['updated']}, "
+        f"falhas={report['failures']}"
+    )
+    return report
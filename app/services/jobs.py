@@ -0,0 +1,174 @@
+# app/services/jobs.py
+"""
+Fila de jobs em processo: os endpoints gravam um `Job` e devolvem o id na hora;
+um pool de threads executa o trabalho pesado (CSE, fetch de páginas, inserts)
+e vai registrando etapa, progresso, tempos por etapa e resultado na tabela.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from sqlmodel import select
+
+from app.db import get_session
+from app.models import Job
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# intervalo mínimo entre gravações de progresso no banco (segundos)
+PROGRESS_FLUSH_S = 0.5
+
+HANDLERS: Dict[str, Callable] = {}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def register(kind: str):
+    """Decorator: registra a função que executa jobs do tipo `kind`."""
+    def deco(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return deco
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+        return _executor
+
+
+def _update(job_id: int, **fields) -> None:
+    with get_session() as s:
+        job = s.get(Job, job_id)
+        if not job:
+            return
+        for k, v in fields.items():
+            setattr(job, k, v)
+        s.add(job)
+        s.commit()
+
+
+class JobContext:
+    """Passado ao handler para reportar etapas e progresso."""
+
+    def __init__(self, job_id: int):
+        self.id = job_id
+        self.stages: Dict[str, float] = {}
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        _update(self.id, stage=name, progress_done=0, progress_total=0)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(time.perf_counter() - t0, 3)
+            _update(self.id, stages_json=json.dumps(self.stages))
+
+    def progress(self, done: int, total: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if done < total and now - self._last_flush < PROGRESS_FLUSH_S:
+                return
+            self._last_flush = now
+        _update(self.id, progress_done=done, progress_total=total)
+
+
+def _run(job_id: int) -> None:
+    with get_session() as s:
+        job = s.get(Job, job_id)
+        if not job or job.status != "queued":
+            return
+        kind, params = job.kind, json.loads(job.params_json or "{}")
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        s.add(job)
+        s.commit()
+
+    ctx = JobContext(job_id)
+    try:
+        result = HANDLERS[kind](job=ctx, **params)
+    except Exception as e:
+        print(f"[JOB] #{job_id} ({kind}) falhou: {e}")
+        traceback.print_exc()
+        _update(
+            job_id, status="error", error=str(e)[:2000],
+            stage=None, finished_at=datetime.utcnow(),
+        )
+        return
+
+    _update(
+        job_id, status="done", stage=None,
+        result_json=json.dumps(result, default=str),
+        finished_at=datetime.utcnow(),
+    )
+
+
+def submit(kind: str, params: Dict) -> Job:
+    """Grava o job como 'queued' e agenda a execução no pool."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Tipo de job desconhecido: {kind}")
+    with get_session() as s:
+        job = Job(kind=kind, params_json=json.dumps(params))
+        s.add(job)
+        s.commit()
+        s.refresh(job)
+    _pool().submit(_run, job.id)
+    return job
+
+
+def resume_pending() -> int:
+    """
+    No startup: jobs 'running' de um processo anterior são marcados como erro;
+    os que ainda estavam 'queued' voltam para o pool.
+    """
+    with get_session() as s:
+        for job in s.exec(select(Job).where(Job.status == "running")).all():
+            job.status = "error"
+            job.error = "interrompido (reinício do servidor)"
+            job.finished_at = datetime.utcnow()
+            s.add(job)
+        s.commit()
+        queued = s.exec(select(Job.id).where(Job.status == "queued").order_by(Job.id)).all()
+    for job_id in queued:
+        _pool().submit(_run, job_id)
+    return len(queued)
+
+
+def job_to_dict(job: Job) -> Dict:
+    elapsed = None
+    if job.started_at:
+        elapsed = round(((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds(), 3)
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": json.loads(job.params_json or "{}"),
+        "stage": job.stage,
+        "progress": {"done": job.progress_done, "total": job.progress_total},
+        "stages": json.loads(job.stages_json or "{}"),
+        "elapsed_s": elapsed,
+        "result": json.loads(job.result_json) if job.result_json else None,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() + "Z",
+        "started_at": job.started_at.isoformat() + "Z" if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() + "Z" if job.finished_at else None,
+    }
+
+
+def shutdown(wait: bool = False) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=not wait)
+            _executor = None
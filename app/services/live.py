@@ -0,0 +1,277 @@
+# app/services/live.py
+"""
+Feed ao vivo das menções novas (GET /mentions/stream, Server-Sent Events).
+
+Um único hub por processo acompanha as inserções e distribui para os clientes
+conectados; o custo no banco não depende de quantos dashboards estão abertos:
+  - marca d'água por id: a cada rodada, uma consulta traz as menções com
+    id > último id visto (até LIVE_BATCH, pela chave primária);
+  - os inscritos são agrupados por filtro (mesmos campos de GET /mentions):
+    cada filtro distinto custa uma consulta restrita aos ids novos, com o
+    mesmo filter_conditions das rotas; sem filtro, nenhuma;
+  - o JSON de cada grupo é montado uma vez e posto na fila de cada inscrito.
+O hub acorda logo após cada commit da ingestão deste processo (notify(), em
+run_search / run_search_many, o que inclui os monitores) e, para inserções de
+outros workers ou scripts, consulta a cada LIVE_POLL_S segundos. Sem inscritos
+ele para.
+
+Eventos:
+  mention    uma menção nova (formato de GET /mentions), `id` = id da menção
+  analytics  deltas do lote para o filtro do cliente (somar ao que veio de
+             GET /analytics): total e contagens por sentimento, canal, dia
+             (created_at ou published_at, conforme date_field) e tag;
+             `id` = marca d'água do lote
+  ready      enviado ao conectar, `id` = marca d'água atual
+  reset      o cliente perdeu eventos (fila cheia ou reconexão com lacuna
+             maior que LIVE_BACKFILL): recarregue /mentions e /analytics
+Ao reconectar, o EventSource manda Last-Event-ID e o que foi inserido no
+intervalo é reenviado (até LIVE_BACKFILL menções).
+
+Só inserções entram no feed (exclusões e edições de tags, não). Uma menção
+cuja transação comita depois de outra com id maior (ingestões simultâneas)
+pode escapar da marca d'água; a próxima recarga de /mentions a mostra.
+"""
+import asyncio
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func as sa_func
+from sqlmodel import select
+
+from app.db import run_db
+from app.filters import MentionFilter, filter_conditions
+from app.models import Mention
+from app.services import tags as tags_svc
+
+LIVE_POLL_S = float(os.getenv("LIVE_POLL_S", "5"))
+LIVE_HEARTBEAT_S = float(os.getenv("LIVE_HEARTBEAT_S", "15"))
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", "1000"))
+LIVE_QUEUE_MAX = int(os.getenv("LIVE_QUEUE_MAX", "100"))  # lotes pendentes por cliente
+LIVE_BATCH = 500
+LIVE_BACKFILL = 500
+RETRY_MS = 5000
+
+_FILTER_FIELDS = ("q", "q_mode", "canal", "sentimento", "tag", "date_field", "date_from", "date_to")
+
+
+class HubFull(Exception):
+    pass
+
+
+def _sse(event: str, data, event_id: Optional[int] = None) -> str:
+    head = f"event: {event}\n" + (f"id: {event_id}\n" if event_id is not None else "")
+    return head + "data: " + json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n\n"
+
+
+def delta(rows: List[dict], f: MentionFilter) -> Dict:
+    """Contagens das menções `rows`, com as chaves de GET /analytics."""
+    day_field = "created_at" if f.date_field == "mined" else "published_at"
+    return {
+        "total": len(rows),
+        "by_sentiment": dict(Counter(r["sentimento"] for r in rows)),
+        "by_channel": dict(Counter(r["canal"] for r in rows)),
+        "timeseries_daily": dict(Counter(r[day_field][:10] for r in rows if r[day_field])),
+        "top_tags": dict(Counter(t for r in rows for t in r["tags"])),
+    }
+
+
+def encode_batch(rows: List[dict], f: MentionFilter, watermark: int) -> str:
+    return "".join(_sse("mention", r, r["id"]) for r in rows) + _sse("analytics", delta(rows, f), watermark)
+
+
+# -----------------------------
+# Consultas (rodam via run_db)
+# -----------------------------
+def _max_id(s) -> int:
+    return s.exec(select(sa_func.max(Mention.id))).one() or 0
+
+
+def _dicts(s, rows) -> List[dict]:
+    tags_by_id = tags_svc.tags_for(s, [m.id for m in rows])
+    return [m.to_dict(tags_by_id.get(m.id)) for m in rows]
+
+
+def _collect(s, last_id: int, filters: Dict[tuple, MentionFilter]) -> Tuple[int, int, Dict[tuple, List[dict]]]:
+    """(nova marca d'água, menções lidas, {filtro: menções que casam})."""
+    rows = s.exec(select(Mention).where(Mention.id > last_id).order_by(Mention.id).limit(LIVE_BATCH)).all()
+    if not rows:
+        return last_id, 0, {}
+    ids = [m.id for m in rows]
+    by_id = {d["id"]: d for d in _dicts(s, rows)}
+    out = {}
+    for key, f in filters.items():
+        if f.is_empty():
+            out[key] = list(by_id.values())
+            continue
+        matched = s.exec(
+            select(Mention.id).where(Mention.id.in_(ids), *filter_conditions(f)).order_by(Mention.id)
+        ).all()
+        out[key] = [by_id[i] for i in matched]
+    return ids[-1], len(rows), out
+
+
+def _backfill(s, f: MentionFilter, after_id: int, upto: int) -> Tuple[List[dict], bool]:
+    rows = s.exec(
+        select(Mention)
+        .where(Mention.id > after_id, Mention.id <= upto, *filter_conditions(f))
+        .order_by(Mention.id)
+        .limit(LIVE_BACKFILL + 1)
+    ).all()
+    return _dicts(s, rows[:LIVE_BACKFILL]), len(rows) > LIVE_BACKFILL
+
+
+# -----------------------------
+# Hub
+# -----------------------------
+class Subscriber:
+    def __init__(self, f: MentionFilter):
+        self.filter = f
+        self.key = tuple(getattr(f, k) for k in _FILTER_FIELDS)
+        self.queue: asyncio.Queue = asyncio.Queue(LIVE_QUEUE_MAX)
+        self.pending: List[str] = []  # enviado antes da fila (reenvio e `ready`)
+        self.dropped = False
+
+
+class Hub:
+    def __init__(self):
+        self._subs: Dict[tuple, Set[Subscriber]] = {}
+        self._count = 0
+        self._last_id = 0
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.stats = {"polls": 0, "batches": 0, "mentions": 0, "sent": 0, "dropped": 0, "errors": 0}
+
+    # inscrição ---------------------------------------------------------
+    async def subscribe(self, f: MentionFilter, after_id: Optional[int] = None) -> Subscriber:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # primeiro uso neste event loop: estado de um loop anterior não vale
+            self._subs, self._count, self._task = {}, 0, None
+            self._loop, self._wake, self._lock = loop, asyncio.Event(), asyncio.Lock()
+        if self._count >= LIVE_MAX_SUBSCRIBERS:
+            raise HubFull(f"limite de {LIVE_MAX_SUBSCRIBERS} conexões ao vivo")
+
+        sub = Subscriber(f)
+        async with self._lock:
+            if self._task is None:
+                self._last_id = await run_db(_max_id)
+            self._subs.setdefault(sub.key, set()).add(sub)
+            self._count += 1
+            if self._task is None:
+                self._task = asyncio.create_task(self._run())
+        watermark = self._last_id
+
+        if after_id is not None and after_id < watermark:
+            rows, truncated = await run_db(_backfill, f, after_id, watermark)
+            if truncated:
+                sub.pending.append(_sse("reset", {"reason": "gap", "last_id": watermark}))
+            elif rows:
+                sub.pending.append(encode_batch(rows, f, watermark))
+        sub.pending.append(_sse("ready", {"last_id": watermark}, watermark))
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        group = self._subs.get(sub.key)
+        if group is not None and sub in group:
+            group.discard(sub)
+            self._count -= 1
+            if not group:
+                del self._subs[sub.key]
+
+    def notify(self) -> None:
+        """Acorda o hub (seguro fora do event loop, ex.: em jobs)."""
+        loop, wake = self._loop, self._wake
+        if self._task is not None and loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    # distribuição ------------------------------------------------------
+    async def _run(self) -> None:
+        try:
+            while self._count:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), LIVE_POLL_S)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                try:
+                    more = True
+                    while self._count and more:
+                        # inscrições entram entre rodadas, nunca no meio de um lote
+                        async with self._lock:
+                            more = await self._tick()
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"[LIVE] erro ao buscar menções novas: {e}")
+        finally:
+            self._task = None
+
+    async def _tick(self) -> bool:
+        """Uma rodada; True se o lote veio cheio (há mais para ler)."""
+        filters = {key: next(iter(group)).filter for key, group in self._subs.items()}
+        last_id, n, by_key = await run_db(_collect, self._last_id, filters)
+        self.stats["polls"] += 1
+        if not n:
+            return False
+        self._last_id = last_id
+        self.stats["batches"] += 1
+        self.stats["mentions"] += n
+        for key, rows in by_key.items():
+            group = self._subs.get(key)
+            if not rows or not group:
+                continue
+            chunk = encode_batch(rows, next(iter(group)).filter, last_id)
+            for sub in list(group):
+                try:
+                    sub.queue.put_nowait(chunk)
+                    self.stats["sent"] += 1
+                except asyncio.QueueFull:
+                    # cliente lento: sai do hub e recebe `reset`
+                    sub.dropped = True
+                    self.unsubscribe(sub)
+                    self.stats["dropped"] += 1
+        return n >= LIVE_BATCH
+
+    def info(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "subscribers": self._count,
+            "filters": len(self._subs),
+            "last_id": self._last_id,
+            "poll_s": LIVE_POLL_S,
+            "max_subscribers": LIVE_MAX_SUBSCRIBERS,
+            **self.stats,
+        }
+
+
+hub = Hub()
+
+
+def notify() -> None:
+    hub.notify()
+
+
+async def stream(sub: Subscriber, is_disconnected):
+    """Corpo text/event-stream do inscrito; `is_disconnected` é Request.is_disconnected."""
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        for chunk in sub.pending:
+            yield chunk
+        sub.pending = []
+        while True:
+            if sub.dropped:
+                yield _sse("reset", {"reason": "slow_consumer"})
+                return
+            try:
+                chunk = await asyncio.wait_for(sub.queue.get(), LIVE_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            yield chunk
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,141 @@
+# app/services/monitors.py
+"""
+Monitores: termos salvos buscados periodicamente.
+
+Um agendador em processo (thread) acorda a cada MONITOR_TICK_S e enfileira um
+job 'monitor' para cada monitor vencido (next_run_at <= agora), respeitando
+MONITOR_CONCURRENCY jobs de monitor em andamento. O próximo horário leva um
+jitter de ±MONITOR_JITTER do intervalo, para os monitores não dispararem
+juntos. O agendamento é reivindicado com UPDATE ... WHERE next_run_at = <lido>,
+então vários processos (workers do gunicorn) não executam o mesmo monitor duas
+vezes.
+
+Cada execução é incremental: a janela `sort=date:r:` começa no dia da última
+execução concluída e a paginação para ao chegar em URLs já salvas para o termo
+(run_search(incremental=True)). Respostas da CSE em cache só valem se mais
+novas que meio intervalo do monitor (cache_max_age), para cada execução ver
+resultados novos mesmo com a mesma janela do dia.
+"""
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import update
+from sqlmodel import select
+
+from app.db import get_session
+from app.models import Job, Monitor
+from app.services import jobs
+from app.services.ingest import run_search
+from app.services.jobs import register
+
+MONITOR_TICK_S = float(os.getenv("MONITOR_TICK_S", "15"))
+MONITOR_CONCURRENCY = int(os.getenv("MONITOR_CONCURRENCY", "2"))
+MONITOR_JITTER = float(os.getenv("MONITOR_JITTER", "0.1"))
+MIN_INTERVAL_S = 60
+
+_thread: Optional[threading.Thread] = None
+_stop = threading.Event()
+
+
+def next_run(interval_s: int, now: Optional[datetime] = None) -> datetime:
+    jitter = interval_s * MONITOR_JITTER * random.uniform(-1, 1)
+    return (now or datetime.utcnow()) + timedelta(seconds=interval_s + jitter)
+
+
+@register("monitor")
+def run_monitor(monitor_id: int, job=None) -> Dict:
+    with get_session() as s:
+        mon = s.get(Monitor, monitor_id)
+        if mon is None:
+            raise ValueError(f"monitor {monitor_id} não existe")
+        term, qty, enrich, since = mon.term, mon.qty, mon.enrich_dates, mon.last_run_at
+        interval_s = mon.interval_s
+
+    started = datetime.utcnow()
+    # janela desde o dia da última execução (a CSE filtra por dia)
+    date_from = since.date().isoformat() if since else None
+    date_to = started.date().isoformat() if since else None
+    out = run_search(
+        term, qty=qty, date_from=date_from, date_to=date_to,
+        enrich_dates=enrich, incremental=True, job=job,
+        # respostas em cache só se mais novas que meio intervalo: cada execução
+        # vê a API, mas monitores do mesmo termo próximos no tempo compartilham
+        cache_max_age=interval_s / 2,
+    )
+
+    with get_session() as s:
+        mon = s.get(Monitor, monitor_id)
+        if mon is not None:
+            mon.last_run_at = started
+            s.add(mon)
+            s.commit()
+    return dict(out, monitor_id=monitor_id, since=date_from)
+
+
+def _running() -> int:
+    with get_session() as s:
+        return len(s.exec(
+            select(Job.id).where(Job.kind == "monitor", Job.status.in_(("queued", "running")))
+        ).all())
+
+
+def enqueue(mon: Monitor, s) -> Optional[Job]:
+    """Reivindica o horário de `mon` e enfileira o job; None se outro processo já pegou."""
+    claimed = s.execute(
+        update(Monitor)
+        .where(Monitor.id == mon.id, Monitor.next_run_at == mon.next_run_at)
+        .values(next_run_at=next_run(mon.interval_s))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    s.commit()
+    if not claimed:
+        return None
+    job = jobs.submit("monitor", {"monitor_id": mon.id})
+    s.execute(update(Monitor).where(Monitor.id == mon.id).values(last_job_id=job.id))
+    s.commit()
+    return job
+
+
+def tick() -> int:
+    """Enfileira os monitores vencidos (até o limite de concorrência)."""
+    free = MONITOR_CONCURRENCY - _running()
+    if free <= 0:
+        return 0
+    submitted = 0
+    with get_session() as s:
+        due = s.exec(
+            select(Monitor)
+            .where(Monitor.enabled == True, Monitor.next_run_at <= datetime.utcnow())  # noqa: E712
+            .order_by(Monitor.next_run_at)
+            .limit(free)
+        ).all()
+        for mon in due:
+            if enqueue(mon, s) is not None:
+                submitted += 1
+    return submitted
+
+
+def _loop() -> None:
+    while not _stop.wait(MONITOR_TICK_S * random.uniform(0.8, 1.2)):
+        try:
+            tick()
+        except Exception as e:
+            print(f"[MONITOR] falha no agendador: {e}")
+
+
+def start() -> None:
+    global _thread
+    if _thread is not None or os.getenv("MONITOR_SCHEDULER", "1") == "0":
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="monitor-scheduler", daemon=True)
+    _thread.start()
+
+
+def stop() -> None:
+    global _thread
+    _stop.set()
+    _thread = None
@@ -0,0 +1,40 @@
+# app/services/page_meta.py
+"""
+Metadados de página (tabela page_meta, uma linha por URL), preenchidos pelo
+enriquecimento a partir do mesmo download usado para a data de publicação.
+"""
+from typing import Dict, Iterable, List
+
+from sqlmodel import select
+
+from app.db import dialect_insert, get_session
+from app.models import PageMeta
+
+FIELDS = ["canonical_url", "title", "description", "author", "lang", "site_name", "excerpt"]
+ID_CHUNK = 500
+
+
+def store(rows: List[Dict]) -> None:
+    """Upsert em lote (a última extração substitui a anterior)."""
+    if not rows:
+        return
+    with get_session() as s:
+        insert = dialect_insert(s)
+        for i in range(0, len(rows), 100):
+            stmt = insert(PageMeta).values(rows[i:i + 100])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["url"],
+                set_={c: getattr(stmt.excluded, c) for c in FIELDS + ["fetched_at"]},
+            )
+            s.execute(stmt)
+        s.commit()
+
+
+def meta_for(s, urls: Iterable[str]) -> Dict[str, Dict]:
+    """{url: metadados} para as URLs que já têm page_meta."""
+    urls = list(dict.fromkeys(u for u in urls if u))
+    out: Dict[str, Dict] = {}
+    for i in range(0, len(urls), ID_CHUNK):
+        for row in s.exec(select(PageMeta).where(PageMeta.url.in_(urls[i:i + ID_CHUNK]))).all():
+            out[row.url] = row.to_dict()
+    return out
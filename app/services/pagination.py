@@ -0,0 +1,50 @@
+# app/services/pagination.py
+"""
+Paginação por cursor (keyset) para /mentions e contagem total opcional.
+O cursor é opaco para o cliente (base64 de {"id": ...}); internamente a página
+seguinte é `id < cursor` e a anterior `id > cursor`, sempre pelo índice da PK,
+então o custo não cresce com a profundidade da página.
+"""
+import base64
+import json
+from typing import Optional
+
+from sqlalchemy import func as sa_func
+from sqlmodel import select
+
+
+def encode_cursor(mention_id: int) -> str:
+    raw = json.dumps({"id": mention_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Aceita o cursor opaco ou um id numérico simples. ValueError se inválido."""
+    if cursor.isdigit():
+        return int(cursor)
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(cursor + pad))["id"])
+    except Exception:
+        raise ValueError("cursor inválido")
+
+
+def exact_count(s, stmt) -> int:
+    return s.exec(select(sa_func.count()).select_from(stmt.subquery())).one()
+
+
+def estimated_count(s, stmt) -> Optional[int]:
+    """
+    Estimativa do planner (Postgres: "Plan Rows" do EXPLAIN). Em outros bancos
+    devolve None e quem chama decide se cai na contagem exata.
+    """
+    bind = s.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = stmt.compile(dialect=bind.dialect, compile_kwargs={"render_postcompile": True})
+    plan = s.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
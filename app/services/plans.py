@@ -0,0 +1,175 @@
+# app/services/plans.py
+"""
+Verificação de planos das consultas quentes de menções.
+
+Cada consulta em HOT_QUERIES é montada com o mesmo código das rotas
+(filter_conditions, has_tag, ...) e passada por EXPLAIN:
+  - SQLite: EXPLAIN QUERY PLAN; "SCAN <tabela>" sem índice é varredura completa;
+  - Postgres: EXPLAIN (FORMAT JSON) com enable_seqscan desligado na transação,
+    então um "Seq Scan" que sobra significa que nenhum índice atende a consulta
+    (vale mesmo com tabelas pequenas, em que o planner preferiria a varredura).
+A verificação falha quando uma consulta varre mention/mention_tag inteira ou,
+nas listagens (list_*), quando ordena as linhas filtradas em vez de lê-las já
+na ordem do índice (SQLite "USE TEMP B-TREE FOR ORDER BY", Postgres "Sort").
+
+    python -m app.services.plans          # todas; código de saída 1 se alguma falhar
+    python -m app.services.plans -v       # mostra os planos
+"""
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func as sa_func
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlmodel import select
+
+from app.db import engine as default_engine
+from app.filters import MentionFilter, filter_conditions
+from app.models import Mention, Monitor
+from app.services import analytics
+from app.services.tags import has_tag
+
+WATCHED = {"mention", "mention_tag"}
+PAGE = 101  # limit + 1, como em GET /mentions
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(_Explain, "sqlite")
+def _explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.stmt, **kw)
+
+
+@compiles(_Explain, "postgresql")
+def _explain_pg(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.stmt, **kw)
+
+
+def _listing(**filters):
+    f = MentionFilter(**filters)
+    return select(Mention).where(*filter_conditions(f)).order_by(Mention.id.desc()).limit(PAGE)
+
+
+def _cluster_sizes():
+    story = analytics.story_key()
+    return select(story, sa_func.count()).where(analytics.story_in([1, 2, 3])).group_by(story)
+
+
+_today = datetime(2024, 1, 1)
+
+# nome -> construtor da consulta (mesmo formato usado pelas rotas/serviços)
+HOT_QUERIES: Dict[str, Callable] = {
+    "list_by_canal": lambda: _listing(canal="Blog"),
+    "list_by_canal_sentimento": lambda: _listing(canal="Blog", sentimento="negativo"),
+    "list_by_sentimento": lambda: _listing(sentimento="negativo"),
+    "list_keyset_page": lambda: (
+        select(Mention).where(Mention.id < 1000).order_by(Mention.id.desc()).limit(PAGE)
+    ),
+    "count_mined_range": lambda: select(sa_func.count()).select_from(Mention).where(
+        *filter_conditions(MentionFilter(date_from="2024-01-01", date_to="2024-01-07"))
+    ),
+    "count_published_range": lambda: select(sa_func.count()).select_from(Mention).where(
+        *filter_conditions(MentionFilter(date_field="published", date_from="2024-01-01", date_to="2024-01-07"))
+    ),
+    "list_by_tag": lambda: (
+        select(Mention).where(has_tag("crise")).order_by(Mention.id.desc()).limit(PAGE)
+    ),
+    "enrich_backlog": lambda: (
+        select(Mention.id).where(Mention.published_at.is_(None)).order_by(Mention.id.desc()).limit(500)
+    ),
+    "known_urls": lambda: select(Mention.url_canonical).where(
+        Mention.termo == "x", Mention.url_canonical.in_(["https://a.com/1", "https://b.com/2"])
+    ),
+    "cluster_sizes": _cluster_sizes,
+    "monitors_due": lambda: select(Monitor.id).where(
+        Monitor.enabled == True, Monitor.next_run_at <= _today + timedelta(days=1)  # noqa: E712
+    ),
+}
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+SORT = "<sort>"
+
+
+def _sqlite_scans(rows) -> Tuple[List[str], List[str]]:
+    plan, scans = [], []
+    for row in rows:
+        detail = row[-1]
+        plan.append(detail)
+        m = _SQLITE_SCAN.match(detail)
+        if m:
+            scans.append(m.group(1))
+        elif detail == "USE TEMP B-TREE FOR ORDER BY":
+            scans.append(SORT)
+    return plan, scans
+
+
+def _pg_scans(doc) -> Tuple[List[str], List[str]]:
+    plan, scans = [], []
+
+    def walk(node, depth=0):
+        rel = node.get("Relation Name")
+        index = node.get("Index Name")
+        plan.append("  " * depth + node["Node Type"] + (f" on {rel}" if rel else "") + (f" using {index}" if index else ""))
+        if node["Node Type"] == "Seq Scan" and rel:
+            scans.append(rel)
+        elif node["Node Type"] in ("Sort", "Incremental Sort"):
+            scans.append(SORT)
+        for child in node.get("Plans", []):
+            walk(child, depth + 1)
+
+    walk(doc[0]["Plan"])
+    return plan, scans
+
+
+def explain(conn, stmt) -> Tuple[List[str], List[str]]:
+    """(linhas do plano, tabelas varridas por completo e SORT se houver ordenação)."""
+    rows = conn.execute(_Explain(stmt)).all()
+    if conn.dialect.name == "postgresql":
+        doc = rows[0][0]
+        if isinstance(doc, str):
+            doc = json.loads(doc)
+        return _pg_scans(doc)
+    return _sqlite_scans(rows)
+
+
+def check(engine=None, names: Optional[List[str]] = None) -> List[Dict]:
+    engine = engine or default_engine
+    out = []
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            if conn.dialect.name == "postgresql":
+                conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            for name, build in HOT_QUERIES.items():
+                if names and name not in names:
+                    continue
+                plan, scans = explain(conn, build())
+                bad = sorted(set(scans) & (WATCHED | ({SORT} if name.startswith("list_") else set())))
+                out.append({"query": name, "ok": not bad, "full_scans": bad, "plan": plan})
+        finally:
+            trans.rollback()
+    return out
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.db import init_db
+
+    verbose = "-v" in sys.argv[1:]
+    init_db()
+    results = check(names=[a for a in sys.argv[1:] if not a.startswith("-")] or None)
+    for r in results:
+        status = "ok  " if r["ok"] else "SCAN"
+        print(f"[PLAN] {status} {r['query']}" + (f"  ({', '.join(r['full_scans'])})" if r["full_scans"] else ""))
+        if verbose or not r["ok"]:
+            for line in r["plan"]:
+                print(f"         {line}")
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
@@ -0,0 +1,129 @@
+# app/services/response_cache.py
+"""
+Cache em memória das respostas de GET /mentions e GET /analytics.
+
+O dashboard recarrega as duas rotas a cada atualização e troca de página,
+quase sempre com os mesmos filtros e sem dado novo no meio. As respostas
+(já serializadas em JSON) ficam num LRU por processo, com chave = rota +
+parâmetros normalizados (valores efetivos, sem os vazios, em ordem) e
+marcadas com a versão dos dados (app/services/data_version.py) em que foram
+calculadas: uma entrada de versão anterior é descartada na leitura, e a
+primeira gravação de uma versão nova limpa as antigas de uma vez.
+
+ETag = versão + hash da chave. Um If-None-Match igual à ETag atual vira 304
+sem calcular nem ler o cache; o navegador revalida a cada chamada
+(Cache-Control: no-cache).
+
+Memória limitada por RESPONSE_CACHE_MAX_BYTES (soma dos corpos) e
+RESPONSE_CACHE_MAX_ENTRIES; respostas maiores que 1/8 do limite não entram.
+RESPONSE_CACHE=0 desliga o cache (a ETag/304 continua valendo).
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+ENABLED = os.getenv("RESPONSE_CACHE", "1").lower() not in ("0", "false", "no")
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+MAX_ITEM_BYTES = RESPONSE_CACHE_MAX_BYTES // 8
+
+_lock = threading.Lock()
+_entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+_bytes = 0
+_version = 0  # maior versão já gravada
+stats = {"hits": 0, "misses": 0, "not_modified": 0, "writes": 0, "evictions": 0, "invalidations": 0}
+
+
+def cache_key(path: str, params: Dict) -> str:
+    """Chave normalizada: rota + parâmetros não vazios em ordem alfabética."""
+    clean = {k: v for k, v in params.items() if v is not None and v != "" and v != []}
+    return path + "?" + json.dumps(clean, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def etag(key: str, version: int) -> str:
+    return f'"{version}-{hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def _drop(key: str) -> None:
+    global _bytes
+    _, body = _entries.pop(key)
+    _bytes -= len(body)
+
+
+def get(key: str, version: int) -> Optional[bytes]:
+    """Corpo em cache para `key` calculado na versão `version`, ou None."""
+    if not ENABLED:
+        return None
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None or entry[0] != version:
+            if entry is not None:
+                _drop(key)
+            stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        stats["hits"] += 1
+        return entry[1]
+
+
+def put(key: str, version: int, body: bytes) -> None:
+    global _bytes, _version
+    if not ENABLED or len(body) > MAX_ITEM_BYTES:
+        return
+    with _lock:
+        if version < _version:
+            return  # calculada antes de uma escrita que outra requisição já viu
+        if version > _version:
+            if _entries:
+                stats["invalidations"] += 1
+            _entries.clear()
+            _bytes = 0
+            _version = version
+        if key in _entries:
+            _drop(key)
+        _entries[key] = (version, body)
+        _bytes += len(body)
+        stats["writes"] += 1
+        while _entries and (_bytes > RESPONSE_CACHE_MAX_BYTES or len(_entries) > RESPONSE_CACHE_MAX_ENTRIES):
+            _drop(next(iter(_entries)))
+            stats["evictions"] += 1
+
+
+def not_modified() -> None:
+    with _lock:
+        stats["not_modified"] += 1
+
+
+def clear() -> int:
+    global _bytes
+    with _lock:
+        n = len(_entries)
+        _entries.clear()
+        _bytes = 0
+    return n
+
+
+def info() -> Dict:
+    with _lock:
+        return {
+            "enabled": ENABLED,
+            "entries": len(_entries),
+            "bytes": _bytes,
+            "max_bytes": RESPONSE_CACHE_MAX_BYTES,
+            "max_entries": RESPONSE_CACHE_MAX_ENTRIES,
+            "version": _version,
+            **stats,
+        }
@@ -0,0 +1,278 @@
+# app/services/retention.py
+"""
+Retenção e arquivo morto das menções.
+
+Políticas (tabela retention_policy) dizem quantos dias manter por termo, com
+uma política global (termo '') para os demais; sem política nada expira. O
+job `archive` move para ARCHIVE_DIR os meses inteiros (por created_at) que
+ficaram mais antigos que keep_days e os apaga do banco (rollups, tags e
+faixas de SimHash junto, via bulk.delete_by_ids). As consultas do dia a dia
+só veem os meses recentes.
+
+Arquivo: um arquivo por mês (mention-YYYY-MM.ndjson.gz), com um membro gzip
+por segmento de até ARCHIVE_SEGMENT_ROWS menções do mesmo termo (gzip aceita
+membros concatenados, então o arquivo inteiro também abre com zcat). Cada
+segmento é registrado em archive_segment (offset/tamanho) na mesma transação
+que apaga as menções: a leitura só usa segmentos registrados, então uma queda
+entre a gravação e o commit não duplica nem perde menções.
+
+As linhas têm o formato de Mention.to_dict() e podem ser exportadas com os
+filtros de GET /mentions (q vira busca por substring em titulo/trecho).
+"""
+import json
+import os
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func as sa_func
+from sqlmodel import select
+
+from app.db import get_session
+from app.filters import MentionFilter
+from app.models import ArchiveSegment, Mention, RetentionPolicy
+from app.services import bulk, export
+from app.services import tags as tags_svc
+from app.services.jobs import register
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_SEGMENT_ROWS = int(os.getenv("ARCHIVE_SEGMENT_ROWS", "20000"))
+MIN_KEEP_DAYS = 1
+READ_CHUNK = 64 * 1024
+
+_write_lock = threading.Lock()
+
+
+# -----------------------------
+# Políticas
+# -----------------------------
+def policies(s) -> Dict[str, int]:
+    return {p.termo: p.keep_days for p in s.exec(select(RetentionPolicy)).all()}
+
+
+def set_policy(s, termo: Optional[str], keep_days: int) -> RetentionPolicy:
+    """Cria/atualiza a política do termo (None/'' = global). Não faz commit."""
+    if keep_days < MIN_KEEP_DAYS:
+        raise ValueError(f"keep_days mínimo: {MIN_KEEP_DAYS}")
+    pol = s.get(RetentionPolicy, termo or "") or RetentionPolicy(termo=termo or "", keep_days=keep_days)
+    pol.keep_days = keep_days
+    pol.updated_at = datetime.utcnow()
+    s.add(pol)
+    return pol
+
+
+def month_key(dt: datetime) -> str:
+    return f"{dt.year:04d}-{dt.month:02d}"
+
+
+def _month_start(dt: datetime) -> datetime:
+    return datetime(dt.year, dt.month, 1)
+
+
+def _next_month(dt: datetime) -> datetime:
+    return datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1)
+
+
+def cutoff(keep_days: int, now: Optional[datetime] = None) -> datetime:
+    """Início do mês de (agora - keep_days): só meses inteiros antes dele expiram."""
+    return _month_start((now or datetime.utcnow()) - timedelta(days=keep_days))
+
+
+def plan(s, now: Optional[datetime] = None) -> List[Dict]:
+    """Por termo: política aplicada, corte e quantas menções expiraram."""
+    pols = policies(s)
+    out = []
+    for termo, oldest in s.exec(
+        select(Mention.termo, sa_func.min(Mention.created_at)).group_by(Mention.termo)
+    ).all():
+        keep = pols.get(termo, pols.get(""))
+        if keep is None or oldest is None:
+            continue
+        limit = cutoff(keep, now)
+        if oldest >= limit:
+            continue
+        n = s.exec(
+            select(sa_func.count()).select_from(Mention)
+            .where(Mention.termo == termo, Mention.created_at < limit)
+        ).one()
+        out.append({
+            "termo": termo,
+            "keep_days": keep,
+            "cutoff": limit.date().isoformat(),
+            "oldest": oldest.isoformat() + "Z",
+            "expired": n,
+        })
+    return out
+
+
+# -----------------------------
+# Arquivamento
+# -----------------------------
+def _path_for(month: str) -> str:
+    return f"mention-{month}.ndjson.gz"
+
+
+def _append(rel_path: str, data: bytes) -> int:
+    """Acrescenta `data` ao arquivo e devolve o offset em que foi gravado."""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    with _write_lock, open(os.path.join(ARCHIVE_DIR, rel_path), "ab") as fh:
+        offset = fh.tell()
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    return offset
+
+
+def _archive_month(termo: str, start: datetime) -> Tuple[int, int]:
+    """Arquiva as menções de `termo` no mês iniciado em `start`. Retorna (menções, bytes)."""
+    month, end = month_key(start), _next_month(start)
+    moved = written = 0
+    while True:
+        with get_session() as s:
+            rows = s.exec(
+                select(Mention)
+                .where(Mention.termo == termo, Mention.created_at >= start, Mention.created_at < end)
+                .order_by(Mention.id)
+                .limit(ARCHIVE_SEGMENT_ROWS)
+            ).all()
+            if not rows:
+                break
+            ids = [m.id for m in rows]
+            tags_by_id = tags_svc.tags_for(s, ids)
+            data = b"".join(export.encode((m.to_dict(tags_by_id.get(m.id)) for m in rows), gzip=True))
+            rel_path = _path_for(month)
+            offset = _append(rel_path, data)
+            s.add(ArchiveSegment(
+                month=month, termo=termo, path=rel_path, offset=offset, length=len(data),
+                rows=len(rows), min_id=ids[0], max_id=ids[-1],
+            ))
+            bulk.delete_by_ids(s, ids)
+            s.commit()
+        moved += len(rows)
+        written += len(data)
+    return moved, written
+
+
+@register("archive")
+def run_archive(dry_run: bool = False, job=None) -> Dict:
+    with get_session() as s:
+        expired = plan(s)
+    if dry_run:
+        return {"dry_run": True, "terms": expired}
+
+    total = sum(t["expired"] for t in expired)
+    moved = written = 0
+    months = set()
+    for t in expired:
+        with get_session() as s:
+            oldest = s.exec(
+                select(sa_func.min(Mention.created_at)).where(Mention.termo == t["termo"])
+            ).one()
+        limit = datetime.fromisoformat(t["cutoff"])
+        start = _month_start(oldest) if oldest else limit
+        while start < limit:
+            n, b = _archive_month(t["termo"], start)
+            if n:
+                months.add(month_key(start))
+            moved += n
+            written += b
+            if job is not None:
+                job.progress(moved, total)
+            start = _next_month(start)
+
+    print(f"[ARCHIVE] {moved} menções arquivadas ({written} bytes) em {len(months)} mês(es)")
+    return {"archived": moved, "bytes": written, "months": sorted(months), "terms": expired}
+
+
+# -----------------------------
+# Leitura
+# -----------------------------
+def segments(
+    s,
+    termo: Optional[str] = None,
+    month_from: Optional[str] = None,
+    month_to: Optional[str] = None,
+) -> List[ArchiveSegment]:
+    stmt = select(ArchiveSegment)
+    if termo:
+        stmt = stmt.where(ArchiveSegment.termo == termo)
+    if month_from:
+        stmt = stmt.where(ArchiveSegment.month >= month_from)
+    if month_to:
+        stmt = stmt.where(ArchiveSegment.month <= month_to)
+    return s.exec(stmt.order_by(ArchiveSegment.month, ArchiveSegment.id)).all()
+
+
+def summary(s) -> Dict:
+    rows = s.exec(
+        select(
+            ArchiveSegment.month, ArchiveSegment.termo,
+            sa_func.sum(ArchiveSegment.rows), sa_func.sum(ArchiveSegment.length),
+        )
+        .group_by(ArchiveSegment.month, ArchiveSegment.termo)
+        .order_by(ArchiveSegment.month, ArchiveSegment.termo)
+    ).all()
+    items = [{"month": m, "termo": t, "rows": n, "bytes": b} for m, t, n, b in rows]
+    return {
+        "dir": ARCHIVE_DIR,
+        "rows": sum(i["rows"] for i in items),
+        "bytes": sum(i["bytes"] for i in items),
+        "items": items,
+    }
+
+
+def _read_segment(seg: ArchiveSegment) -> Iterator[str]:
+    decomp = zlib.decompressobj(31)
+    pending = b""
+    with open(os.path.join(ARCHIVE_DIR, seg.path), "rb") as fh:
+        fh.seek(seg.offset)
+        left = seg.length
+        while left > 0:
+            chunk = fh.read(min(READ_CHUNK, left))
+            if not chunk:
+                raise IOError(f"arquivo truncado: {seg.path} (segmento {seg.id})")
+            left -= len(chunk)
+            pending += decomp.decompress(chunk)
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line:
+                    yield line.decode("utf-8")
+    pending += decomp.flush()
+    if pending.strip():
+        yield pending.decode("utf-8")
+
+
+def _matches(row: dict, f: MentionFilter) -> bool:
+    if f.canal and row["canal"] != f.canal:
+        return False
+    if f.sentimento and row["sentimento"] != f.sentimento:
+        return False
+    if f.tag and f.tag not in row["tags"]:
+        return False
+    if f.q:
+        q = f.q.lower()
+        if q not in (row["titulo"] or "").lower() and q not in (row["trecho"] or "").lower():
+            return False
+    if f.date_from or f.date_to:
+        value = row["created_at"] if f.date_field == "mined" else row["published_at"]
+        day = value[:10] if value else None
+        if day is None or (f.date_from and day < f.date_from) or (f.date_to and day > f.date_to):
+            return False
+    return True
+
+
+def archived_rows(f: MentionFilter, termo: Optional[str] = None) -> Iterator[dict]:
+    """Menções arquivadas que casam com o filtro, em ordem de mês e id."""
+    mined = f.date_field == "mined"
+    with get_session() as s:
+        segs = segments(
+            s, termo,
+            month_from=f.date_from[:7] if mined and f.date_from else None,
+            month_to=f.date_to[:7] if mined and f.date_to else None,
+        )
+    for seg in segs:
+        for line in _read_segment(seg):
+            row = json.loads(line)
+            if _matches(row, f):
+                yield row
@@ -0,0 +1,201 @@
+# app/services/rollups.py
+"""
+Rollups diários (tabela mention_daily) para responder o /analytics sem
+reagregar as menções brutas.
+
+Manutenção incremental: cada caminho de escrita chama `apply(s, ids, -1)` antes
+de alterar as menções e `apply(s, ids, +1)` depois (ou só um dos dois, em
+inserts e deletes). `apply` é um INSERT ... SELECT ... GROUP BY com
+ON CONFLICT DO UPDATE SET n = n + excluded.n, ou seja, tudo dentro do banco
+e na mesma transação da escrita.
+
+Reconstrução completa:  python -m app.services.rollups rebuild
+"""
+from collections import Counter
+from datetime import date
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import delete, func as sa_func, literal, select as sa_select
+from sqlmodel import select
+
+from app.db import dialect_insert
+from app.filters import MentionFilter
+from app.models import Mention, MentionDaily, MentionTag
+
+DATE_FIELDS = ("mined", "published")
+ID_CHUNK = 500
+
+
+def _date_col(date_field: str):
+    return Mention.created_at if date_field == "mined" else Mention.published_at
+
+
+def _sources(date_field: str, with_tags: bool, with_base: bool, sign: int) -> List:
+    """
+    INSERT ... SELECT ... GROUP BY (sem filtro de ids) que produzem as linhas de
+    rollup de um campo de data: uma sem tag ('') e uma por tag.
+    """
+    col = _date_col(date_field)
+    day = sa_func.date(col)
+    keys = (day, Mention.termo, Mention.canal, Mention.sentimento)
+    n = sign * sa_func.count()
+    out = []
+    if with_base:
+        out.append(
+            sa_select(literal(date_field), *keys, literal(""), n)
+            .select_from(Mention)
+            .where(col.is_not(None))
+            .group_by(*keys)
+        )
+    if with_tags:
+        out.append(
+            sa_select(literal(date_field), *keys, MentionTag.tag, n)
+            .select_from(Mention)
+            .join(MentionTag, MentionTag.mention_id == Mention.id)
+            .where(col.is_not(None))
+            .group_by(*keys, MentionTag.tag)
+        )
+    return out
+
+
+def _upsert(s, grouped) -> None:
+    insert = dialect_insert(s)
+    stmt = insert(MentionDaily).from_select(
+        ["date_field", "day", "termo", "canal", "sentimento", "tag", "n"], grouped
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["date_field", "day", "termo", "canal", "sentimento", "tag"],
+        set_={"n": MentionDaily.n + stmt.excluded.n},
+    )
+    s.execute(stmt)
+
+
+def apply(
+    s,
+    ids: Sequence[int],
+    sign: int,
+    fields: Iterable[str] = DATE_FIELDS,
+    tags: bool = True,
+    base: bool = True,
+) -> None:
+    """Soma (sign=+1) ou subtrai (sign=-1) a contribuição das menções `ids`."""
+    ids = list(ids)
+    if not ids:
+        return
+    for i in range(0, len(ids), ID_CHUNK):
+        chunk = ids[i:i + ID_CHUNK]
+        for field in fields:
+            for src in _sources(field, with_tags=tags, with_base=base, sign=sign):
+                _upsert(s, src.where(Mention.id.in_(chunk)))
+    if sign < 0:
+        s.execute(delete(MentionDaily).where(MentionDaily.n <= 0))
+
+
+def rebuild(s) -> int:
+    """Apaga e recalcula todos os rollups. Não faz commit."""
+    s.execute(delete(MentionDaily))
+    for field in DATE_FIELDS:
+        for src in _sources(field, with_tags=True, with_base=True, sign=+1):
+            _upsert(s, src)
+    return s.exec(select(sa_func.count()).select_from(MentionDaily)).one()
+
+
+# -----------------------------
+# Consulta (usada por app/services/analytics.py)
+# -----------------------------
+def can_answer(f: MentionFilter) -> bool:
+    """Texto livre (q) só pode ser respondido a partir das menções brutas."""
+    return not f.q
+
+
+def compute(s, f: MentionFilter, include: List[str], top_n: int = 20) -> Dict:
+    """
+    Mesmos agregados de analytics.compute, lidos de mention_daily.
+    Com filtro por tag, o top_tags (co-ocorrência) não está no rollup e fica
+    a cargo de quem chama.
+    """
+    ranged = bool(f.date_from or f.date_to)
+    # sem intervalo, totais e quebras são iguais nos dois campos; 'mined' tem todas as menções
+    count_field = f.date_field if ranged else "mined"
+
+    def where(field: str) -> List:
+        conds = [MentionDaily.date_field == field]
+        if f.canal:
+            conds.append(MentionDaily.canal == f.canal)
+        if f.sentimento:
+            conds.append(MentionDaily.sentimento == f.sentimento)
+        if f.date_from:
+            conds.append(MentionDaily.day >= date.fromisoformat(f.date_from))
+        if f.date_to:
+            conds.append(MentionDaily.day <= date.fromisoformat(f.date_to))
+        return conds
+
+    out: Dict = {}
+    need = {"total", "by_sentiment", "by_channel"} & set(include)
+    if need:
+        rows = s.exec(
+            select(MentionDaily.sentimento, MentionDaily.canal, sa_func.sum(MentionDaily.n))
+            .where(*where(count_field), MentionDaily.tag == (f.tag or ""))
+            .group_by(MentionDaily.sentimento, MentionDaily.canal)
+        ).all()
+        senti: Counter = Counter()
+        canal: Counter = Counter()
+        for se, ca, n in rows:
+            senti[se] += n
+            canal[ca] += n
+        total = sum(senti.values())
+        if "total" in include:
+            out["total"] = total
+        if "by_sentiment" in include:
+            out["by_sentiment"] = [{"sentimento": k or "desconhecido", "count": v} for k, v in senti.items()]
+        if "by_channel" in include:
+            out["by_channel"] = [{"canal": k or "desconhecido", "count": v} for k, v in canal.items()]
+
+    if "timeseries_daily" in include:
+        rows = s.exec(
+            select(MentionDaily.day, sa_func.sum(MentionDaily.n))
+            .where(*where(f.date_field), MentionDaily.tag == (f.tag or ""))
+            .group_by(MentionDaily.day)
+            .order_by(MentionDaily.day)
+        ).all()
+        series = [{"date": d.isoformat(), "count": c} for d, c in rows]
+        if f.date_field != "mined" and not ranged:
+            # menções sem published_at ficam num balde sem data, como na consulta bruta
+            total = out.get("total")
+            if total is None:
+                total = s.exec(
+                    select(sa_func.coalesce(sa_func.sum(MentionDaily.n), 0))
+                    .where(*where("mined"), MentionDaily.tag == (f.tag or ""))
+                ).one()
+            missing = total - sum(p["count"] for p in series)
+            if missing > 0:
+                series.insert(0, {"date": None, "count": missing})
+        out["timeseries_daily"] = series
+
+    if "top_tags" in include and not f.tag:
+        cnt = sa_func.sum(MentionDaily.n).label("count")
+        rows = s.exec(
+            select(MentionDaily.tag, cnt)
+            .where(*where(count_field), MentionDaily.tag != "")
+            .group_by(MentionDaily.tag)
+            .order_by(cnt.desc(), MentionDaily.tag)
+            .limit(top_n)
+        ).all()
+        out["top_tags"] = [{"tag": t, "count": c} for t, c in rows]
+
+    return out
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.db import get_session, init_db
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("uso: python -m app.services.rollups rebuild")
+        sys.exit(2)
+    init_db()
+    with get_session() as s:
+        n = rebuild(s)
+        s.commit()
+    print(f"[ROLLUP] {n} linha(s) de rollup recalculadas")
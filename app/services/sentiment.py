@@ -0,0 +1,194 @@
+# app/services/sentiment.py
+"""
+Serviço de sentimento em lote (VADER) com cache.
+
+- score_texts(): devolve o compound de cada texto. Textos repetidos são
+  pontuados uma vez; o resultado fica num LRU em memória (limitado) e na
+  tabela sentiment_cache (persistente entre reinícios), pela chave
+  sha1(versão do léxico + texto).
+- Lotes grandes de textos novos vão para um pool de processos
+  (SENTIMENT_PROCESSES > 0), sem segurar o GIL do processo da API.
+- O cache guarda o compound, não o rótulo: mudar o limiar (SENTIMENT_THRESHOLD)
+  não invalida nada; mudar o léxico muda a versão e, portanto, as chaves.
+- Job 'rescore_sentiment': recalcula `sentimento` das menções salvas.
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from sqlalchemy import func as sa_func
+from sqlmodel import select
+
+from app.db import dialect_insert, get_session
+from app.models import Mention, SentimentCache
+from app.services import bulk
+from app.services.jobs import register
+from app.utils import polarity_batch, sentiment_label
+
+SENTIMENT_THRESHOLD = float(os.getenv("SENTIMENT_THRESHOLD", "0.15"))
+SENTIMENT_PROCESSES = int(os.getenv("SENTIMENT_PROCESSES", "0"))
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "50000"))
+# abaixo disso não compensa mandar para o pool de processos
+POOL_MIN_BATCH = 64
+POOL_CHUNK = 256
+# versão do léxico: entra na chave do cache
+LEXICON_VERSION = os.getenv("SENTIMENT_LEXICON_VERSION", "vader-3.3.2")
+
+_lru: "OrderedDict[str, float]" = OrderedDict()
+_lru_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+stats = {"memory_hits": 0, "db_hits": 0, "scored": 0}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(f"{LEXICON_VERSION}\x00{text or ''}".encode("utf-8")).hexdigest()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: o processo da API tem threads (jobs, servidor) e fork não é seguro
+            _pool = ProcessPoolExecutor(
+                max_workers=SENTIMENT_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _lru_get(keys: List[str]) -> Dict[str, float]:
+    found = {}
+    with _lru_lock:
+        for k in keys:
+            if k in _lru:
+                _lru.move_to_end(k)
+                found[k] = _lru[k]
+    return found
+
+
+def _lru_put(values: Dict[str, float]) -> None:
+    with _lru_lock:
+        for k, v in values.items():
+            _lru[k] = v
+            _lru.move_to_end(k)
+        while len(_lru) > SENTIMENT_CACHE_SIZE:
+            _lru.popitem(last=False)
+
+
+def _db_get(keys: List[str]) -> Dict[str, float]:
+    found: Dict[str, float] = {}
+    with get_session() as s:
+        for i in range(0, len(keys), 500):
+            rows = s.exec(
+                select(SentimentCache.text_hash, SentimentCache.compound)
+                .where(SentimentCache.text_hash.in_(keys[i:i + 500]))
+            ).all()
+            found.update(dict(rows))
+    return found
+
+
+def _db_put(values: Dict[str, float]) -> None:
+    with get_session() as s:
+        insert = dialect_insert(s)
+        items = [{"text_hash": k, "compound": v} for k, v in values.items()]
+        for i in range(0, len(items), 500):
+            s.execute(
+                insert(SentimentCache)
+                .values(items[i:i + 500])
+                .on_conflict_do_nothing(index_elements=["text_hash"])
+            )
+        s.commit()
+
+
+def _compute(texts: List[str]) -> List[float]:
+    if SENTIMENT_PROCESSES > 0 and len(texts) >= POOL_MIN_BATCH:
+        chunks = [texts[i:i + POOL_CHUNK] for i in range(0, len(texts), POOL_CHUNK)]
+        out: List[float] = []
+        for part in _get_pool().map(polarity_batch, chunks):
+            out += part
+        return out
+    return polarity_batch(texts)
+
+
+def score_texts(texts: List[str], persistent: bool = True) -> List[float]:
+    """Compound VADER de cada texto (mesma ordem), usando os caches."""
+    by_key: Dict[str, str] = {}
+    for t in texts:
+        by_key.setdefault(text_hash(t), t or "")
+
+    scores = _lru_get(list(by_key))
+    stats["memory_hits"] += len(scores)
+
+    missing = [k for k in by_key if k not in scores]
+    if missing and persistent:
+        from_db = _db_get(missing)
+        stats["db_hits"] += len(from_db)
+        scores.update(from_db)
+        _lru_put(from_db)
+        missing = [k for k in missing if k not in from_db]
+
+    if missing:
+        computed = dict(zip(missing, _compute([by_key[k] for k in missing])))
+        stats["scored"] += len(computed)
+        scores.update(computed)
+        _lru_put(computed)
+        if persistent:
+            _db_put(computed)
+
+    return [scores[text_hash(t)] for t in texts]
+
+
+def classify_texts(
+    texts: List[str],
+    threshold: Optional[float] = None,
+    persistent: bool = True,
+) -> List[str]:
+    """Rótulos 'positivo' | 'negativo' | 'neutro' para cada texto."""
+    th = SENTIMENT_THRESHOLD if threshold is None else threshold
+    return [sentiment_label(c, th) for c in score_texts(texts, persistent=persistent)]
+
+
+def mention_text(titulo: str, trecho: str) -> str:
+    # mesmo texto usado na ingestão (cse_search)
+    return f"{titulo}. {trecho}"
+
+
+@register("rescore_sentiment")
+def rescore_mentions(
+    batch_size: int = 2000,
+    threshold: Optional[float] = None,
+    job=None,
+) -> Dict:
+    """
+    Recalcula `sentimento` de todas as menções, em lotes por id (keyset).
+    Só grava as que mudaram e ajusta os rollups.
+    """
+    batch_size = max(100, min(int(batch_size), 20000))
+    with get_session() as s:
+        total = s.exec(select(sa_func.count()).select_from(Mention)).one()
+
+    def relabel(rows):
+        return classify_texts([mention_text(t, tr) for _, t, tr in rows], threshold=threshold)
+
+    processed = changed = 0
+    last_id = 0
+    while True:
+        with get_session() as s:
+            last_id, n, c = bulk.relabel_batch(
+                s, "sentimento", (Mention.titulo, Mention.trecho), relabel, last_id, batch_size
+            )
+            if last_id is None:
+                break
+            s.commit()
+        processed += n
+        changed += c
+        if job is not None:
+            job.progress(processed, total)
+
+    print(f"[SENTIMENT] re-score: {processed} menções, {changed} alteradas")
+    return {"processed": processed, "changed": changed, "cache": dict(stats)}
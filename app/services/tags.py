@@ -0,0 +1,86 @@
+# app/services/tags.py
+"""
+Tags normalizadas na tabela mention_tag (índice por tag).
+Filtro por tag é match exato e o top de tags é um GROUP BY no banco.
+Nenhuma função faz commit.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, desc, func as sa_func, literal
+from sqlmodel import select
+
+from app.db import dialect_insert
+from app.models import Mention, MentionTag
+
+
+def clean_tags(tags: Optional[Iterable[str]]) -> List[str]:
+    return sorted({t.strip() for t in (tags or []) if t and t.strip()})
+
+
+def has_tag(tag: str):
+    """Condição SQL: a menção possui exatamente a tag `tag`."""
+    return Mention.id.in_(select(MentionTag.mention_id).where(MentionTag.tag == tag))
+
+
+def tags_for(s, ids: Iterable[int]) -> Dict[int, List[str]]:
+    """{mention_id: [tags ordenadas]} com uma única consulta."""
+    ids = list(ids)
+    out: Dict[int, List[str]] = {i: [] for i in ids}
+    if not ids:
+        return out
+    rows = s.exec(
+        select(MentionTag.mention_id, MentionTag.tag)
+        .where(MentionTag.mention_id.in_(ids))
+        .order_by(MentionTag.mention_id, MentionTag.tag)
+    ).all()
+    for mid, tag in rows:
+        out[mid].append(tag)
+    return out
+
+
+def add_tags_where(s, conds: List, tags: Iterable[str]) -> int:
+    """INSERT ... SELECT por tag: adiciona `tags` a todas as menções de `conds`."""
+    insert = dialect_insert(s)
+    added = 0
+    for tag in clean_tags(tags):
+        src = select(Mention.id, literal(tag)).where(*conds)
+        stmt = (
+            insert(MentionTag)
+            .from_select(["mention_id", "tag"], src)
+            .on_conflict_do_nothing(index_elements=["mention_id", "tag"])
+        )
+        added += s.execute(stmt).rowcount or 0
+    return added
+
+
+def remove_tags_where(s, conds: List, tags: Iterable[str]) -> int:
+    """Remove `tags` de todas as menções de `conds` num único DELETE."""
+    tags = clean_tags(tags)
+    if not tags:
+        return 0
+    stmt = delete(MentionTag).where(MentionTag.tag.in_(tags))
+    if conds:
+        stmt = stmt.where(MentionTag.mention_id.in_(select(Mention.id).where(*conds)))
+    res = s.execute(stmt, execution_options={"synchronize_session": False})
+    return res.rowcount or 0
+
+
+def delete_tags_of(s, mention_ids_select) -> int:
+    """Apaga as tags das menções selecionadas (antes de apagar as menções)."""
+    res = s.execute(
+        delete(MentionTag).where(MentionTag.mention_id.in_(mention_ids_select)),
+        execution_options={"synchronize_session": False},
+    )
+    return res.rowcount or 0
+
+
+def top_tags(s, mention_ids_select, limit: int = 20) -> List[Dict]:
+    cnt = sa_func.count().label("count")
+    stmt = (
+        select(MentionTag.tag, cnt)
+        .where(MentionTag.mention_id.in_(mention_ids_select))
+        .group_by(MentionTag.tag)
+        .order_by(desc(cnt), MentionTag.tag)
+        .limit(limit)
+    )
+    return [{"tag": t, "count": c} for t, c in s.exec(stmt).all()]
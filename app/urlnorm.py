@@ -0,0 +1,61 @@
+# app/urlnorm.py
+"""
+Forma canônica de URL, usada na deduplicação das menções (índice único
+(termo, url_canonical)):
+  - esquema e host em minúsculas, sem porta padrão, sem fragmento;
+  - sem os prefixos de host www., m., mobile. e amp.;
+  - sem parâmetros de rastreamento (utm_*, fbclid, gclid, ...);
+  - demais parâmetros em ordem alfabética;
+  - sem barra final (exceto na raiz).
+http e https são tratados como a mesma página.
+"""
+import urllib.parse
+
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "gclsrc", "dclid", "msclkid", "yclid", "igshid", "twclid",
+    "mc_cid", "mc_eid", "_ga", "_gl", "ref_src", "ref_url", "cmpid", "s_cid",
+    "utm", "amp", "outputtype",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_")
+
+
+def _is_tracking(name: str) -> bool:
+    n = name.lower()
+    return n in TRACKING_PARAMS or n.startswith(TRACKING_PREFIXES)
+
+
+def canonicalize(url: str) -> str:
+    """Forma canônica de `url`; devolve a entrada (sem espaços) se não for http(s)."""
+    raw = (url or "").strip()
+    try:
+        parts = urllib.parse.urlsplit(raw)
+        port = parts.port  # ValueError se fora de 0-65535 ou não numérica
+    except ValueError:
+        return raw
+    if parts.scheme.lower() not in ("http", "https") or not parts.hostname:
+        return raw
+
+    host = parts.hostname.lower().rstrip(".")
+    changed = True
+    while changed:
+        changed = False
+        for prefix in HOST_PREFIXES:
+            if host.startswith(prefix) and host.count(".") > 1:
+                host = host[len(prefix):]
+                changed = True
+    if port and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    if path.endswith("/amp") and len(path) > 4:
+        path = path[:-4] or "/"
+
+    query = [
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(k)
+    ]
+    query.sort()
+    return urllib.parse.urlunsplit(("https", host, path, urllib.parse.urlencode(query), ""))
@@ -1,34 +1,22 @@
-import re, urllib.parse
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-
-CHANNEL_MAP = {
-    "facebook.com": "Facebook", "fb.com": "Facebook",
-    "x.com": "X (Twitter)", "twitter.com": "X (Twitter)",
-    "instagram.com": "Instagram",
-    "youtube.com": "YouTube", "youtu.be": "YouTube",
-    "tiktok.com": "TikTok", "linkedin.com": "LinkedIn",
-    "medium.com": "Blog", "blogspot.com": "Blog",
-    "wordpress.com": "Blog", "wordpress.org": "Blog",
-}
+from app.channels import classify_channel  # noqa: F401 (reexportado)
 
 _analyzer = SentimentIntensityAnalyzer()
 
-def classify_channel(url: str) -> str:
-    host = urllib.parse.urlparse(url).netloc.lower()
-    host = re.sub(r"^www\.", "", host)
-    for k, v in CHANNEL_MAP.items():
-        if k in host:
-            return v
-    return "Blog" if "blog" in host else "Site"
-
 def simple_sentiment(text: str) -> str:
-    scores = _analyzer.polarity_scores(text or "")
-    c = scores["compound"]
-    return "positivo" if c >= 0.15 else "negativo" if c <= -0.15 else "neutro"
+    return sentiment_label(_analyzer.polarity_scores(text or "")["compound"])
+
+def sentiment_label(compound: float, threshold: float = 0.15) -> str:
+    c = compound
+    return "positivo" if c >= threshold else "negativo" if c <= -threshold else "neutro"
+
+def polarity_batch(texts):
+    """Compound do VADER para uma lista de textos (usado também nos processos do pool)."""
+    return [_analyzer.polarity_scores(t or "")["compound"] for t in texts]
 
-import requests, json
-from bs4 import BeautifulSoup
-import dateparser
+import httpx
+import requests
+from app.extract import FETCH_MAX_KB, decode_html, extract_published_at, read_html
 
 HEADERS_FETCH = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -36,7 +24,7 @@ HEADERS_FETCH = {
                   "Chrome/124.0 Safari/537.36"
 }
 
-def infer_published_at(url: str, timeout: int = 6):
+def infer_published_at(url: str, timeout: int = 6, session=None):
     """
     Tenta inferir a data de publicação via:
     - meta property='article:published_time'
@@ -45,60 +33,151 @@ def infer_published_at(url: str, timeout: int = 6):
     - <time datetime="...">
     Retorna datetime ou None.
     """
+    dt, _cause = infer_published_at_detailed(url, timeout=timeout, session=session)
+    return dt
+
+
+def infer_published_at_detailed(url: str, timeout: int = 6, session=None):
+    """
+    Igual a `infer_published_at`, mas devolve (datetime | None, causa).
+    A causa é 'ok' quando achou a data; caso contrário indica o motivo da falha:
+    'invalid_url', 'timeout', 'connection', 'error', 'http_4xx', 'http_5xx',
+    'empty', 'parse_error' ou 'no_date'.
+    `session` permite reaproveitar um requests.Session (conexões keep-alive).
+    """
+    dt, cause, _validators = fetch_published_at(url, timeout=timeout, session=session)
+    return dt, cause
+
+
+def fetch_published_at(url: str, timeout: int = 6, session=None, etag=None, last_modified=None):
+    """
+    Como `infer_published_at_detailed`, com GET condicional: com `etag` e/ou
+    `last_modified` envia If-None-Match/If-Modified-Since e devolve a causa
+    'not_modified' quando o servidor responde 304.
+    Retorna (datetime | None, causa, {"etag", "last_modified"} da resposta).
+    """
+    html, cause, validators = fetch_page(url, timeout, session, etag, last_modified)
+    if html is None:
+        return None, cause, validators
     try:
-        r = requests.get(url, headers=HEADERS_FETCH, timeout=timeout)
+        dt = extract_published_at(html)
     except Exception:
-        return None
+        return None, "parse_error", validators
+    return (dt, "ok", validators) if dt else (None, "no_date", validators)
 
-    if r.status_code >= 400 or not r.text:
-        return None
 
-    html = r.text
-    soup = BeautifulSoup(html, "html.parser")
-
-    # 1) Meta tags comuns
-    candidates = []
-    for sel in [
-        ("meta", {"property": "article:published_time"}),
-        ("meta", {"name": "article:published_time"}),
-        ("meta", {"itemprop": "datePublished"}),
-        ("meta", {"property": "og:updated_time"}),  # fallback
-        ("meta", {"name": "DC.date"}),
-        ("meta", {"name": "date"}),
-    ]:
-        tag = soup.find(*sel)
-        if tag and tag.get("content"):
-            candidates.append(tag.get("content"))
-
-    # 2) JSON-LD schema.org
-    for script in soup.find_all("script", type="application/ld+json"):
-        try:
-            data = json.loads(script.string or "")
-        except Exception:
-            continue
-        def extract_dates(obj):
-            vals = []
-            if isinstance(obj, dict):
-                for k in ("datePublished", "dateCreated", "dateModified", "uploadDate"):
-                    v = obj.get(k)
-                    if isinstance(v, str): vals.append(v)
-                for v in obj.values():
-                    vals += extract_dates(v)
-            elif isinstance(obj, list):
-                for it in obj:
-                    vals += extract_dates(it)
-            return vals
-        candidates += extract_dates(data)
-
-    # 3) <time datetime="...">
-    for t in soup.find_all("time"):
-        dt = t.get("datetime")
-        if dt: candidates.append(dt)
-
-    # Parse com dateparser
-    for raw in candidates:
-        dt = dateparser.parse(raw)
-        if dt:
-            return dt
-
-    return None
+def fetch_page(url: str, timeout: int = 6, session=None, etag=None, last_modified=None):
+    """
+    Baixa o início da página (até FETCH_MAX_KB, ver app/extract.py).
+    Retorna (html | None, causa, validadores); causa 'ok' quando há html.
+    """
+    if not url or not url.startswith(("http://", "https://")):
+        return None, "invalid_url", {}
+
+    headers = dict(HEADERS_FETCH)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    getter = session.get if session is not None else requests.get
+    try:
+        # stream: só o início do corpo é baixado
+        r = getter(url, headers=headers, timeout=timeout, stream=True)
+    except requests.Timeout:
+        return None, "timeout", {}
+    except requests.ConnectionError:
+        return None, "connection", {}
+    except Exception:
+        return None, "error", {}
+
+    validators = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+    }
+    if r.status_code == 304 or r.status_code >= 400:
+        r.close()
+        if r.status_code == 304:
+            return None, "not_modified", validators
+        if r.status_code >= 500:
+            return None, "http_5xx", validators
+        return None, "http_4xx", validators
+    try:
+        html = read_html(r)
+    except requests.RequestException:
+        return None, "connection", validators
+    if not html:
+        return None, "empty", validators
+    return html, "ok", validators
+
+
+# -----------------------------
+# Variante assíncrona (httpx): milhares de downloads num só event loop
+# -----------------------------
+def async_client(max_connections: int = 100) -> httpx.AsyncClient:
+    """AsyncClient com redirecionamentos (como o requests) e pool dimensionado."""
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+    )
+
+
+async def fetch_page_async(url: str, timeout: int = 6, client=None, etag=None, last_modified=None):
+    """Como `fetch_page`, com um httpx.AsyncClient; mesmo retorno e mesmas causas."""
+    if not url or not url.startswith(("http://", "https://")):
+        return None, "invalid_url", {}
+
+    headers = dict(HEADERS_FETCH)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    own = client is None
+    if own:
+        client = async_client(1)
+    validators = None
+    max_bytes = FETCH_MAX_KB * 1024
+    buf = bytearray()
+    try:
+        async with client.stream("GET", url, headers=headers, timeout=timeout) as r:
+            validators = {
+                "etag": r.headers.get("ETag"),
+                "last_modified": r.headers.get("Last-Modified"),
+            }
+            if r.status_code == 304:
+                return None, "not_modified", validators
+            if r.status_code >= 500:
+                return None, "http_5xx", validators
+            if r.status_code >= 400:
+                return None, "http_4xx", validators
+            # só o início do corpo é baixado
+            async for chunk in r.aiter_bytes(16384):
+                buf += chunk
+                if len(buf) >= max_bytes:
+                    break
+            ctype = r.headers.get("Content-Type", "")
+    except httpx.TimeoutException:
+        return None, "timeout", validators or {}
+    except httpx.TransportError:
+        return None, "connection", validators or {}
+    except Exception:
+        return None, "error", validators or {}
+    finally:
+        if own:
+            await client.aclose()
+    html = decode_html(bytes(buf[:max_bytes]), ctype)
+    if not html:
+        return None, "empty", validators
+    return html, "ok", validators
+
+
+async def infer_published_at_async(url: str, timeout: int = 6, client=None):
+    """Versão assíncrona de `infer_published_at`: datetime ou None."""
+    html, _cause, _validators = await fetch_page_async(url, timeout=timeout, client=client)
+    if html is None:
+        return None
+    try:
+        return extract_published_at(html)
+    except Exception:
+        return None
@@ -1,7 +1,5 @@
-import re
 import time
 import json
-import urllib.parse
 import requests
 from bs4 import BeautifulSoup
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
@@ -20,35 +18,8 @@ HEADERS = {
 GOOGLE_URL = "https://www.google.com/search"
 analyzer = SentimentIntensityAnalyzer()
 
-# Mapeamento simples de domínio -> canal
-CHANNEL_MAP = {
-    "facebook.com": "Facebook",
-    "fb.com": "Facebook",
-    "x.com": "X (Twitter)",
-    "twitter.com": "X (Twitter)",
-    "instagram.com": "Instagram",
-    "youtube.com": "YouTube",
-    "youtu.be": "YouTube",
-    "tiktok.com": "TikTok",
-    "linkedin.com": "LinkedIn",
-    "medium.com": "Blog",
-    "blogspot.com": "Blog",
-    "wordpress.com": "Blog",
-    "wordpress.org": "Blog",
-}
-
-def classify_channel(url: str) -> str:
-    try:
-        host = re.sub(r"^www\.", "", urllib.parse.urlparse(url).netloc.lower())
-    except Exception:
-        return "Site"
-    for key, val in CHANNEL_MAP.items():
-        if key in host:
-            return val
-    # fallback simples
-    if "blog" in host:
-        return "Blog"
-    return "Site"
+# Domínio -> canal: classificador compartilhado com a API (app/channels.py)
+from app.channels import classify_channel
 
 def simple_sentiment(text: str) -> str:
     """
@@ -1,8 +1,6 @@
 import os
 import time
 import json
-import re
-import urllib.parse
 import requests
 from dotenv import load_dotenv
 load_dotenv()
@@ -13,23 +11,8 @@ CSE_ID  = os.getenv("GOOGLE_CSE_ID")
 HEADERS = {"Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8"}
 analyzer = SentimentIntensityAnalyzer()
 
-CHANNEL_MAP = {
-    "facebook.com": "Facebook", "fb.com": "Facebook",
-    "x.com": "X (Twitter)", "twitter.com": "X (Twitter)",
-    "instagram.com": "Instagram",
-    "youtube.com": "YouTube", "youtu.be": "YouTube",
-    "tiktok.com": "TikTok", "linkedin.com": "LinkedIn",
-    "medium.com": "Blog", "blogspot.com": "Blog",
-    "wordpress.com": "Blog", "wordpress.org": "Blog",
-}
-
-def classify_channel(url: str) -> str:
-    host = urllib.parse.urlparse(url).netloc.lower()
-    host = re.sub(r"^www\.", "", host)
-    for k, v in CHANNEL_MAP.items():
-        if k in host:
-            return v
-    return "Blog" if "blog" in host else "Site"
+# Domínio -> canal: classificador compartilhado com a API (app/channels.py)
+from app.channels import classify_channel
 
 def simple_sentiment(text: str) -> str:
     scores = analyzer.polarity_scores(text or "")
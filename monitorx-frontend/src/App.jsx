@@ -1,7 +1,9 @@
 import { useState } from "react";
 import MentionsTable from "./MentionsTable";
 import Dashboard from "./Dashboard";
-import { runSearch } from "./api";
+import { runSearch, getJob } from "./api";
+
+const JOB_POLL_MS = 1000;
 
 export default function App() {
   const [term, setTerm] = useState("");
@@ -11,12 +13,31 @@ export default function App() {
   const [refreshTick, setRefreshTick] = useState(0);
   const [enrichDates, setEnrichDates] = useState(true);
   const [view, setView] = useState("table"); // "table" | "dashboard"
+  const [searching, setSearching] = useState(false);
 
+  // POST /search só enfileira o job: acompanha até terminar antes de recarregar
   const handleSearch = async () => {
     if (!term) { alert("Digite um termo"); return; }
-    await runSearch(term, qty || undefined, dateFrom || undefined, dateTo || undefined, erichDates);
-    setRefreshTick((n) => n + 1);
-    alert("Busca concluída! Dados atualizados.");
+    setSearching(true);
+    try {
+      const { job_id } = await runSearch(term, qty || undefined, dateFrom || undefined, dateTo || undefined, enrichDates);
+      let job = await getJob(job_id);
+      while (job.status !== "done" && job.status !== "error") {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+        job = await getJob(job_id);
+      }
+      if (job.status === "error") {
+        alert(`Busca falhou: ${job.error}`);
+        return;
+      }
+      setRefreshTick((n) => n + 1);
+      const { inserted = 0, skipped = 0 } = job.result || {};
+      alert(`Busca concluída! ${inserted} novas, ${skipped} já existentes.`);
+    } catch (e) {
+      alert(`Erro ao rodar a busca: ${e.message}`);
+    } finally {
+      setSearching(false);
+    }
   };
 
   return (
@@ -38,7 +59,9 @@ export default function App() {
         <input type="number" min={1} max={100} value={qty} onChange={(e)=>setQty(e.target.value ? +e.target.value : "")} placeholder="Limite" />
         <input type="date" value={dateFrom} onChange={(e)=>setDateFrom(e.target.value)} />
         <input type="date" value={dateTo} onChange={(e)=>setDateTo(e.target.value)} />
-        <button onClick={handleSearch}>Rodar busca e salvar</button>
+        <button onClick={handleSearch} disabled={searching}>
+          {searching ? "Buscando..." : "Rodar busca e salvar"}
+        </button>
         <div style={{ display:"flex", gap:8 }}>
           <button onClick={()=>setView("table")} disabled={view==="table"}>Tabela</button>
           <button onClick={()=>setView("dashboard")} disabled={view==="dashboard"}>Dashboard</button>
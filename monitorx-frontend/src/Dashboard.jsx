@@ -1,5 +1,6 @@
 import { useEffect, useState } from "react";
 import { getAnalytics } from "./api";
+import useChannels from "./useChannels";
 import { Pie, Bar, Line } from "react-chartjs-2";
 import {
   Chart as ChartJS,
@@ -16,6 +17,7 @@ export default function Dashboard() {
   const [loading, setLoading] = useState(false);
   const [q, setQ] = useState("");
   const [canal, setCanal] = useState("");
+  const channels = useChannels();
   const [sentimento, setSentimento] = useState("");
   const [tag, setTag] = useState("");
   const [dateFrom, setDateFrom] = useState("");
@@ -98,13 +100,7 @@ export default function Dashboard() {
         <input placeholder="Texto..." value={q} onChange={(e)=>setQ(e.target.value)} />
         <select value={canal} onChange={(e)=>setCanal(e.target.value)}>
           <option value="">Canal (todos)</option>
-          <option>Facebook</option>
-          <option>Instagram</option>
-          <option>YouTube</option>
-          <option>LinkedIn</option>
-          <option>X (Twitter)</option>
-          <option>Blog</option>
-          <option>Site</option>
+          {channels.map((c) => <option key={c}>{c}</option>)}
         </select>
         <select value={sentimento} onChange={(e)=>setSentimento(e.target.value)}>
           <option value="">Sentimento (todos)</option>
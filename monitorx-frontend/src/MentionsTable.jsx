@@ -1,5 +1,6 @@
-import { useState, useEffect, useMemo } from "react";
+import { useState, useEffect, useMemo, useRef } from "react";
 import { getMentions, updateTags, deleteMention, bulkDeleteMentions } from "./api";
+import useChannels from "./useChannels";
 
 // Badge de sentimento (botão não clicável, arredondado, texto branco em negrito)
 function SentimentBadge({ value }) {
@@ -35,6 +36,7 @@ export default function MentionsTable({ refreshTick = 0 }) {
   // Filtros básicos
   const [q, setQ] = useState("");
   const [canal, setCanal] = useState("");
+  const channels = useChannels();
   const [sentimento, setSentimento] = useState("");
   const [tag, setTag] = useState("");
 
@@ -50,6 +52,8 @@ export default function MentionsTable({ refreshTick = 0 }) {
   const limit = 100; // máximo 100 por página
   const [total, setTotal] = useState(0);
   const [pageCount, setPageCount] = useState(1);
+  // cursor (after_id) de cada página já visitada: custo constante em páginas profundas
+  const cursorsRef = useRef({ 1: null });
 
   // seleção (persistente entre páginas)
   const [selectedIds, setSelectedIds] = useState(new Set());
@@ -57,7 +61,12 @@ export default function MentionsTable({ refreshTick = 0 }) {
   const fetchData = async () => {
     setLoading(true);
     try {
-      const params = { limit, page, date_field: dateField };
+      const cursor = cursorsRef.current[page];
+      const params = { limit, date_field: dateField };
+      if (page > 1 && cursor) params.after_id = cursor;
+      else params.page = page;
+      // total só é recontado na primeira página
+      if (page > 1) params.with_total = false;
       if (q) params.q = q;
       if (canal) params.canal = canal;
       if (sentimento) params.sentimento = sentimento;
@@ -67,8 +76,11 @@ export default function MentionsTable({ refreshTick = 0 }) {
 
       const data = await getMentions(params);
       setMentions(data.items || []);
-      setTotal(data.total || 0);
-      setPageCount(data.page_count || 1);
+      if (data.total != null) {
+        setTotal(data.total);
+        setPageCount(Math.max(1, Math.ceil(data.total / limit)));
+      }
+      if (data.next_cursor) cursorsRef.current[page + 1] = data.next_cursor;
     } finally {
       setLoading(false);
     }
@@ -78,6 +90,7 @@ export default function MentionsTable({ refreshTick = 0 }) {
   useEffect(() => { fetchData(); }, [refreshTick, page]);
 
   const handleApplyFilters = () => {
+    cursorsRef.current = { 1: null }; // cursores antigos não valem para o novo filtro
     setPage(1); // volta para a primeira página ao aplicar filtros
     fetchData();
   };
@@ -189,13 +202,7 @@ export default function MentionsTable({ refreshTick = 0 }) {
         />
         <select value={canal} onChange={(e) => setCanal(e.target.value)}>
           <option value="">Canal (todos)</option>
-          <option>Facebook</option>
-          <option>Instagram</option>
-          <option>YouTube</option>
-          <option>LinkedIn</option>
-          <option>X (Twitter)</option>
-          <option>Blog</option>
-          <option>Site</option>
+          {channels.map((c) => <option key={c}>{c}</option>)}
         </select>
         <select
           value={sentimento}
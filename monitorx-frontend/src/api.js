@@ -4,6 +4,7 @@ const API = axios.create({
   baseURL: "http://127.0.0.1:8000",
 });
 
+// params.q usa busca full-text (q_mode="like" para substring); order="relevance" ordena por relevância
 export const getMentions = async (params = {}) => {
   const res = await API.get("/mentions", { params });
   return res.data;
@@ -16,7 +17,19 @@ export const runSearch = async (term, qty, dateFrom, dateTo, enrichDates) => {
   if (dateTo) params.date_to = dateTo;
   if (enrichDates) params.enrich_dates = true;
   const res = await API.post("/search", null, { params });
-  return res.data;
+  return res.data; // { job_id, status } — acompanhe com getJob
+};
+
+// vários termos num job só; o resultado traz inserções e cota por termo
+export const runSearchBatch = async (terms, qty, dateFrom, dateTo, enrichDates) => {
+  const body = { terms, qty: qty || null, date_from: dateFrom || null, date_to: dateTo || null, enrich_dates: !!enrichDates };
+  const res = await API.post("/search/batch", body);
+  return res.data; // { job_id, status }
+};
+
+export const getJob = async (id) => {
+  const res = await API.get(`/jobs/${id}`);
+  return res.data; // { status, stage, progress, stages, result, error, ... }
 };
 
 export const updateTags = async (id, tags) => {
@@ -34,7 +47,36 @@ export const bulkDeleteMentions = async (ids) => {
   return res.data; // { deleted: N }
 };
 
+// filter: mesmos campos de getMentions (q, canal, sentimento, tag, date_field, date_from, date_to)
+export const bulkDeleteByFilter = async (filter, confirmAll = false) => {
+  const res = await API.post("/mentions/bulk_delete_by_filter", { filter, confirm_all: confirmAll });
+  return res.data; // { deleted: N }
+};
+
+export const bulkUpdateTags = async ({ ids, filter, add, remove }) => {
+  const res = await API.post("/mentions/bulk_tags", { ids, filter, add, remove });
+  return res.data; // { added, removed }
+};
+
+export const getChannels = async () => {
+  const res = await API.get("/channels");
+  return res.data.channels; // nomes para o filtro de canal
+};
+
 export const getAnalytics = async (params = {}) => {
   const res = await API.get("/analytics", { params });
   return res.data; // { total, by_sentiment, by_channel, timeseries_daily, top_tags }
 };
+
+// URL de download da exportação (mesmos filtros de getMentions + format/gzip/after_id)
+export const exportMentionsUrl = (params = {}) => API.getUri({ url: "/mentions/export", params });
+
+// feed ao vivo (SSE) das menções novas com os filtros de getMentions; devolve a função que fecha a conexão
+// onDelta recebe contagens a somar em getAnalytics; onReset pede recarregar menções e analytics
+export const openMentionsStream = (params = {}, { onMention, onDelta, onReset } = {}) => {
+  const es = new EventSource(API.getUri({ url: "/mentions/stream", params }));
+  if (onMention) es.addEventListener("mention", (e) => onMention(JSON.parse(e.data)));
+  if (onDelta) es.addEventListener("analytics", (e) => onDelta(JSON.parse(e.data)));
+  if (onReset) es.addEventListener("reset", () => onReset());
+  return () => es.close();
+};
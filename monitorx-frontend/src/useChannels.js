@@ -0,0 +1,17 @@
+import { useEffect, useState } from "react";
+import { getChannels } from "./api";
+
+// usada até GET /channels responder (ou se falhar)
+const DEFAULT_CHANNELS = [
+  "Blog", "Facebook", "Governo", "Instagram", "LinkedIn", "Notícias",
+  "Reddit", "Site", "Threads", "TikTok", "X (Twitter)", "YouTube",
+];
+
+// nomes de canal para os filtros, vindos do backend
+export default function useChannels() {
+  const [channels, setChannels] = useState(DEFAULT_CHANNELS);
+  useEffect(() => {
+    getChannels().then(setChannels).catch(() => {});
+  }, []);
+  return channels;
+}
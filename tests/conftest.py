@@ -0,0 +1,18 @@
+# tests/conftest.py
+"""
+Configuração comum dos testes (pytest, a partir da raiz do repositório).
+
+app.db lê DATABASE_URL na importação: sem a variável, os testes usam um
+SQLite temporário. Com DATABASE_URL apontando para um Postgres, os testes
+marcados para Postgres rodam contra ele (os demais criam o próprio SQLite).
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_tmp = tempfile.mkdtemp(prefix="monitorx-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmp, 'app.db')}")
+os.environ.setdefault("CSE_CACHE_PATH", "")  # sem cache em disco da CSE nos testes
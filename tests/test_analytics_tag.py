@@ -0,0 +1,40 @@
+# tests/test_analytics_tag.py
+"""Filtro por tag: rollups (mention_daily) e consulta bruta tratam a tag igual."""
+import pytest
+from sqlalchemy import create_engine
+from sqlmodel import Session
+
+from app.db import init_db
+from app.filters import MentionFilter
+from app.models import Mention
+from app.services import analytics, bulk
+from app.services.ingest import _rows_for, upsert_mentions
+
+INCLUDE = ["total", "by_sentiment", "by_channel", "timeseries_daily"]
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'analytics.db'}")
+    init_db(engine)
+    with Session(engine) as s:
+        items = [{"titulo": f"t{i}", "url": f"https://example.com/{i}", "trecho": "x"} for i in range(5)]
+        ids, _ = upsert_mentions(s, _rows_for("termo", items, {}))
+        bulk.update_tags_where(s, [Mention.id.in_(ids[:2])], add=["foo"], remove=[])
+        s.commit()
+        yield s
+    engine.dispose()
+
+
+@pytest.mark.parametrize("tag", ["foo", " foo", "foo  "])
+def test_tag_filter_matches_with_and_without_rollups(session, tag):
+    f = MentionFilter(tag=tag)
+    from_rollups = analytics.compute(session, f, INCLUDE)
+    raw = analytics.compute(session, f, INCLUDE, use_rollups=False)
+    assert from_rollups["total"] == raw["total"] == 2
+    assert from_rollups == raw
+
+
+def test_blank_tag_is_no_filter():
+    assert MentionFilter(tag="   ").tag is None
+    assert MentionFilter(tag="   ").is_empty()
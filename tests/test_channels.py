@@ -0,0 +1,15 @@
+# tests/test_channels.py
+from app import channels
+
+
+def test_names_cover_every_classification():
+    names = set(channels.names())
+    for channel in channels.load_table().values():
+        assert channel in names
+    assert {channels.BLOG, channels.FALLBACK} <= names
+
+
+def test_classify_channel():
+    assert channels.classify_channel("https://www.youtube.com/watch?v=1") == "YouTube"
+    assert channels.classify_channel("https://meublog.example.com/post") == channels.BLOG
+    assert channels.classify_channel("https://example.com/x") == channels.FALLBACK
@@ -0,0 +1,40 @@
+# tests/test_extract.py
+"""
+Extração de data em camadas contra o corpus de tests/fixtures/html: a data
+esperada (manifest.json), a camada que resolve e a concordância com a
+implementação original (BeautifulSoup + dateparser).
+"""
+import pytest
+
+from app.extract import (
+    DEFAULT_CORPUS, _corpus, bench, extract_published_at_soup,
+    extract_published_at_tiered, load_manifest,
+)
+
+MANIFEST = load_manifest(DEFAULT_CORPUS)
+PAGES = dict(_corpus(DEFAULT_CORPUS))
+
+
+def _iso(dt):
+    return dt.replace(tzinfo=None).isoformat() if dt else None
+
+
+def test_manifest_covers_corpus():
+    assert MANIFEST is not None
+    assert set(MANIFEST) == set(PAGES)
+
+
+@pytest.mark.parametrize("name", sorted(PAGES))
+def test_tiered_matches_manifest_and_soup(name):
+    html, expected = PAGES[name], MANIFEST[name]
+    dt, tier = extract_published_at_tiered(html)
+    assert _iso(dt) == expected["date"]
+    assert tier == expected["tier"]
+    assert _iso(extract_published_at_soup(html)) == expected["date"]
+
+
+def test_bench_agrees_with_soup():
+    out = bench()
+    assert out["pages"] == len(PAGES)
+    assert out["tiered"]["agree_with_soup"] == len(PAGES)
+    assert out["tiered"]["agree_with_manifest"] == len(PAGES)
@@ -0,0 +1,39 @@
+# tests/test_query_plans.py
+"""
+Planos das consultas quentes (app/services/plans.py): falha se alguma varre
+mention/mention_tag inteira ou ordena uma listagem fora do índice — ou seja,
+se um índice for removido/renomeado sem ajustar as consultas.
+"""
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.db import init_db
+from app.services import plans
+
+
+def _failures(results):
+    return [(r["query"], r["full_scans"], r["plan"]) for r in results if not r["ok"]]
+
+
+def test_hot_queries_use_indexes_sqlite(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    try:
+        init_db(engine)
+        results = plans.check(engine)
+    finally:
+        engine.dispose()
+    assert {r["query"] for r in results} == set(plans.HOT_QUERIES)
+    assert not _failures(results)
+
+
+@pytest.mark.skipif(
+    not os.environ.get("DATABASE_URL", "").startswith(("postgres://", "postgresql")),
+    reason="DATABASE_URL não é Postgres",
+)
+def test_hot_queries_use_indexes_postgres():
+    init_db()
+    results = plans.check()
+    assert {r["query"] for r in results} == set(plans.HOT_QUERIES)
+    assert not _failures(results)
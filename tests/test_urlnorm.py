@@ -0,0 +1,24 @@
+# tests/test_urlnorm.py
+import pytest
+
+from app.urlnorm import canonicalize
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("http://www.Example.com/a/?utm_source=x&b=2&a=1#frag", "https://example.com/a?a=1&b=2"),
+    ("https://m.example.com:443/", "https://example.com/"),
+    ("https://example.com:8080/x/", "https://example.com:8080/x"),
+    ("https://example.com/news/story/amp", "https://example.com/news/story"),
+    ("mailto:a@b.com", "mailto:a@b.com"),
+])
+def test_canonicalize(url, expected):
+    assert canonicalize(url) == expected
+
+
+@pytest.mark.parametrize("url", [
+    "http://a.com:99999/x",
+    "http://a.com:abc/x",
+    "http://[::1/x",
+])
+def test_malformed_urls_are_returned_unchanged(url):
+    assert canonicalize(f"  {url} ") == url